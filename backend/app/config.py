@@ -0,0 +1,151 @@
+"""
+Runtime configuration read from environment variables (or a .env file)
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "data")
+LEXICON_PATH = os.getenv(
+    "LEXICON_PATH",
+    os.path.join(BACKEND_DIR, "app", "data", "bias_lexicons.json")
+)
+
+# Results store (disabled unless a database path is configured)
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", "")
+RESULTS_BATCH_SIZE = int(os.getenv("RESULTS_BATCH_SIZE", "200"))
+RESULTS_FLUSH_INTERVAL = float(os.getenv("RESULTS_FLUSH_INTERVAL", "1.0"))
+RESULTS_MAX_PENDING = int(os.getenv("RESULTS_MAX_PENDING", "10000"))
+
+# Background job queue (workers are off unless JOB_WORKERS is set, so reloads,
+# tests and in-process tools do not spawn processes)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(DATA_DIR, "processed", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "16"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_MAX_ITEMS = int(os.getenv("JOB_MAX_ITEMS", "10000"))
+JOB_MAX_TEXT_LENGTH = int(os.getenv("JOB_MAX_TEXT_LENGTH", "200000"))
+
+# Duplicate collapsing for jobs: one representative per cluster is scored
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+
+# Per-tenant custom lexicons (registered via /lexicons, referenced by lexicon_id)
+TENANT_LEXICONS_DB_PATH = os.getenv(
+    "TENANT_LEXICONS_DB_PATH",
+    os.path.join(DATA_DIR, "processed", "tenant_lexicons.sqlite3")
+)
+TENANT_LEXICON_CACHE_SIZE = int(os.getenv("TENANT_LEXICON_CACHE_SIZE", "32"))
+TENANT_LEXICON_REFRESH_SECONDS = float(os.getenv("TENANT_LEXICON_REFRESH_SECONDS", "30"))
+TENANT_LEXICON_MAX_TERMS = int(os.getenv("TENANT_LEXICON_MAX_TERMS", "50000"))
+
+# Sparse-matrix batch scoring (weights from `python -m app.utils.batch_scoring calibrate`)
+BATCH_SCORING_WEIGHTS_PATH = os.getenv(
+    "BATCH_SCORING_WEIGHTS_PATH",
+    os.path.join(DATA_DIR, "processed", "batch_scoring_weights.json")
+)
+BATCH_MAX_TEXTS = int(os.getenv("BATCH_MAX_TEXTS", "1000"))
+BATCH_SCORING_FOR_JOBS = os.getenv("BATCH_SCORING_FOR_JOBS", "false").lower() in ("1", "true", "yes")
+
+# Shared tokenizer (app.utils.normalization): recently tokenized texts are
+# memoized so the stages of one request tokenize it once
+TOKENIZE_CACHE_SIZE = int(os.getenv("TOKENIZE_CACHE_SIZE", "32"))
+TOKENIZE_CACHE_MAX_CHARS = int(os.getenv("TOKENIZE_CACHE_MAX_CHARS", "20000"))
+
+# Shadow mode: a sampled fraction of /detect traffic is also run through a
+# candidate engine ("sparse" or "lexicon:<id>") off the request path
+SHADOW_ENGINE = os.getenv("SHADOW_ENGINE", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.01"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "32"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_LOG_PATH = os.getenv(
+    "SHADOW_LOG_PATH",
+    os.path.join(DATA_DIR, "results", "shadow_disagreements.jsonl")
+)
+# The log is rotated at this size (0: never); records carry the text's hash,
+# plus its first SHADOW_LOG_TEXT_CHARS characters when that is set
+SHADOW_LOG_MAX_BYTES = int(os.getenv("SHADOW_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SHADOW_LOG_TEXT_CHARS = int(os.getenv("SHADOW_LOG_TEXT_CHARS", "0"))
+
+# Admission control for detection endpoints (per worker process)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+ADMISSION_PATHS = [
+    path.strip()
+    for path in os.getenv("ADMISSION_PATHS", "/api/v1/detect,/api/v1/analyze").split(",")
+    if path.strip()
+]
+
+# Request deadlines
+MAX_LATENCY_BUDGET_MS = int(os.getenv("MAX_LATENCY_BUDGET_MS", "60000"))
+HIGHLIGHT_CHUNK_SIZE = int(os.getenv("HIGHLIGHT_CHUNK_SIZE", "2000"))
+
+# HTTP conditional requests: ETags on /detect, /analyze, /categories and /health
+ETAGS_ENABLED = os.getenv("ETAGS_ENABLED", "true").lower() in ("1", "true", "yes")
+CATEGORIES_CACHE_MAX_AGE = int(os.getenv("CATEGORIES_CACHE_MAX_AGE", "300"))
+
+# HTTP compression
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+MAX_DECOMPRESSED_REQUEST_SIZE = int(os.getenv("MAX_DECOMPRESSED_REQUEST_SIZE", str(32 * 1024 * 1024)))
+
+# Compiled lexicon artifact (built with `python -m app.utils.compiled_lexicon build`)
+COMPILED_LEXICON_PATH = os.getenv(
+    "COMPILED_LEXICON_PATH",
+    os.path.join(DATA_DIR, "processed", "bias_lexicons.blex")
+)
+
+# Production server (python -m app.server)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+SERVER_GRACEFUL_TIMEOUT = float(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+SERVER_READY_FILE = os.getenv("SERVER_READY_FILE", "")
+
+# Transformer model (loaded in the background; the lexicon path serves meanwhile)
+MODEL_NAME = os.getenv("MODEL_NAME", "")
+MODEL_DEVICE = os.getenv("MODEL_DEVICE", "cpu")
+MODEL_MAX_LENGTH = int(os.getenv("MODEL_MAX_LENGTH", "512"))
+MODEL_WARMUP_BATCH_SIZE = int(os.getenv("MODEL_WARMUP_BATCH_SIZE", "8"))
+
+# Per-sentence cache of model outputs; documents are classified sentence by
+# sentence and only uncached sentences go to inference (0 classifies whole documents)
+MODEL_SENTENCE_CACHE_SIZE = int(os.getenv("MODEL_SENTENCE_CACHE_SIZE", "50000"))
+
+# Detection cache: per-process LRU (L1) in front of a node-wide SQLite file (L2),
+# kept in the user's cache directory rather than the source tree
+CACHE_DIR = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+DETECTION_CACHE_ENABLED = os.getenv("DETECTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+DETECTION_CACHE_L1_SIZE = int(os.getenv("DETECTION_CACHE_L1_SIZE", "1024"))
+DETECTION_CACHE_PATH = os.getenv(
+    "DETECTION_CACHE_PATH",
+    os.path.join(CACHE_DIR, "bias-detection", "detection_cache.sqlite3")
+)
+DETECTION_CACHE_L2_MAX_ENTRIES = int(os.getenv("DETECTION_CACHE_L2_MAX_ENTRIES", "100000"))
+
+# Optional spaCy stage confirming lexicon hits from POS/dependency context
+LINGUISTIC_FILTER_ENABLED = os.getenv("LINGUISTIC_FILTER_ENABLED", "false").lower() in ("1", "true", "yes")
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "64"))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))
+
+# Admin-only features (disabled while ADMIN_TOKEN is unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "25"))
+
+# Memory diagnostics (admin-only tracemalloc snapshots under /admin/memory)
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+MEMORY_MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "4"))
+MEMORY_TOP_ALLOCATIONS = int(os.getenv("MEMORY_TOP_ALLOCATIONS", "25"))
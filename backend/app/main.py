@@ -1,25 +1,128 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import detection
+from fastapi.responses import JSONResponse
+from app import config
+from app.routes import detection, jobs, lexicons, memory, metrics, results
+from app.utils.admin import is_admin
+from app.utils.admission import admission_controller, admission_slot
+from app.utils.compression import CompressionMiddleware
+from app.utils.job_queue import create_worker_pool
+from app.utils.readiness import readiness
+from app.utils.results_store import results_store
+from app.utils.shadow import stop_shadow_runner
+from app.utils.timing import end_request, stage, start_request
+import json
 import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile the lexicon and load the model without blocking startup;
+    # /health/ready reports when they are warm
+    readiness.start()
+    # Job workers resume any jobs left unfinished by a previous run. Under
+    # app.server the master process runs the pool instead of each worker.
+    manage_job_workers = getattr(app.state, "manage_job_workers", True)
+    worker_pool = create_worker_pool() if config.JOB_WORKERS > 0 and manage_job_workers else None
+    if worker_pool is not None:
+        worker_pool.start()
+    yield
+    if worker_pool is not None:
+        worker_pool.stop()
+    stop_shadow_runner()
+    # Flush queued writes before the process exits
+    if results_store is not None:
+        results_store.close()
+
 app = FastAPI(
     title="Bias Detection API",
     description="API for detecting bias in AI-generated text",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Configure CORS
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Cap in-flight detection work and shed excess load with 503"""
+    if not admission_controller.applies_to(request.url.path):
+        return await call_next(request)
+
+    with stage("queue"):
+        rejection = await admission_controller.acquire()
+    if rejection is not None:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Server is overloaded. Please retry shortly.", "reason": rejection},
+            headers={"Retry-After": str(admission_controller.retry_after)}
+        )
+
+    token = admission_slot.set(True)
+    try:
+        return await call_next(request)
+    finally:
+        admission_slot.reset(token)
+        admission_controller.release()
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Per-stage Server-Timing header, and cProfile output for admin requests with X-Profile"""
+    profile = request.headers.get("x-profile", "").lower() in ("1", "true", "yes")
+    if profile and not is_admin(request.headers):
+        return JSONResponse(
+            status_code=status.HTTP_403_FORBIDDEN,
+            content={"detail": "Profiling requires a valid X-Admin-Token"}
+        )
+    # The timer is attached even without the header: latency budgets are
+    # counted from its start (the request's arrival)
+    timer, token = start_request(profile=profile)
+    try:
+        response = await call_next(request)
+    finally:
+        end_request(token)
+
+    if timer.profile_stats is not None:
+        # Return the top functions alongside the original response body
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        try:
+            original = json.loads(body)
+        except ValueError:
+            original = body.decode("utf-8", errors="replace")
+        response = JSONResponse(
+            status_code=response.status_code,
+            content={"profile": {"top_functions": timer.profile_stats}, "response": original}
+        )
+    if config.SERVER_TIMING_ENABLED or profile:
+        response.headers["Server-Timing"] = timer.header()
+    return response
+
+if config.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=config.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=config.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=config.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=config.COMPRESSION_ZSTD_LEVEL,
+        max_request_size=config.MAX_DECOMPRESSED_REQUEST_SIZE,
+        decompress_paths=["/api/v1/detect", "/api/v1/analyze", "/api/v1/jobs"]
+    )
+
+# Configure CORS (added last so it also wraps load-shedding responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000"],  # React dev servers
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # read by the frontend to send If-None-Match
 )
 
 # Include routers
 app.include_router(detection.router, prefix="/api/v1", tags=["detection"])
+app.include_router(results.router, prefix="/api/v1", tags=["results"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
+app.include_router(lexicons.router, prefix="/api/v1", tags=["lexicons"])
+app.include_router(memory.router, prefix="/api/v1", tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -29,6 +132,8 @@ async def root():
         "endpoints": {
             "detect": "/api/v1/detect",
             "analyze": "/api/v1/analyze",
+            "jobs": "/api/v1/jobs",
+            "results": "/api/v1/results/summary",
             "health": "/api/v1/health"
         }
     }
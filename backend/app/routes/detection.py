@@ -1,18 +1,76 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+from app import config
 from app.models.bias_detector import bias_detector
+from app.utils.batch_scoring import get_batch_scorer
+from app.utils.deadline import Deadline, split_into_chunks
+from app.utils.detection_cache import get_detection_cache, make_key
+from app.utils.etag import cache_headers, compute_etag, etag_matches, not_modified
+from app.utils.lexicon import ENGINE_VERSION, hash_text
+from app.utils.linguistic import discount_results, get_linguistic_filter
+from app.utils.matches import MatchArray, highlight_matches, lexicon_matches
+from app.utils.metrics import record_detection, record_not_modified
+from app.utils.normalization import normalize_text
+from app.utils.readiness import get_model_runner, readiness
+from app.utils.results_store import results_store
+from app.utils.sentence_cache import get_sentence_cache
+from app.utils.shadow import get_shadow_runner
+from app.utils.serialization import (
+    HIGHLIGHT_FORMATS, FastJSONResponse, format_highlights, select_fields
+)
+from app.utils.tenant_lexicons import TenantLexicon, get_default_lexicon, get_tenant_registry
+from app.utils.timing import current_timer, instrumented, profiling_active, stage
 import json
+import time
 from datetime import datetime
-import re
 
 router = APIRouter()
 
 VALID_CATEGORIES = ["gender", "race", "religion", "political", "socioeconomic", "age"]
+DETECT_FIELDS = [
+    "text", "has_bias", "bias_categories", "bias_scores", "severity",
+    "overall_score", "highlights", "timestamp"
+]
+ANALYZE_FIELDS = [
+    "text", "statistics", "bias_analysis", "model_analysis", "highlights", "recommendations", "timestamp"
+]
+# Partial-result flags are always returned so clients can trust what they got
+ALWAYS_INCLUDED_FIELDS = ["partial", "skipped_stages"]
+# Clients may keep detection results but must revalidate them with If-None-Match
+DETECTION_CACHE_CONTROL = "private, no-cache"
+
+def _validate_fields(v, allowed):
+    if v is not None:
+        invalid = [field for field in v if field not in allowed]
+        if invalid:
+            raise ValueError(f"Invalid fields: {', '.join(invalid)}. Valid fields are: {', '.join(allowed)}")
+    return v
+
+def _validate_categories(v):
+    if v is not None:
+        if not isinstance(v, list):
+            raise ValueError("Categories must be a list")
+        if len(v) == 0:
+            raise ValueError("Categories list cannot be empty")
+        invalid = [cat for cat in v if cat not in VALID_CATEGORIES]
+        if invalid:
+            raise ValueError(f"Invalid categories: {', '.join(invalid)}. Valid categories are: {', '.join(VALID_CATEGORIES)}")
+    return v
+
+def _validate_highlight_format(v):
+    if v not in HIGHLIGHT_FORMATS:
+        raise ValueError(f"Invalid highlight_format: {v}. Valid formats are: {', '.join(HIGHLIGHT_FORMATS)}")
+    return v
 
 class DetectionRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=10000, description="Text to analyze for bias")
     categories: Optional[List[str]] = Field(default=None, description="Specific bias categories to check")
+    budget_ms: Optional[int] = Field(default=None, ge=1, le=config.MAX_LATENCY_BUDGET_MS, description="Latency budget in milliseconds")
+    fields: Optional[List[str]] = Field(default=None, description="Response fields to return (default: all)")
+    highlight_format: str = Field(default="full", description="Highlight detail: full, compact or offsets")
+    lexicon_id: Optional[str] = Field(default=None, description="Registered custom lexicon to use (default: built-in)")
 
     @field_validator('text')
     @classmethod
@@ -20,48 +78,112 @@ class DetectionRequest(BaseModel):
         """Validate text input"""
         if not v or not v.strip():
             raise ValueError("Text cannot be empty or only whitespace")
-        # Remove excessive whitespace
-        v = re.sub(r'\s+', ' ', v.strip())
-        return v
+        # Compose characters (NFC) and remove excessive whitespace
+        return normalize_text(v)
 
     @field_validator('categories')
     @classmethod
     def validate_categories(cls, v):
         """Validate category list"""
-        if v is not None:
-            if not isinstance(v, list):
-                raise ValueError("Categories must be a list")
-            if len(v) == 0:
-                raise ValueError("Categories list cannot be empty")
-            invalid = [cat for cat in v if cat not in VALID_CATEGORIES]
-            if invalid:
-                raise ValueError(f"Invalid categories: {', '.join(invalid)}. Valid categories are: {', '.join(VALID_CATEGORIES)}")
-        return v
+        return _validate_categories(v)
+
+    @field_validator('fields')
+    @classmethod
+    def validate_fields(cls, v):
+        """Validate requested response fields"""
+        return _validate_fields(v, DETECT_FIELDS)
+
+    @field_validator('highlight_format')
+    @classmethod
+    def validate_highlight_format(cls, v):
+        """Validate highlight format"""
+        return _validate_highlight_format(v)
 
 class DetectionResponse(BaseModel):
-    text: str
-    has_bias: bool
-    bias_categories: List[str]
-    bias_scores: Dict[str, float]
-    severity: str
+    # Fields left out through `fields` are omitted from the response
+    text: Optional[str] = None
+    has_bias: Optional[bool] = None
+    bias_categories: Optional[List[str]] = None
+    bias_scores: Optional[Dict[str, float]] = None
+    severity: Optional[str] = None
     overall_score: Optional[float] = None
-    highlights: List[Dict]
-    timestamp: str
+    highlights: Optional[List[Dict]] = None
+    timestamp: Optional[str] = None
+    partial: bool = False
+    skipped_stages: List[str] = []
 
 class AnalysisRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=10000)
     model_name: Optional[str] = Field(default=None, description="Specific model to use")
+    budget_ms: Optional[int] = Field(default=None, ge=1, le=config.MAX_LATENCY_BUDGET_MS, description="Latency budget in milliseconds")
+    fields: Optional[List[str]] = Field(default=None, description="Response sections to return (default: all)")
+    highlight_format: str = Field(default="full", description="Highlight detail: full, compact or offsets")
+    lexicon_id: Optional[str] = Field(default=None, description="Registered custom lexicon to use (default: built-in)")
+
+    @field_validator('fields')
+    @classmethod
+    def validate_fields(cls, v):
+        """Validate requested response sections"""
+        return _validate_fields(v, ANALYZE_FIELDS)
+
+    @field_validator('highlight_format')
+    @classmethod
+    def validate_highlight_format(cls, v):
+        """Validate highlight format"""
+        return _validate_highlight_format(v)
+
+class BatchDetectionRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=config.BATCH_MAX_TEXTS, description="Texts to score")
+    categories: Optional[List[str]] = Field(default=None, description="Specific bias categories to check")
+    include_highlights: bool = Field(default=False, description="Include highlighted terms in results")
+    highlight_format: str = Field(default="full", description="Highlight detail: full, compact or offsets")
+
+    @field_validator('texts')
+    @classmethod
+    def validate_texts(cls, v):
+        """Validate every text in the batch"""
+        cleaned = []
+        for i, text in enumerate(v):
+            if not text or not text.strip():
+                raise ValueError(f"Text at index {i} cannot be empty or only whitespace")
+            if len(text) > 10000:
+                raise ValueError(f"Text at index {i} exceeds maximum length of 10,000 characters")
+            cleaned.append(normalize_text(text))
+        return cleaned
+
+    @field_validator('categories')
+    @classmethod
+    def validate_categories(cls, v):
+        """Validate category list"""
+        return _validate_categories(v)
 
+    @field_validator('highlight_format')
+    @classmethod
+    def validate_highlight_format(cls, v):
+        """Validate highlight format"""
+        return _validate_highlight_format(v)
+
+# Detection is CPU-bound: plain def handlers run in the threadpool, keeping
+# the event loop free to admit or shed requests (see app.utils.admission)
 @router.post("/detect", response_model=DetectionResponse)
-async def detect_bias(request: DetectionRequest):
+@instrumented
+def detect_bias(
+    request: DetectionRequest,
+    x_latency_budget_ms: Optional[int] = Header(default=None, description="Latency budget in milliseconds"),
+    if_none_match: Optional[str] = Header(default=None, description="ETag of a result the client already has")
+):
     """
     Detect bias in provided text using lexicon-based approach
 
     Args:
         request: DetectionRequest with text and optional categories
+        x_latency_budget_ms: Optional latency budget; stages that do not fit
+            are skipped and the response is flagged as partial
+        if_none_match: ETag from an earlier response; if it still matches,
+            the detection is skipped and 304 is returned
 
     Returns:
-        DetectionResponse with bias analysis results
+        DetectionResponse with bias analysis results (with an ETag unless partial)
 
     Raises:
         HTTPException: If an error occurs during detection
@@ -74,43 +196,57 @@ async def detect_bias(request: DetectionRequest):
                 detail="Text exceeds maximum length of 10,000 characters"
             )
 
-        # Run lexicon-based detection
-        results = bias_detector.detect_lexicon_bias(request.text)
+        deadline = _resolve_deadline(request.budget_ms, x_latency_budget_ms)
+        lexicon = _resolve_lexicon(request.lexicon_id)
+        etag = _detection_etag("detect", request, lexicon)
+        if etag is not None and etag_matches(if_none_match, etag, wildcard=False):
+            # Nothing is detected, so there is no result for the store; only the 304 is counted
+            record_not_modified()
+            return not_modified(etag, DETECTION_CACHE_CONTROL)
+        skipped_stages = []
+
+        # Run lexicon-based detection (always runs, even past the deadline)
+        detector_ms = []
+        results = _detect_lexicon(request.text, lexicon, detector_ms)
 
         # Filter by requested categories if specified
-        if request.categories:
-            filtered_categories = [
-                cat for cat in results["bias_categories"]
-                if cat in request.categories
-            ]
-            filtered_scores = {
-                cat: score for cat, score in results["bias_scores"].items()
-                if cat in request.categories
-            }
-            results["bias_categories"] = filtered_categories
-            results["bias_scores"] = filtered_scores
-            results["has_bias"] = len(filtered_categories) > 0
-
-        # Get highlights for flagged categories
-        highlights = []
-        if results["has_bias"]:
-            highlights = bias_detector.highlight_biased_terms(
-                request.text,
-                results["bias_categories"]
+        results = _filter_categories(results, request.categories)
+
+        # Compare a candidate engine on a sample of default-lexicon traffic
+        shadow = get_shadow_runner() if request.lexicon_id is None and not profiling_active() else None
+        if shadow is not None:
+            shadow.maybe_submit(request.text, request.categories, results, detector_ms[0] if detector_ms else None)
+
+        results, confirmed = _run_linguistic_stage(request.text, results, deadline, skipped_stages, lexicon)
+
+        # Get highlights for flagged categories (only if requested)
+        highlights = None
+        if confirmed is not None and _wants(request.fields, "highlights"):
+            highlights = confirmed
+        elif results["has_bias"] and _wants(request.fields, "highlights"):
+            highlights = _run_highlight_stage(
+                request.text, results["bias_categories"], deadline, skipped_stages, lexicon
             )
 
-        response = DetectionResponse(
-            text=request.text,
-            has_bias=results["has_bias"],
-            bias_categories=results["bias_categories"],
-            bias_scores=results["bias_scores"],
-            severity=results["severity"],
-            overall_score=results.get("overall_score"),
-            highlights=highlights,
-            timestamp=datetime.now().isoformat()
-        )
-
-        return response
+        _record_result(request.text, results, "detect", lexicon)
+
+        with stage("serialization"):
+            response = {
+                "text": request.text,
+                "has_bias": results["has_bias"],
+                "bias_categories": results["bias_categories"],
+                "bias_scores": results["bias_scores"],
+                "severity": results["severity"],
+                "overall_score": results.get("overall_score"),
+                "highlights": format_highlights(highlights, request.highlight_format),
+                "timestamp": datetime.now().isoformat(),
+                "partial": len(skipped_stages) > 0,
+                "skipped_stages": skipped_stages
+            }
+            return FastJSONResponse(
+                select_fields(response, request.fields, ALWAYS_INCLUDED_FIELDS),
+                headers=_etag_headers(etag, skipped_stages)
+            )
 
     except HTTPException:
         raise
@@ -126,15 +262,25 @@ async def detect_bias(request: DetectionRequest):
         )
 
 @router.post("/analyze")
-async def comprehensive_analysis(request: AnalysisRequest):
+@instrumented
+def comprehensive_analysis(
+    request: AnalysisRequest,
+    x_latency_budget_ms: Optional[int] = Header(default=None, description="Latency budget in milliseconds"),
+    if_none_match: Optional[str] = Header(default=None, description="ETag of a result the client already has")
+):
     """
     Perform comprehensive bias analysis including detailed metrics
 
     Args:
         request: AnalysisRequest with text and optional model name
+        x_latency_budget_ms: Optional latency budget; stages that do not fit
+            are skipped and the response is flagged as partial
+        if_none_match: ETag from an earlier response; if it still matches,
+            the analysis is skipped and 304 is returned
 
     Returns:
-        Comprehensive analysis including statistics, bias analysis, and recommendations
+        Comprehensive analysis including statistics, bias analysis, and
+        recommendations (with an ETag unless partial)
 
     Raises:
         HTTPException: If an error occurs during analysis
@@ -147,44 +293,106 @@ async def comprehensive_analysis(request: AnalysisRequest):
                 detail="Text exceeds maximum length of 10,000 characters"
             )
 
-        # Lexicon-based detection
-        lexicon_results = bias_detector.detect_lexicon_bias(request.text)
+        deadline = _resolve_deadline(request.budget_ms, x_latency_budget_ms)
+        lexicon = _resolve_lexicon(request.lexicon_id)
+        # The model's output is part of the response once it is loaded
+        runner = get_model_runner() if config.MODEL_NAME else None
+        etag = _detection_etag(
+            "analyze", request, lexicon,
+            runner.version if runner is not None else None, config.MODEL_SENTENCE_CACHE_SIZE > 0
+        )
+        if etag is not None and etag_matches(if_none_match, etag, wildcard=False):
+            # Nothing is detected, so there is no result for the store; only the 304 is counted
+            record_not_modified()
+            return not_modified(etag, DETECTION_CACHE_CONTROL)
+        skipped_stages = []
+
+        # Lexicon-based detection (always runs, even past the deadline)
+        lexicon_results = _detect_lexicon(request.text, lexicon)
+        lexicon_results, confirmed = _run_linguistic_stage(
+            request.text, lexicon_results, deadline, skipped_stages, lexicon
+        )
+
+        # Model classification; until the model is loaded and warm the
+        # lexicon results are served alone and the response is flagged partial
+        model_analysis = None
+        if config.MODEL_NAME and _wants(request.fields, "model_analysis"):
+            if runner is None or deadline.expired():
+                skipped_stages.append("model")
+            else:
+                with stage("model"):
+                    sentence_cache = get_sentence_cache()
+                    if sentence_cache is not None:
+                        prediction = runner.predict_documents([request.text], cache=sentence_cache)[0]
+                    else:
+                        prediction = runner.predict([request.text])[0]
+                    model_analysis = dict(prediction, model=runner.model_name)
 
         # Get highlights
-        highlights = []
-        if lexicon_results["has_bias"]:
-            highlights = bias_detector.highlight_biased_terms(
-                request.text,
-                lexicon_results["bias_categories"]
+        highlights = None
+        if confirmed is not None and _wants(request.fields, "highlights"):
+            highlights = confirmed
+        elif lexicon_results["has_bias"] and _wants(request.fields, "highlights"):
+            highlights = _run_highlight_stage(
+                request.text, lexicon_results["bias_categories"], deadline, skipped_stages, lexicon
             )
 
-        # Calculate additional metrics
-        word_count = len(request.text.split())
-        char_count = len(request.text)
-
         # Generate recommendations
-        recommendations = _generate_recommendations(lexicon_results)
-
-        response = {
-            "text": request.text,
-            "statistics": {
-                "word_count": word_count,
-                "char_count": char_count,
-                "sentence_count": request.text.count('.') + request.text.count('!') + request.text.count('?')
-            },
-            "bias_analysis": {
-                "has_bias": lexicon_results["has_bias"],
-                "categories": lexicon_results["bias_categories"],
-                "scores": lexicon_results["bias_scores"],
-                "severity": lexicon_results["severity"],
-                "overall_score": lexicon_results.get("overall_score", 0)
-            },
-            "highlights": highlights,
-            "recommendations": recommendations,
-            "timestamp": datetime.now().isoformat()
-        }
+        recommendations = None
+        if _wants(request.fields, "recommendations"):
+            if deadline.expired():
+                skipped_stages.append("recommendations")
+            else:
+                with stage("recommendations"):
+                    recommendations = _generate_recommendations(lexicon_results)
 
-        return response
+        # Calculate additional metrics
+        statistics = None
+        if _wants(request.fields, "statistics"):
+            if deadline.expired():
+                skipped_stages.append("statistics")
+            else:
+                with stage("statistics"):
+                    statistics = {
+                        "word_count": len(request.text.split()),
+                        "char_count": len(request.text),
+                        "sentence_count": request.text.count('.') + request.text.count('!') + request.text.count('?')
+                    }
+
+        # Proximity patterns (only part of bias_analysis)
+        patterns = None
+        if _wants(request.fields, "bias_analysis"):
+            if deadline.expired():
+                skipped_stages.append("patterns")
+            else:
+                with stage("patterns"):
+                    patterns = lexicon.find_patterns(request.text)
+
+        _record_result(request.text, lexicon_results, "analyze", lexicon)
+
+        with stage("serialization"):
+            response = {
+                "text": request.text,
+                "statistics": statistics,
+                "bias_analysis": {
+                    "has_bias": lexicon_results["has_bias"],
+                    "categories": lexicon_results["bias_categories"],
+                    "scores": lexicon_results["bias_scores"],
+                    "severity": lexicon_results["severity"],
+                    "overall_score": lexicon_results.get("overall_score", 0),
+                    "patterns": patterns
+                },
+                "model_analysis": model_analysis,
+                "highlights": format_highlights(highlights, request.highlight_format),
+                "recommendations": recommendations,
+                "timestamp": datetime.now().isoformat(),
+                "partial": len(skipped_stages) > 0,
+                "skipped_stages": skipped_stages
+            }
+            return FastJSONResponse(
+                select_fields(response, request.fields, ALWAYS_INCLUDED_FIELDS),
+                headers=_etag_headers(etag, skipped_stages)
+            )
 
     except HTTPException:
         raise
@@ -199,23 +407,108 @@ async def comprehensive_analysis(request: AnalysisRequest):
             detail=f"An unexpected error occurred during comprehensive analysis. Please try again."
         )
 
+@router.post("/detect/batch")
+@instrumented
+def detect_bias_batch(request: BatchDetectionRequest):
+    """
+    Score a batch of texts at once with the sparse batch scorer
+
+    The batch becomes one document x term count matrix and is scored with
+    sparse matrix products (see app.utils.batch_scoring), which is much
+    faster than /detect per text for large batches. Until weights calibrated
+    against the detector are loaded, each text goes through the detector
+    instead, so results never depend on uncalibrated weights.
+
+    Args:
+        request: BatchDetectionRequest with texts and optional categories
+
+    Returns:
+        One result per text, in input order and in the shape of /detect
+        results, plus the engine that scored them
+    """
+    scorer = get_batch_scorer()
+    lexicon = get_default_lexicon()
+    if scorer.calibrated:
+        with stage("detection"):
+            results = scorer.score(request.texts, request.categories)
+    else:
+        results = [
+            _filter_categories(_detect_lexicon(text, lexicon), request.categories) for text in request.texts
+        ]
+
+    cache = None if profiling_active() else get_detection_cache()
+    items = []
+    for text, result in zip(request.texts, results):
+        highlights = None
+        if request.include_highlights and result["has_bias"]:
+            with stage("highlighting"):
+                highlights = highlight_matches(
+                    text, result["bias_categories"], lexicon.compiled, cache, lexicon.version
+                )
+        _record_result(text, result, "batch", lexicon)
+        items.append({
+            "text": text,
+            "has_bias": result["has_bias"],
+            "bias_categories": result["bias_categories"],
+            "bias_scores": result["bias_scores"],
+            "severity": result["severity"],
+            "overall_score": result.get("overall_score"),
+            "highlights": format_highlights(highlights, request.highlight_format)
+        })
+
+    with stage("serialization"):
+        return FastJSONResponse({
+            "results": items,
+            "count": len(items),
+            "engine": "sparse" if scorer.calibrated else "detector",
+            "calibrated": scorer.calibrated,
+            "timestamp": datetime.now().isoformat()
+        })
+
 @router.get("/health")
-async def health_check():
+async def health_check(if_none_match: Optional[str] = Header(default=None)):
     """
     Check if the detection service is running properly
+
+    Pollers can send If-None-Match to get a bodiless 304 while nothing changed.
     """
-    return {
+    return _conditional_get({
         "status": "healthy",
         "service": "bias-detection",
         "version": "1.0.0",
         "lexicons_loaded": len(bias_detector.bias_lexicons),
-        "model_loaded": bias_detector.model is not None
-    }
+        "model_loaded": bias_detector.model is not None or get_model_runner() is not None
+    }, if_none_match, "no-cache")
+
+@router.get("/health/live")
+async def liveness_check():
+    """
+    Liveness probe: the process is up and serving requests
+    """
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe: the lexicon is compiled and the model (if configured)
+    is loaded and warmed up
+
+    Returns 503 until every component is ready so new instances receive
+    traffic only once they can answer at full speed.
+    """
+    ready = readiness.is_ready()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not_ready", "components": readiness.status()}
+    )
 
 @router.get("/categories")
-async def get_bias_categories():
+async def get_bias_categories(if_none_match: Optional[str] = Header(default=None)):
     """
     Get list of available bias categories
+
+    Cacheable for CATEGORIES_CACHE_MAX_AGE seconds, then revalidated with
+    If-None-Match.
     """
     categories_info = []
     descriptions = {
@@ -233,9 +526,174 @@ async def get_bias_categories():
             "description": descriptions.get(cat, "No description available")
         })
 
-    return {
-        "categories": categories_info
-    }
+    return _conditional_get(
+        {"categories": categories_info},
+        if_none_match,
+        f"public, max-age={config.CATEGORIES_CACHE_MAX_AGE}"
+    )
+
+def _detection_etag(endpoint: str, request: BaseModel, lexicon: TenantLexicon, *versions) -> Optional[str]:
+    """
+    ETag of a full detection response, computed before any detection runs
+
+    Args:
+        endpoint: Endpoint name
+        request: Validated request (the budget and lexicon_id do not change
+            a full response; the lexicon's version stands in for its ID)
+        lexicon: Resolved lexicon
+        versions: Further inputs of the response (e.g. the model version);
+            the engine version is always included
+
+    Returns:
+        ETag, or None when conditional requests are disabled or the request
+        is profiled
+    """
+    if not config.ETAGS_ENABLED or profiling_active():
+        return None
+    options = request.model_dump(exclude={"text", "budget_ms", "lexicon_id"})
+    return compute_etag(
+        endpoint, hash_text(request.text), options, ENGINE_VERSION, lexicon.version,
+        config.LINGUISTIC_FILTER_ENABLED, *versions
+    )
+
+def _etag_headers(etag: Optional[str], skipped_stages: List[str]) -> Optional[Dict[str, str]]:
+    """Validators for a detection response; partial responses get none so they are never reused"""
+    if etag is None or skipped_stages:
+        return None
+    return cache_headers(etag, DETECTION_CACHE_CONTROL)
+
+def _conditional_get(payload: Dict, if_none_match: Optional[str], cache_control: str):
+    """JSON response with an ETag of its content, or 304 if the client's copy is current"""
+    if not config.ETAGS_ENABLED:
+        return payload
+    etag = compute_etag(payload)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+    return JSONResponse(content=payload, headers=cache_headers(etag, cache_control))
+
+def _wants(fields: Optional[List[str]], field: str) -> bool:
+    """Whether a response field was requested (stages for unrequested fields are skipped)"""
+    return fields is None or field in fields
+
+def _resolve_deadline(body_budget_ms: Optional[int], header_budget_ms: Optional[int]) -> Deadline:
+    """Build the request deadline from the body field and/or header (tightest wins)"""
+    if header_budget_ms is not None and not 1 <= header_budget_ms <= config.MAX_LATENCY_BUDGET_MS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"X-Latency-Budget-Ms must be between 1 and {config.MAX_LATENCY_BUDGET_MS}"
+        )
+    budgets = [b for b in (body_budget_ms, header_budget_ms) if b is not None]
+    # Counted from the request's arrival, including time queued for admission
+    timer = current_timer()
+    return Deadline(min(budgets) if budgets else None, started=timer.started if timer is not None else None)
+
+def _resolve_lexicon(lexicon_id: Optional[str]) -> TenantLexicon:
+    """The registered lexicon for lexicon_id, or the built-in one"""
+    if lexicon_id is None:
+        return get_default_lexicon()
+    lexicon = get_tenant_registry().get(lexicon_id)
+    if lexicon is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown lexicon_id: {lexicon_id}"
+        )
+    if not lexicon.detector.calibrated:
+        # Custom lexicons are scored by the batch scorer, which never serves uncalibrated weights
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Custom lexicons are unavailable until batch scoring weights are calibrated"
+        )
+    return lexicon
+
+def _detect_lexicon(text: str, lexicon: TenantLexicon, detector_ms: Optional[List[float]] = None) -> Dict:
+    """
+    Lexicon detection through the detection cache, if enabled
+
+    Args:
+        detector_ms: If given, receives how long the detector ran (nothing
+            is appended when the result came from the cache)
+    """
+    cache = get_detection_cache()
+    detector = lexicon.detector
+
+    def detect() -> Dict:
+        started = time.perf_counter()
+        results = detector.detect_lexicon_bias(text)
+        if detector_ms is not None:
+            detector_ms.append((time.perf_counter() - started) * 1000)
+        return results
+
+    with stage("detection"):
+        # Profiled requests bypass the cache so the detector itself is measured
+        if cache is None or profiling_active():
+            return detect()
+        key = make_key("lexicon", text, lexicon.version)
+        return cache.get_or_compute(key, detect)
+
+def _filter_categories(results: Dict, categories: Optional[List[str]]) -> Dict:
+    """Detection results restricted to the requested categories (all if none given)"""
+    if not categories:
+        return results
+    flagged = [cat for cat in results["bias_categories"] if cat in categories]
+    return dict(
+        results,
+        bias_categories=flagged,
+        bias_scores={cat: score for cat, score in results["bias_scores"].items() if cat in categories},
+        has_bias=len(flagged) > 0
+    )
+
+def _run_linguistic_stage(text: str, results: Dict, deadline: Deadline, skipped_stages: List[str],
+                          lexicon: TenantLexicon) -> Tuple[Dict, Optional[MatchArray]]:
+    """
+    Confirm lexicon hits with the spaCy stage, if it is enabled
+
+    Only texts with lexicon hits are parsed. Categories whose hits are all
+    discounted are removed from the results.
+
+    Returns:
+        Updated results and the confirmed matches (None if the stage did not run)
+    """
+    linguistic_filter = get_linguistic_filter()
+    if linguistic_filter is None or not results["has_bias"]:
+        return results, None
+    if deadline.expired():
+        skipped_stages.append("linguistic")
+        return results, None
+
+    with stage("linguistic"):
+        matches = lexicon_matches(text, lexicon.compiled, results["bias_categories"])
+        confirmed = linguistic_filter.filter([text], [matches], lexicon=lexicon.compiled)[0]
+        return discount_results(results, matches, confirmed), confirmed
+
+def _run_highlight_stage(text: str, categories: List[str], deadline: Deadline,
+                         skipped_stages: List[str], lexicon: TenantLexicon) -> MatchArray:
+    """
+    Highlight biased terms, checking the deadline between chunks of long text
+
+    Without a deadline the whole text is highlighted in one pass. Highlights
+    found before the budget ran out are kept and the stage is reported as
+    skipped so clients know the list is incomplete. Matches stay in compact
+    arrays until the response is serialized.
+    """
+    compiled = lexicon.compiled
+    with stage("highlighting"):
+        if not deadline.enabled:
+            cache = None if profiling_active() else get_detection_cache()
+            return highlight_matches(text, categories, compiled, cache, lexicon.version)
+
+        matches = MatchArray(text, categories=compiled.categories)
+        for offset, chunk in split_into_chunks(text, config.HIGHLIGHT_CHUNK_SIZE):
+            if deadline.expired():
+                skipped_stages.append("highlighting")
+                break
+            matches.extend(lexicon_matches(chunk, compiled, categories), offset)
+        return matches
+
+def _record_result(text: str, results: Dict, source: str, lexicon: TenantLexicon):
+    """Add a detection result to the worker's aggregates and queue it for the results store"""
+    record_detection(results)
+    if results_store is not None:
+        results_store.record(text, results, lexicon_version=lexicon.version, source=source)
 
 def _generate_recommendations(results: Dict) -> List[str]:
     """Generate recommendations based on detected bias"""
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from app import config
+from app.routes.detection import VALID_CATEGORIES
+from app.utils.job_queue import get_job_queue
+
+router = APIRouter()
+
+class JobRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=config.JOB_MAX_ITEMS, description="Texts to analyze")
+    categories: Optional[List[str]] = Field(default=None, description="Specific bias categories to check")
+    include_highlights: bool = Field(default=True, description="Include highlighted terms in results")
+    dedup: Optional[bool] = Field(default=None, description="Score one text per cluster of duplicates (default: DEDUP_ENABLED)")
+    dedup_threshold: Optional[float] = Field(
+        default=None, ge=0.5, le=1.0,
+        description="Minimum shingle similarity of near-duplicates; 1.0 collapses only exact duplicates"
+    )
+
+    @field_validator('texts')
+    @classmethod
+    def validate_texts(cls, v):
+        """Validate every text in the job"""
+        for i, text in enumerate(v):
+            if not text or not text.strip():
+                raise ValueError(f"Text at index {i} cannot be empty or only whitespace")
+            if len(text) > config.JOB_MAX_TEXT_LENGTH:
+                raise ValueError(
+                    f"Text at index {i} exceeds maximum length of {config.JOB_MAX_TEXT_LENGTH:,} characters"
+                )
+        return [text.strip() for text in v]
+
+    @field_validator('categories')
+    @classmethod
+    def validate_categories(cls, v):
+        """Validate category list"""
+        if v is not None:
+            if len(v) == 0:
+                raise ValueError("Categories list cannot be empty")
+            invalid = [cat for cat in v if cat not in VALID_CATEGORIES]
+            if invalid:
+                raise ValueError(f"Invalid categories: {', '.join(invalid)}. Valid categories are: {', '.join(VALID_CATEGORIES)}")
+        return v
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+def submit_job(request: JobRequest):
+    """
+    Queue a batch of texts for background analysis
+
+    Args:
+        request: JobRequest with texts and analysis options
+
+    Returns:
+        Job ID and initial status; poll GET /jobs/{job_id} for progress.
+        With dedup, texts are clustered by a job worker, so the job starts
+        in status 'grouping' and reports its duplicates once grouped.
+    """
+    dedup = config.DEDUP_ENABLED if request.dedup is None else request.dedup
+    options = {"categories": request.categories, "include_highlights": request.include_highlights, "dedup": dedup}
+    if dedup:
+        options["dedup_threshold"] = request.dedup_threshold or config.DEDUP_THRESHOLD
+
+    job_queue = get_job_queue()
+    job_id = job_queue.enqueue(request.texts, options)
+    return {
+        "job_id": job_id,
+        "status": "grouping" if dedup else "pending",
+        "total": len(request.texts),
+        "status_url": f"/api/v1/jobs/{job_id}"
+    }
+
+@router.get("/jobs/{job_id}")
+def get_job(
+    job_id: str,
+    after: int = Query(default=-1, ge=-1, description="Return results after this item index (pagination cursor)"),
+    limit: int = Query(default=100, ge=0, le=1000, description="Maximum number of results to return")
+):
+    """
+    Get job progress and a page of finished results
+
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    job_queue = get_job_queue()
+    job = job_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+
+    results = job_queue.get_results(job_id, after=after, limit=limit) if limit else []
+    last = results[-1]["index"] if results else after
+    job["results"] = results
+    job["pagination"] = {
+        "after": after,
+        "limit": limit,
+        # Pass as `after` for the next page; None once the last item was returned
+        "next_after": last if last < job["total"] - 1 else None
+    }
+    return job
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from pydantic import BaseModel, Field
+from typing import Any, Dict
+from app.utils.admin import require_admin
+from app.utils.tenant_lexicons import LexiconValidationError, get_tenant_registry
+
+router = APIRouter()
+
+class LexiconDefinition(BaseModel):
+    extends_default: bool = Field(default=True, description="Start from the built-in lexicon (otherwise start empty)")
+    add: Dict[str, Any] = Field(default_factory=dict, description="Terms to add: category -> group -> terms")
+    remove: Dict[str, Any] = Field(default_factory=dict, description="Terms to remove: category -> group -> terms")
+
+@router.put("/lexicons/{lexicon_id}")
+def register_lexicon(lexicon_id: str, definition: LexiconDefinition, request: Request):
+    """
+    Register or replace a custom lexicon
+
+    Args:
+        lexicon_id: ID that detection requests pass as lexicon_id
+        definition: Terms to add to and remove from the built-in lexicon
+
+    Returns:
+        Version and size of the compiled lexicon
+
+    Raises:
+        HTTPException: If the caller is not an admin or the definition is invalid
+    """
+    require_admin(request, "Managing lexicons")
+    try:
+        lexicon = get_tenant_registry().register(lexicon_id, definition.model_dump())
+    except LexiconValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {
+        "lexicon_id": lexicon.lexicon_id,
+        "version": lexicon.definition_version,
+        "categories": lexicon.compiled.categories,
+        "terms": lexicon.compiled.n_terms
+    }
+
+@router.get("/lexicons")
+def list_lexicons(request: Request):
+    """
+    List registered lexicons with this worker's usage and cache metrics
+    """
+    require_admin(request, "Managing lexicons")
+    registry = get_tenant_registry()
+    lexicons = registry.store.list()
+    for lexicon in lexicons:
+        lexicon["usage"] = registry.usage(lexicon["lexicon_id"])
+    return {"lexicons": lexicons, "cache": registry.stats()}
+
+@router.get("/lexicons/{lexicon_id}")
+def get_lexicon(lexicon_id: str, request: Request):
+    """
+    Get a registered lexicon's definition
+
+    Raises:
+        HTTPException: If the lexicon does not exist
+    """
+    require_admin(request, "Managing lexicons")
+    registry = get_tenant_registry()
+    record = registry.store.get(lexicon_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lexicon {lexicon_id} not found"
+        )
+    record["usage"] = registry.usage(lexicon_id)
+    return record
+
+@router.delete("/lexicons/{lexicon_id}")
+def delete_lexicon(lexicon_id: str, request: Request):
+    """
+    Delete a registered lexicon
+
+    Raises:
+        HTTPException: If the lexicon does not exist
+    """
+    require_admin(request, "Managing lexicons")
+    if not get_tenant_registry().delete(lexicon_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lexicon {lexicon_id} not found"
+        )
+    return {"lexicon_id": lexicon_id, "deleted": True}
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from app import config
+from app.utils.admin import require_admin
+from app.utils.memory import component_sizes, gc_stats, process_memory, snapshot_store
+
+router = APIRouter()
+
+# Handlers are plain def: sizing caches and taking snapshots walk large
+# structures and would otherwise block the event loop
+
+@router.get("/admin/memory")
+def memory_report(request: Request):
+    """
+    Memory report for this worker process: RSS, GC counters, tracemalloc
+    status and the size of every cache and lexicon structure
+    """
+    require_admin(request, "Reading memory diagnostics")
+    return {
+        "process": process_memory(),
+        "gc": gc_stats(),
+        "tracemalloc": snapshot_store.status(),
+        "components": component_sizes()
+    }
+
+@router.post("/admin/memory/snapshots")
+def take_snapshot(
+    request: Request,
+    top: int = Query(default=config.MEMORY_TOP_ALLOCATIONS, ge=1, le=500)
+):
+    """
+    Take a tracemalloc snapshot, starting tracing if it is not running
+
+    Args:
+        top: Number of allocation sites to return
+
+    Returns:
+        Snapshot ID and the largest allocation sites
+    """
+    require_admin(request, "Reading memory diagnostics")
+    return snapshot_store.take(top)
+
+@router.get("/admin/memory/snapshots/diff")
+def diff_snapshots(
+    request: Request,
+    base: int = Query(..., description="Earlier snapshot ID"),
+    current: int = Query(..., description="Later snapshot ID"),
+    top: int = Query(default=config.MEMORY_TOP_ALLOCATIONS, ge=1, le=500)
+):
+    """
+    Allocation sites that grew the most between two snapshots
+
+    Raises:
+        HTTPException: If either snapshot does not exist (e.g. was dropped
+            or taken by another worker)
+    """
+    require_admin(request, "Reading memory diagnostics")
+    diff = snapshot_store.diff(base, current, top)
+    if diff is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshots {base} and {current} are not both available in this worker"
+        )
+    return diff
+
+@router.delete("/admin/memory/snapshots")
+def stop_tracing(request: Request):
+    """
+    Stop tracemalloc and drop this worker's snapshots
+    """
+    require_admin(request, "Reading memory diagnostics")
+    snapshot_store.stop()
+    return {"tracing": False}
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from app.utils.admission import admission_controller
+from app.utils.compiled_lexicon import get_compiled_lexicon
+from app.utils.detection_cache import get_detection_cache
+from app.utils.metrics import detection_summary
+from app.utils.sentence_cache import get_sentence_cache
+from app.utils.shadow import get_shadow_runner
+from app.utils.tenant_lexicons import get_tenant_registry
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Runtime metrics for this worker process
+    """
+    cache = get_detection_cache()
+    sentence_cache = get_sentence_cache()
+    shadow = get_shadow_runner()
+    return {
+        "admission": admission_controller.stats(),
+        "detections": detection_summary(),
+        "lexicon": get_compiled_lexicon().info(),
+        "cache": cache.stats() if cache is not None else None,
+        "tenant_lexicons": get_tenant_registry().stats(),
+        "sentence_cache": sentence_cache.stats() if sentence_cache is not None else None,
+        "shadow": shadow.stats() if shadow is not None else None
+    }
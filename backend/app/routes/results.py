@@ -0,0 +1,93 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import List, Optional
+from datetime import datetime, timezone
+from app.routes.detection import VALID_CATEGORIES
+from app.utils.results_store import results_store
+
+router = APIRouter()
+
+def _get_store():
+    if results_store is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Results store is not enabled. Set RESULTS_DB_PATH to record detections."
+        )
+    return results_store
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Times without an offset are taken as UTC, so naive and aware bounds compare
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _time_range(start: Optional[datetime], end: Optional[datetime]):
+    start, end = _utc(start), _utc(end)
+    if start and end and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be earlier than end"
+        )
+    return (
+        start.timestamp() if start else None,
+        end.timestamp() if end else None
+    )
+
+def _validate_categories(categories: Optional[List[str]]):
+    if categories:
+        invalid = [cat for cat in categories if cat not in VALID_CATEGORIES]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid categories: {', '.join(invalid)}. Valid categories are: {', '.join(VALID_CATEGORIES)}"
+            )
+    return categories
+
+@router.get("/results/summary")
+def results_summary(
+    start: Optional[datetime] = Query(default=None, description="Start of the time range (ISO 8601)"),
+    end: Optional[datetime] = Query(default=None, description="End of the time range (ISO 8601)"),
+    categories: Optional[List[str]] = Query(default=None, description="Restrict to these categories")
+):
+    """
+    Summarize recorded detections over a time range
+
+    Returns:
+        Detection count, category distribution, mean scores and severity distribution
+    """
+    store = _get_store()
+    start_ts, end_ts = _time_range(start, end)
+    return store.summary(start_ts, end_ts, _validate_categories(categories))
+
+@router.get("/results/distribution")
+def results_distribution(
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
+    categories: Optional[List[str]] = Query(default=None)
+):
+    """
+    Category distribution of recorded detections (calculate_category_distribution)
+    """
+    store = _get_store()
+    start_ts, end_ts = _time_range(start, end)
+    return {
+        "count": store.count(start_ts, end_ts),
+        "distribution": store.category_distribution(start_ts, end_ts, _validate_categories(categories))
+    }
+
+@router.get("/results/scores")
+def results_scores(
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
+    categories: Optional[List[str]] = Query(default=None)
+):
+    """
+    Mean category scores of recorded detections (aggregate_scores)
+    """
+    store = _get_store()
+    start_ts, end_ts = _time_range(start, end)
+    return {
+        "count": store.count(start_ts, end_ts),
+        "scores": store.aggregate_scores(start_ts, end_ts, _validate_categories(categories))
+    }
@@ -0,0 +1,318 @@
+"""
+Production server entry point
+
+Loads the detector, compiled lexicon and caches once in a master process,
+warms them up, then forks worker processes that share that memory
+copy-on-write and serve the app with uvicorn on a shared socket. The model
+is loaded and warmed in each worker after the fork: CUDA cannot be
+re-initialized in a forked child, and torch/OpenMP thread pools started
+before fork can hang the children.
+
+Usage:
+    python -m app.server --workers 4 --host 0.0.0.0 --port 8000
+
+Signals (sent to the master):
+    SIGTERM / SIGINT  graceful shutdown of all workers
+    SIGHUP            rolling restart: replace workers one at a time
+    SIGTTIN / SIGTTOU add / remove a worker
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from app import config
+
+logger = logging.getLogger("app.server")
+
+# Readiness components that are safe to load before fork (no GPU context or
+# native thread pools); the rest are loaded by each worker
+FORK_SAFE_COMPONENTS = ["lexicon", "caches"]
+
+def preload():
+    """
+    Import the app and warm the fork-safe structures before forking
+
+    The lexicon and the caches are loaded and warmed once here, so the
+    workers share them copy-on-write. The model, and any component that
+    failed to load here, is loaded by each worker before it accepts traffic.
+
+    Returns:
+        The ASGI app
+    """
+    from app.main import app
+    from app.utils.readiness import readiness
+
+    started = time.perf_counter()
+    readiness.load(FORK_SAFE_COMPONENTS)
+
+    # Keep the preloaded objects out of future collections so the garbage
+    # collector does not touch (and un-share) their pages in the workers
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded app in %.0f ms", (time.perf_counter() - started) * 1000)
+    return app
+
+class _NotifyingServer(uvicorn.Server):
+    """
+    uvicorn server that only accepts traffic once warm, and then tells the master
+
+    Components preloaded by the master are already ready. The model, and
+    any component that failed in the master, is loaded here (retried with
+    backoff) before the worker starts accepting on the shared socket, so no
+    request reaches a cold worker.
+    """
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        from app.utils.readiness import readiness
+
+        loop = asyncio.get_running_loop()
+        delay = 1.0
+        while True:
+            await loop.run_in_executor(None, readiness.load)
+            if readiness.is_ready():
+                break
+            if self.should_exit:
+                return
+            logger.warning("Worker %s is not ready (%s); retrying in %.0f s",
+                           os.getpid(), readiness.status(), delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+        await super().startup(sockets=sockets)
+        if self.started:
+            threading.Thread(target=self._notify_when_ready, daemon=True).start()
+
+    def _notify_when_ready(self):
+        from app.utils.readiness import readiness
+
+        if readiness.wait():
+            os.write(self.ready_fd, f"{os.getpid()}\n".encode())
+
+class Master:
+    """Pre-fork process manager for uvicorn workers"""
+
+    def __init__(self, workers: int, host: str, port: int, graceful_timeout: float = 30,
+                 ready_file: Optional[str] = None, log_level: str = "info"):
+        self.num_workers = workers
+        self.host = host
+        self.port = port
+        self.graceful_timeout = graceful_timeout
+        self.ready_file = ready_file
+        self.log_level = log_level
+        self.workers: Dict[int, float] = {}
+        self.ready_workers = set()
+        self.stopping = set()
+        self.running = True
+        self.signals = []
+        self.app = None
+        self.sock = None
+        self.job_pool = None
+        self.announced_ready = False
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def run(self):
+        # Warm up before binding so no connection waits on a cold worker
+        self.app = preload()
+        # The master owns the job worker pool; forked HTTP workers must not start their own
+        self.app.state.manage_job_workers = False
+        self.sock = self._bind()
+        self.ready_r, self.ready_w = os.pipe()
+
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, lambda signum, frame: self.signals.append(signum))
+
+        logger.info("Listening on %s:%s with %d workers", self.host, self.port, self.num_workers)
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+
+        if config.JOB_WORKERS > 0:
+            from app.utils.job_queue import create_worker_pool
+            self.job_pool = create_worker_pool()
+            self.job_pool.start()
+
+        try:
+            while self.running:
+                self._handle_signals()
+                self._reap_workers()
+                self._read_ready(timeout=0.5)
+                self._maintain_worker_count()
+        finally:
+            self.shutdown()
+
+    def spawn_worker(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+
+        # Worker process
+        exit_code = 0
+        try:
+            # uvicorn installs its own SIGINT/SIGTERM handlers for graceful shutdown
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+                signal.signal(sig, signal.SIG_DFL)
+            os.close(self.ready_r)
+            worker_config = uvicorn.Config(
+                self.app,
+                lifespan="on",
+                log_level=self.log_level,
+                timeout_graceful_shutdown=self.graceful_timeout
+            )
+            _NotifyingServer(worker_config, self.ready_w).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %s crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _read_ready(self, timeout: float):
+        readable, _, _ = select.select([self.ready_r], [], [], timeout)
+        if not readable:
+            return
+        for line in os.read(self.ready_r, 4096).decode().split():
+            pid = int(line)
+            if pid in self.workers:
+                self.ready_workers.add(pid)
+
+        if not self.announced_ready and len(self.ready_workers) >= self.num_workers:
+            self.announced_ready = True
+            logger.info("All %d workers warmed up and ready", self.num_workers)
+            if self.ready_file:
+                with open(self.ready_file, "w") as f:
+                    f.write(f"{os.getpid()}\n")
+
+    def _reap_workers(self):
+        # Only wait on HTTP workers; job pool processes are managed by multiprocessing
+        for pid in list(self.workers) + list(self.stopping):
+            try:
+                reaped, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                reaped, status = pid, 0
+            if reaped == 0:
+                continue
+            self.stopping.discard(pid)
+            self.ready_workers.discard(pid)
+            if self.workers.pop(pid, None) is not None and self.running:
+                logger.warning("Worker %s exited with status %s", pid, status)
+
+    def _maintain_worker_count(self):
+        while self.running and len(self.workers) < self.num_workers:
+            self.spawn_worker()
+        while len(self.workers) > self.num_workers:
+            oldest = min(self.workers, key=self.workers.get)
+            self._stop_worker(oldest)
+
+    def _handle_signals(self):
+        while self.signals:
+            signum = self.signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                logger.info("Shutting down")
+                self.running = False
+            elif signum == signal.SIGHUP:
+                self.rolling_restart()
+            elif signum == signal.SIGTTIN:
+                self.num_workers += 1
+            elif signum == signal.SIGTTOU and self.num_workers > 1:
+                self.num_workers -= 1
+
+    def rolling_restart(self):
+        """Replace each worker, waiting for its successor to be ready first"""
+        logger.info("Rolling restart of %d workers", len(self.workers))
+        for old_pid in list(self.workers):
+            new_pid = self.spawn_worker()
+            deadline = time.monotonic() + self.graceful_timeout
+            while new_pid not in self.ready_workers and time.monotonic() < deadline:
+                self._read_ready(timeout=0.1)
+                self._reap_workers()
+                if new_pid not in self.workers:
+                    break
+            self._stop_worker(old_pid)
+
+    def _stop_worker(self, pid: int):
+        try:
+            # uvicorn finishes in-flight requests on SIGTERM
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.workers.pop(pid, None)
+        self.ready_workers.discard(pid)
+        self.stopping.add(pid)
+
+    def shutdown(self):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        self.stopping.update(self.workers)
+        self.workers.clear()
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.stopping and time.monotonic() < deadline:
+            self._reap_workers()
+            time.sleep(0.1)
+        for pid in list(self.stopping):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._reap_workers()
+
+        if self.job_pool is not None:
+            self.job_pool.stop()
+        if self.ready_file and os.path.exists(self.ready_file):
+            os.remove(self.ready_file)
+        if self.sock is not None:
+            self.sock.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Bias Detection API in production")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS,
+                        help="Worker processes (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--graceful-timeout", type=float, default=config.SERVER_GRACEFUL_TIMEOUT,
+                        help="Seconds to let workers finish in-flight requests")
+    parser.add_argument("--ready-file", default=config.SERVER_READY_FILE,
+                        help="File created once every worker is warmed up and serving")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(message)s")
+
+    if not hasattr(os, "fork"):
+        # No fork (Windows): fall back to a single preloaded process
+        uvicorn.run(preload(), host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    Master(
+        workers=max(1, args.workers),
+        host=args.host,
+        port=args.port,
+        graceful_timeout=args.graceful_timeout,
+        ready_file=args.ready_file,
+        log_level=args.log_level
+    ).run()
+
+if __name__ == "__main__":
+    main()
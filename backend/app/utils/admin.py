@@ -0,0 +1,36 @@
+import hmac
+from typing import Mapping
+
+from fastapi import HTTPException, Request, status
+
+from app import config
+
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+def is_admin(headers: Mapping[str, str]) -> bool:
+    """
+    Whether a request carries the admin token
+
+    Admin features are disabled entirely while ADMIN_TOKEN is unset.
+    """
+    token = headers.get(ADMIN_TOKEN_HEADER)
+    if not config.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode())
+
+def require_admin(request: Request, action: str):
+    """
+    Reject a request that does not carry the admin token
+
+    Args:
+        request: Incoming request
+        action: What the request does, for the error message
+
+    Raises:
+        HTTPException: 403 without a valid X-Admin-Token
+    """
+    if not is_admin(request.headers):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"{action} requires a valid X-Admin-Token"
+        )
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app import config
+from app.utils.metrics import RunningStats
+
+# True within a request that holds an admission slot
+admission_slot: ContextVar[bool] = ContextVar("admission_slot", default=False)
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded, deadline-limited wait queue
+
+    At most `max_concurrency` requests run detection work at once. Up to
+    `max_queue` more wait for a slot for at most `queue_timeout` seconds;
+    anything beyond that is rejected immediately so admitted requests keep
+    a bounded tail latency under overload.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 32,
+                 queue_timeout: float = 2.0, retry_after: int = 1,
+                 paths: Optional[List[str]] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.paths = paths or []
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.peak_queue_depth = 0
+        self.queue_wait = RunningStats()
+        self._waiters = deque()
+
+    def applies_to(self, path: str) -> bool:
+        """Whether requests to this path are subject to admission control"""
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.paths)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Wait for a slot
+
+        Returns:
+            None once admitted, otherwise the rejection reason
+            ('queue_full' or 'timeout')
+        """
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self.queue_wait.update(0.0)
+            return None
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._waiters))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # The client went away; give back a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._abandon(waiter)
+            raise
+
+        if not waiter.done():
+            self._abandon(waiter)
+            self.rejected_timeout += 1
+            return "timeout"
+
+        # release() handed its slot to this waiter; in_flight is unchanged
+        self.admitted += 1
+        self.queue_wait.update(time.perf_counter() - started)
+        return None
+
+    def _abandon(self, waiter: asyncio.Future):
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self):
+        """Return a slot, handing it directly to the oldest live waiter"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        """Current queue depth and admission counters"""
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "peak_queue_depth": self.peak_queue_depth,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "mean_queue_wait_ms": round(self.queue_wait.mean * 1000, 3)
+        }
+
+admission_controller = AdmissionController(
+    max_concurrency=config.ADMISSION_MAX_CONCURRENCY,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+    retry_after=config.ADMISSION_RETRY_AFTER,
+    paths=config.ADMISSION_PATHS if config.ADMISSION_ENABLED else []
+)
@@ -0,0 +1,346 @@
+"""
+Sparse-matrix scoring of whole batches
+
+A batch of texts becomes a sparse document x term count matrix (one
+compiled-lexicon scan per text). Category scores are a single sparse
+product with a term -> category weight matrix, and severity and overall
+score are computed with array operations across the batch, so the per-text
+Python work is limited to the lexicon scan.
+
+The detector's own scoring looks at context a linear model cannot see
+(e.g. gendered terms alone are not bias), so the weights are per lexicon
+group and are calibrated against detect_lexicon_bias on a sample corpus:
+    python -m app.utils.batch_scoring calibrate corpus.txt
+Calibration also fits, per category, the score at which the detector
+starts flagging it, and stores weights and thresholds with a parity report
+(category agreement and score error against the detector). Uncalibrated
+weights count every hit equally, saturating a category at three hits, and
+flag every category with a hit, so the API only serves calibrated weights.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import nnls
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUP_WEIGHT = 1 / 3
+# Matches calculate_bias_severity
+SEVERITY_MODERATE = 0.25
+SEVERITY_SEVERE = 0.5
+
+def count_matrix(texts: Sequence[str], lexicon) -> sparse.csr_matrix:
+    """Sparse matrix of lexicon term counts, one row per text"""
+    indptr = [0]
+    indices: List[int] = []
+    data: List[int] = []
+    for text in texts:
+        counts = Counter(match[3] for match in lexicon.find_token_matches(text))
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(texts), lexicon.n_terms)
+    )
+
+def vectorized_severity(scores: np.ndarray, flagged: np.ndarray) -> np.ndarray:
+    """
+    calculate_bias_severity for every row of a score matrix
+
+    Args:
+        scores: Documents x categories scores
+        flagged: Boolean mask of the categories reported per document
+
+    Returns:
+        Array of severity labels
+    """
+    counts = flagged.sum(axis=1)
+    masked = np.where(flagged, scores, 0.0)
+    max_score = masked.max(axis=1, initial=0.0)
+    avg_score = np.divide(masked.sum(axis=1), counts, out=np.zeros(len(scores)), where=counts > 0)
+    combined = 0.6 * max_score + 0.4 * avg_score
+    return np.select(
+        [counts == 0, combined < SEVERITY_MODERATE, combined < SEVERITY_SEVERE],
+        ["none", "mild", "moderate"],
+        default="severe"
+    )
+
+class BatchScorer:
+    """
+    Scores batches of texts with sparse matrix products
+
+    Args:
+        lexicon: CompiledLexicon
+        group_weights: Score added per hit, by dotted group name (groups not
+            listed use DEFAULT_GROUP_WEIGHT)
+        calibration: Metadata of the calibration the weights came from
+        thresholds: Lowest score at which a category is flagged, by category
+            (categories not listed are flagged at any positive score)
+    """
+
+    def __init__(self, lexicon, group_weights: Optional[Dict[str, float]] = None,
+                 calibration: Optional[Dict] = None, thresholds: Optional[Dict[str, float]] = None):
+        self.lexicon = lexicon
+        self.calibration = calibration
+        self.thresholds = np.array([(thresholds or {}).get(name, 0.0) for name in lexicon.categories])
+        n_groups = len(lexicon.groups)
+
+        rows, cols = [], []
+        for term_id in range(lexicon.n_terms):
+            for group_id in lexicon.term_groups(term_id):
+                rows.append(term_id)
+                cols.append(group_id)
+        # Term -> group and group -> category incidence
+        self.term_groups = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(lexicon.n_terms, n_groups)
+        )
+        self.group_categories = sparse.csr_matrix(
+            (np.ones(n_groups), (np.arange(n_groups), lexicon.group_categories)),
+            shape=(n_groups, len(lexicon.categories))
+        )
+        self.set_group_weights(group_weights or {})
+
+    @property
+    def calibrated(self) -> bool:
+        return self.calibration is not None
+
+    def weights_digest(self) -> str:
+        """Short digest of the group weights and thresholds, so results scored with them can be versioned"""
+        canonical = json.dumps({
+            "group_weights": {name: round(float(w), 9) for name, w in zip(self.lexicon.groups, self.group_weights)},
+            "thresholds": {name: round(float(t), 9) for name, t in zip(self.lexicon.categories, self.thresholds)}
+        }, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+    def set_group_weights(self, group_weights: Dict[str, float]):
+        weights = np.full(len(self.lexicon.groups), DEFAULT_GROUP_WEIGHT)
+        for name, weight in group_weights.items():
+            group_id = self.lexicon.group_ids.get(name)
+            if group_id is not None:
+                weights[group_id] = weight
+        self.group_weights = weights
+        self.weights = (self.term_groups @ sparse.diags(weights) @ self.group_categories).tocsr()
+
+    def score_matrix(self, counts: sparse.csr_matrix) -> np.ndarray:
+        """Documents x categories scores, clipped to [0, 1]"""
+        return np.clip((counts @ self.weights).toarray(), 0.0, 1.0)
+
+    def score(self, texts: Sequence[str], categories: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Score a batch in the shape of detect_lexicon_bias results
+
+        Args:
+            texts: Texts to score
+            categories: Only report these categories (default: all)
+
+        Returns:
+            One dict per text with has_bias, bias_categories (scores at or
+            above the category's threshold), bias_scores (every category
+            with a hit), severity and overall_score
+        """
+        if not texts:
+            return []
+        scores = np.round(self.score_matrix(count_matrix(texts, self.lexicon)), 3)
+        scored = scores > 0
+        if categories is not None:
+            allowed = np.array([name in categories for name in self.lexicon.categories])
+            scored &= allowed
+        flagged = scored & (scores >= self.thresholds)
+        severities = vectorized_severity(scores, scored)
+        counts = scored.sum(axis=1)
+        overall = np.round(
+            np.divide(np.where(scored, scores, 0.0).sum(axis=1), counts, out=np.zeros(len(texts)), where=counts > 0),
+            3
+        )
+
+        names = self.lexicon.categories
+        results = []
+        for row in range(len(texts)):
+            has_bias = bool(flagged[row].any())
+            results.append({
+                "has_bias": has_bias,
+                "bias_categories": [names[c] for c in np.flatnonzero(flagged[row])],
+                "bias_scores": {names[c]: float(scores[row, c]) for c in np.flatnonzero(scored[row])},
+                "severity": str(severities[row]) if has_bias else "none",
+                "overall_score": float(overall[row])
+            })
+        return results
+
+    def calibrate(self, texts: Sequence[str], reference: Sequence[Dict]) -> Dict:
+        """
+        Fit group weights to detector results with non-negative least squares
+
+        Each category is fitted on its own groups' hit counts. Texts the
+        detector scores at 1.0 are left out, since the clipped score says
+        nothing about how far past saturation they are. Each category's flag
+        threshold is then the fitted score that best separates the texts
+        the detector flags from those it only scores.
+
+        Args:
+            texts: Calibration corpus
+            reference: detect_lexicon_bias result for every text
+
+        Returns:
+            Parity report of the fitted weights against the reference
+        """
+        group_counts = (count_matrix(texts, self.lexicon) @ self.term_groups).toarray()
+        weights = np.array(self.group_weights)
+        for category_id, category in enumerate(self.lexicon.categories):
+            groups = np.flatnonzero(np.asarray(self.lexicon.group_categories) == category_id)
+            target = np.array([r["bias_scores"].get(category, 0.0) for r in reference])
+            rows = (target < 1.0) & (group_counts[:, groups].sum(axis=1) > 0)
+            if not rows.any():
+                continue
+            fitted, _ = nnls(group_counts[np.ix_(rows, groups)], target[rows])
+            weights[groups] = fitted
+
+        self.set_group_weights({name: float(w) for name, w in zip(self.lexicon.groups, weights)})
+        self.thresholds = fit_thresholds(
+            np.round(self.score_matrix(count_matrix(texts, self.lexicon)), 3), reference, self.lexicon.categories
+        )
+        report = compare(reference, self.score(texts))
+        self.calibration = {
+            "lexicon_version": self.lexicon.lexicon_version,
+            "texts": len(texts),
+            "created_at": time.time(),
+            "parity": report
+        }
+        return report
+
+    def save(self, path: str):
+        """Write the group weights and calibration report as JSON"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "group_weights": {name: float(w) for name, w in zip(self.lexicon.groups, self.group_weights)},
+                "thresholds": {name: float(t) for name, t in zip(self.lexicon.categories, self.thresholds)},
+                "calibration": self.calibration
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, lexicon, path: str) -> "BatchScorer":
+        """Scorer with weights from a calibration file"""
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        calibration = saved.get("calibration")
+        if calibration and calibration.get("lexicon_version") != lexicon.lexicon_version:
+            logger.warning("Batch scoring weights in %s were calibrated for another lexicon version", path)
+        return cls(lexicon, saved.get("group_weights"), calibration, saved.get("thresholds"))
+
+def fit_thresholds(scores: np.ndarray, reference: Sequence[Dict], categories: Sequence[str]) -> np.ndarray:
+    """
+    Per-category flag thresholds that best reproduce the detector's flags
+
+    Args:
+        scores: Documents x categories scores of the calibration corpus
+        reference: detect_lexicon_bias result for every text
+        categories: Category names, in column order
+
+    Returns:
+        Lowest score at which each category is flagged (the smallest
+        candidate with the most agreement wins ties)
+    """
+    thresholds = np.zeros(len(categories))
+    for column, category in enumerate(categories):
+        target = np.array([category in r["bias_categories"] for r in reference])
+        column_scores = scores[:, column]
+        best = None
+        for candidate in np.unique(column_scores[column_scores > 0]):
+            agreement = int(((column_scores >= candidate) == target).sum())
+            if best is None or agreement > best:
+                best, thresholds[column] = agreement, candidate
+    return thresholds
+
+def compare(reference: Sequence[Dict], predicted: Sequence[Dict], tolerance: float = 0.05) -> Dict:
+    """
+    Parity between two sets of detection results
+
+    Returns:
+        Fraction of texts with the same categories, the same severity and
+        all category scores within `tolerance`, plus the mean and maximum
+        absolute score difference
+    """
+    same_categories = same_severity = within = 0
+    differences = []
+    for ref, pred in zip(reference, predicted):
+        same_categories += set(ref["bias_categories"]) == set(pred["bias_categories"])
+        same_severity += ref["severity"] == pred["severity"]
+        categories = set(ref["bias_scores"]) | set(pred["bias_scores"])
+        diffs = [abs(ref["bias_scores"].get(c, 0.0) - pred["bias_scores"].get(c, 0.0)) for c in categories]
+        within += all(d <= tolerance for d in diffs)
+        differences.extend(diffs)
+
+    total = len(reference) or 1
+    return {
+        "texts": len(reference),
+        "category_agreement": round(same_categories / total, 4),
+        "severity_agreement": round(same_severity / total, 4),
+        "within_tolerance": round(within / total, 4),
+        "tolerance": tolerance,
+        "mean_abs_error": round(float(np.mean(differences)), 4) if differences else 0.0,
+        "max_abs_error": round(float(np.max(differences)), 4) if differences else 0.0
+    }
+
+_batch_scorer = None
+
+def get_batch_scorer() -> BatchScorer:
+    """Shared scorer for the compiled lexicon, with calibrated weights if available"""
+    global _batch_scorer
+    if _batch_scorer is None:
+        from app.utils.compiled_lexicon import get_compiled_lexicon
+
+        lexicon = get_compiled_lexicon()
+        path = config.BATCH_SCORING_WEIGHTS_PATH
+        if path and os.path.exists(path):
+            _batch_scorer = BatchScorer.load(lexicon, path)
+        else:
+            _batch_scorer = BatchScorer(lexicon)
+    return _batch_scorer
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibrate or check the sparse batch scorer")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("calibrate", "Fit group weights to the detector"),
+                            ("check", "Report parity of the current weights")):
+        command = subcommands.add_parser(name, help=help_text)
+        command.add_argument("input", help="One text per line, or JSON lines with a 'text' field")
+        command.add_argument("--weights", default=config.BATCH_SCORING_WEIGHTS_PATH)
+        command.add_argument("--tolerance", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    from app.models.bias_detector import bias_detector
+    from app.utils.compiled_lexicon import get_compiled_lexicon
+
+    texts = []
+    with open(args.input, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                texts.append(json.loads(line)["text"] if line.startswith("{") else line)
+    reference = [bias_detector.detect_lexicon_bias(text) for text in texts]
+
+    lexicon = get_compiled_lexicon()
+    if args.command == "calibrate":
+        scorer = BatchScorer(lexicon)
+        scorer.calibrate(texts, reference)
+        scorer.save(args.weights)
+        print(f"Wrote {args.weights}")
+    else:
+        scorer = BatchScorer.load(lexicon, args.weights) if os.path.exists(args.weights) else BatchScorer(lexicon)
+    print(json.dumps(compare(reference, scorer.score(texts), args.tolerance), indent=2))
+
+if __name__ == "__main__":
+    main()
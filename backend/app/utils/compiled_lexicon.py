@@ -0,0 +1,381 @@
+"""
+Compiled, memory-mappable bias lexicon
+
+The nested lexicon JSON (category -> group -> terms, with nested groups such
+as race.racial_activities.asian) is flattened into a single binary artifact:
+
+    header | category table | group table | term table | group links | term slots
+           | token table | token slots | strings
+
+All tables are little-endian uint32 arrays. Term and token lookups are open
+addressing hash tables (crc32 of the UTF-8 key), so a loaded artifact is
+used in place, token vocabulary included. Loading it with mmap lets every worker process on a node
+share one read-only copy through the page cache instead of parsing and
+compiling the JSON per process.
+
+Build the artifact with:
+    python -m app.utils.compiled_lexicon build [--lexicon PATH] [--output PATH]
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.utils.lexicon import compute_lexicon_version
+from app.utils.normalization import TokenizedText, normalize_term, tokenize
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BLEX"
+# 2: terms normalized by app.utils.normalization (NFKC + casefold)
+# 3: token vocabulary table and total size
+FORMAT_VERSION = 3
+# magic, format version, lexicon version, total size, counts, max tokens per term, section offsets
+_HEADER = struct.Struct("<4sI16sIIIIIIIIIIIIIIIII")
+
+def flatten_lexicon(lexicons: Dict) -> List[Tuple[str, str, List[str]]]:
+    """
+    Flatten nested lexicon groups
+
+    Returns:
+        List of (category, dotted group name, terms), e.g.
+        ('race', 'race.racial_activities.asian', ['math', ...])
+    """
+    flattened = []
+
+    def walk(category, path, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(category, f"{path}.{key}", child)
+        else:
+            flattened.append((category, path, list(value)))
+
+    for category, groups in lexicons.items():
+        walk(category, category, groups)
+    return flattened
+
+def _u32_array(buffer, offset: int, count: int) -> memoryview:
+    view = memoryview(buffer)[offset:offset + count * 4]
+    return view.cast("I") if count else view
+
+def _hash_slots(encoded_keys: List[bytes]) -> List[int]:
+    """Open addressing slots (key index + 1, 0 if empty), at most half full"""
+    n_slots = 8
+    while n_slots < 2 * len(encoded_keys):
+        n_slots *= 2
+    slots = [0] * n_slots
+    for index, encoded in enumerate(encoded_keys):
+        slot = zlib.crc32(encoded) & (n_slots - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (n_slots - 1)
+        slots[slot] = index + 1
+    return slots
+
+def _probe(slots, table, stride: int, strings, encoded: bytes) -> int:
+    """Index of encoded in a hash table of (offset, length, ...) rows, or -1"""
+    mask = len(slots) - 1
+    slot = zlib.crc32(encoded) & mask
+    while True:
+        entry = slots[slot]
+        if entry == 0:
+            return -1
+        index = entry - 1
+        offset, length = table[stride * index], table[stride * index + 1]
+        if length == len(encoded) and strings[offset:offset + length] == encoded:
+            return index
+        slot = (slot + 1) & mask
+
+class TokenVocabulary:
+    """
+    Token IDs of a compiled lexicon, looked up in its mapped token table
+
+    Quacks like the read-only part of a dict (get, in, len), so it can be
+    passed to TokenizedText.ids without copying the vocabulary into a
+    per-process dict.
+    """
+
+    def __init__(self, lexicon: "CompiledLexicon"):
+        self._lexicon = lexicon
+
+    def get(self, token: str, default: int = -1) -> int:
+        token_id = self._lexicon.token_id(token)
+        return default if token_id < 0 else token_id
+
+    def __contains__(self, token: str) -> bool:
+        return self._lexicon.token_id(token) >= 0
+
+    def __len__(self) -> int:
+        return self._lexicon.n_tokens
+
+class CompiledLexicon:
+    """Read-only view over a compiled lexicon buffer (bytes or mmap)"""
+
+    def __init__(self, buffer, source: str = "memory"):
+        if sys.byteorder != "little":
+            raise RuntimeError("Compiled lexicons require a little-endian platform")
+        (magic, format_version, version, size, n_categories, n_groups, n_terms, n_links, n_slots,
+         n_tokens, n_token_slots, max_tokens, categories_offset, groups_offset, terms_offset,
+         links_offset, slots_offset, tokens_offset, token_slots_offset,
+         strings_offset) = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("Not a compiled lexicon (or unsupported format version)")
+        if size != len(buffer):
+            raise ValueError(f"Truncated compiled lexicon ({len(buffer)} of {size} bytes)")
+
+        self._buffer = buffer
+        self._mmap = None
+        self.source = source
+        self.lexicon_version = version.rstrip(b"\0").decode("ascii")
+        self.max_tokens = max_tokens
+        self.n_terms = n_terms
+        self.n_tokens = n_tokens
+        self.size_bytes = len(buffer)
+        self._strings = memoryview(buffer)[strings_offset:]
+        self._terms = _u32_array(buffer, terms_offset, n_terms * 4)
+        self._links = _u32_array(buffer, links_offset, n_links)
+        self._slots = _u32_array(buffer, slots_offset, n_slots)
+        self._tokens = _u32_array(buffer, tokens_offset, n_tokens * 2)
+        self._token_slots = _u32_array(buffer, token_slots_offset, n_token_slots)
+
+        category_table = _u32_array(buffer, categories_offset, n_categories * 2)
+        self.categories = [
+            self._string(category_table[2 * i], category_table[2 * i + 1]) for i in range(n_categories)
+        ]
+        group_table = _u32_array(buffer, groups_offset, n_groups * 3)
+        self.groups = [self._string(group_table[3 * i], group_table[3 * i + 1]) for i in range(n_groups)]
+        self.group_categories = [group_table[3 * i + 2] for i in range(n_groups)]
+        self.group_ids = {name: gid for gid, name in enumerate(self.groups)}
+        self.category_ids = {name: cid for cid, name in enumerate(self.categories)}
+        self.vocabulary = TokenVocabulary(self)
+
+    def _string(self, offset: int, length: int) -> str:
+        return bytes(self._strings[offset:offset + length]).decode("utf-8")
+
+    @classmethod
+    def build(cls, lexicons: Dict) -> "CompiledLexicon":
+        """Compile a lexicon dictionary into an in-memory CompiledLexicon"""
+        return cls(compile_lexicon(lexicons))
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledLexicon":
+        """Memory-map a compiled lexicon artifact read-only"""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        lexicon = cls(mapped, source=path)
+        lexicon._mmap = mapped
+        return lexicon
+
+    def save(self, path: str):
+        """Write the artifact atomically"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(self._buffer)
+        os.replace(tmp_path, path)
+
+    def lookup(self, key: str) -> int:
+        """Term ID of a normalized term, or -1 if it is not in the lexicon"""
+        return _probe(self._slots, self._terms, 4, self._strings, key.encode("utf-8"))
+
+    def token_id(self, token: str) -> int:
+        """ID of a normalized token that occurs in some term, or -1"""
+        return _probe(self._token_slots, self._tokens, 2, self._strings, token.encode("utf-8"))
+
+    def term(self, term_id: int) -> str:
+        return self._string(self._terms[4 * term_id], self._terms[4 * term_id + 1])
+
+    def term_groups(self, term_id: int) -> List[int]:
+        """Group IDs a term belongs to"""
+        first, count = self._terms[4 * term_id + 2], self._terms[4 * term_id + 3]
+        return list(self._links[first:first + count])
+
+    def find_matches(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        Find every lexicon term in text
+
+        Text is tokenized by app.utils.normalization (shared with the other
+        stages); multi-word terms match tokens joined by whitespace or a
+        single hyphen or apostrophe (e.g. 'inner-city', 'those people').
+        Matching is Unicode case-insensitive and offsets refer to the
+        original text.
+
+        Returns:
+            List of (start, end, term_id) sorted by start offset
+        """
+        return [(start, end, term_id) for _, start, end, term_id in self.find_token_matches(text)]
+
+    def find_token_matches(self, text: str) -> List[Tuple[int, int, int, int]]:
+        """
+        Like find_matches, with the index of each match's first token
+
+        Tokens outside the lexicon's vocabulary cannot be part of any term,
+        so they are skipped without building or hashing a key.
+
+        Returns:
+            List of (token_position, start, end, term_id) sorted by position
+        """
+        tokens = tokenize(text)
+        ids = tokens.ids(self.vocabulary)
+        norms, starts, ends, joiners = tokens.norms, tokens.starts, tokens.ends, tokens.joiners
+        n = len(ids)
+        matches = []
+        lookup = self.lookup
+        for i in range(n):
+            if ids[i] < 0:
+                continue
+            key = norms[i]
+            term_id = lookup(key)
+            if term_id >= 0:
+                matches.append((i, starts[i], ends[i], term_id))
+
+            for j in range(i + 1, min(i + self.max_tokens, n)):
+                joiner = joiners[j]
+                if joiner is None or ids[j] < 0:
+                    break
+                key = f"{key}{joiner}{norms[j]}"
+                term_id = lookup(key)
+                if term_id >= 0:
+                    matches.append((i, starts[i], ends[j], term_id))
+        return matches
+
+    def info(self) -> Dict:
+        """Summary for health and diagnostics endpoints"""
+        return {
+            "lexicon_version": self.lexicon_version,
+            "source": self.source,
+            "memory_mapped": self._mmap is not None,
+            "categories": len(self.categories),
+            "groups": len(self.groups),
+            "terms": self.n_terms,
+            "size_bytes": self.size_bytes
+        }
+
+def compile_lexicon(lexicons: Dict) -> bytes:
+    """Serialize a lexicon dictionary into the compiled binary format"""
+    flattened = flatten_lexicon(lexicons)
+    categories = list(lexicons.keys())
+    category_ids = {name: cid for cid, name in enumerate(categories)}
+
+    term_groups: Dict[str, List[int]] = {}
+    for gid, (_, _, terms) in enumerate(flattened):
+        for raw in terms:
+            term = normalize_term(raw)
+            if not term:
+                continue
+            groups = term_groups.setdefault(term, [])
+            if gid not in groups:
+                groups.append(gid)
+
+    strings = bytearray()
+
+    def add_string(value: str) -> Tuple[int, int]:
+        encoded = value.encode("utf-8")
+        offset = len(strings)
+        strings.extend(encoded)
+        return offset, len(encoded)
+
+    category_table = []
+    for name in categories:
+        category_table.extend(add_string(name))
+
+    group_table = []
+    for category, name, _ in flattened:
+        group_table.extend(add_string(name))
+        group_table.append(category_ids[category])
+
+    term_table, links, encoded_terms = [], [], []
+    token_table, encoded_tokens, token_ids = [], [], {}
+    max_tokens = 1
+    for term, groups in term_groups.items():
+        offset, length = add_string(term)
+        term_table.extend((offset, length, len(links), len(groups)))
+        links.extend(groups)
+        encoded_terms.append(term.encode("utf-8"))
+        norms = TokenizedText(term).norms
+        max_tokens = max(max_tokens, len(norms))
+        for norm in norms:
+            if norm not in token_ids:
+                token_ids[norm] = len(token_ids)
+                token_table.extend(add_string(norm))
+                encoded_tokens.append(norm.encode("utf-8"))
+
+    sections = [category_table, group_table, term_table, links, _hash_slots(encoded_terms),
+                token_table, _hash_slots(encoded_tokens)]
+    offsets = []
+    position = _HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += 4 * len(section)
+
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, compute_lexicon_version(lexicons).encode("ascii"),
+        position + len(strings), len(categories), len(flattened), len(encoded_terms), len(links),
+        len(sections[4]), len(encoded_tokens), len(sections[6]), max_tokens, *offsets, position
+    )
+    body = b"".join(struct.pack(f"<{len(section)}I", *section) for section in sections)
+    return header + body + bytes(strings)
+
+def load_lexicon_json(path: Optional[str] = None) -> Dict:
+    """Load the lexicon JSON file"""
+    with open(path or config.LEXICON_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+_compiled_lexicon = None
+
+def get_compiled_lexicon() -> CompiledLexicon:
+    """
+    Shared compiled lexicon for this process
+
+    Memory-maps COMPILED_LEXICON_PATH when the artifact exists and was
+    built from the current lexicon JSON (same lexicon version in its
+    header); otherwise compiles the JSON in memory.
+    """
+    global _compiled_lexicon
+    if _compiled_lexicon is None:
+        artifact = config.COMPILED_LEXICON_PATH
+        lexicons = load_lexicon_json() if os.path.exists(config.LEXICON_PATH) else None
+        if artifact and os.path.exists(artifact):
+            try:
+                compiled = CompiledLexicon.load(artifact)
+            except (ValueError, struct.error):
+                # Truncated, or built by an older release with another format
+                logger.warning("Cannot use compiled lexicon %s; rebuild it. Compiling in memory", artifact)
+            else:
+                if lexicons is None or compiled.lexicon_version == compute_lexicon_version(lexicons):
+                    _compiled_lexicon = compiled
+                else:
+                    logger.warning("Compiled lexicon %s was built from another version of %s; "
+                                   "compiling in memory", artifact, config.LEXICON_PATH)
+        if _compiled_lexicon is None:
+            _compiled_lexicon = CompiledLexicon.build(lexicons if lexicons is not None else load_lexicon_json())
+    return _compiled_lexicon
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or inspect a compiled bias lexicon")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    build = subcommands.add_parser("build", help="Compile the lexicon JSON into a binary artifact")
+    build.add_argument("--lexicon", default=config.LEXICON_PATH, help="Lexicon JSON file")
+    build.add_argument("--output", default=config.COMPILED_LEXICON_PATH, help="Artifact path")
+
+    info = subcommands.add_parser("info", help="Print artifact metadata")
+    info.add_argument("path", nargs="?", default=config.COMPILED_LEXICON_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        lexicon = CompiledLexicon.build(load_lexicon_json(args.lexicon))
+        lexicon.save(args.output)
+        print(f"Wrote {args.output}: {lexicon.n_terms} terms, {lexicon.size_bytes} bytes, "
+              f"version {lexicon.lexicon_version}")
+    else:
+        print(json.dumps(CompiledLexicon.load(args.path).info(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import io
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# brotli < 1.2 cannot cap the output of one process() call, so request
+# bodies in br are only accepted when the expansion can be bounded
+_BROTLI_BOUNDED = brotli is not None and hasattr(brotli.Decompressor(), "can_accept_more_data")
+
+def available_encodings() -> List[str]:
+    """Supported content codings in server preference order"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+def negotiate_encoding(accept_encoding: Optional[str], supported: List[str]) -> Optional[str]:
+    """
+    Pick a response encoding from an Accept-Encoding header
+
+    Highest q-value wins; ties go to the server preference order of `supported`.
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        coding = pieces[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+class _Compressor:
+    """Streaming compressor with a uniform compress/finish interface"""
+
+    def __init__(self, encoding: str, levels: Dict[str, int]):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(levels["gzip"], zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=levels["br"])
+        else:
+            self._obj = zstandard.ZstdCompressor(level=levels["zstd"]).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+class DecompressedSizeExceeded(Exception):
+    pass
+
+class _Decompressor:
+    """Incremental decompressor that refuses to expand beyond `max_size` bytes"""
+
+    def __init__(self, encoding: str, max_size: int):
+        self.encoding = encoding
+        self.max_size = max_size
+        self.size = 0
+        if encoding in ("gzip", "x-gzip"):
+            self._obj = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        elif encoding == "deflate":
+            self._obj = zlib.decompressobj()
+        elif encoding == "br":
+            self._obj = brotli.Decompressor()
+        else:
+            self._obj = zstandard.ZstdDecompressor()
+            self._compressed: List[bytes] = []
+            self._compressed_size = 0
+
+    def _account(self, data: bytes) -> bytes:
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise DecompressedSizeExceeded()
+        return data
+
+    def _remaining(self) -> int:
+        # One byte more than allowed, so reaching it proves the cap is exceeded
+        return self.max_size - self.size + 1
+
+    def decompress(self, chunk: bytes) -> bytes:
+        # Every step is bounded so a small bomb never expands past the cap
+        output = []
+        if self.encoding in ("gzip", "x-gzip", "deflate"):
+            data = chunk
+            while data:
+                output.append(self._account(self._obj.decompress(data, self._remaining())))
+                data = self._obj.unconsumed_tail
+        elif self.encoding == "br":
+            output.append(self._account(self._obj.process(chunk, output_buffer_limit=self._remaining())))
+            # Input left over once the limit is reached is drained with empty calls
+            while not self._obj.can_accept_more_data():
+                output.append(self._account(self._obj.process(b"", output_buffer_limit=self._remaining())))
+        else:
+            # zstandard has no output limit for incremental input: collect the
+            # (capped) compressed body and read it back in bounded steps in finish()
+            self._compressed_size += len(chunk)
+            if self._compressed_size > self.max_size:
+                raise DecompressedSizeExceeded()
+            self._compressed.append(chunk)
+        return b"".join(output)
+
+    def finish(self) -> bytes:
+        if self.encoding in ("gzip", "x-gzip", "deflate"):
+            return self._account(self._obj.flush())
+        if self.encoding == "zstd":
+            reader = self._obj.stream_reader(io.BytesIO(b"".join(self._compressed)))
+            self._compressed = []
+            output = []
+            while True:
+                data = reader.read(self._remaining())
+                if not data:
+                    break
+                output.append(self._account(data))
+            return b"".join(output)
+        return b""
+
+class CompressionMiddleware:
+    """
+    Negotiated response compression and compressed request bodies
+
+    Responses are compressed with zstd, brotli or gzip (whichever the client
+    accepts, preferring the first) when they are at least `minimum_size`
+    bytes. Requests to `decompress_paths` may send a Content-Encoding body;
+    it is decompressed incrementally and rejected with 413 once it expands
+    beyond `max_request_size` bytes.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, zstd_level: int = 3,
+                 max_request_size: int = 32 * 1024 * 1024,
+                 decompress_paths: Optional[List[str]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+        self.max_request_size = max_request_size
+        self.decompress_paths = decompress_paths or []
+        self.encodings = available_encodings()
+        self.request_encodings = {"gzip", "x-gzip", "deflate"} | set(self.encodings)
+        if not _BROTLI_BOUNDED:
+            self.request_encodings.discard("br")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "identity").strip().lower()
+        if content_encoding != "identity":
+            if not self._decompresses(scope["path"]) or content_encoding not in self.request_encodings:
+                response = PlainTextResponse(
+                    f"Unsupported Content-Encoding: {content_encoding}", status_code=415
+                )
+                await response(scope, receive, send)
+                return
+
+            try:
+                body = await self._read_decompressed(receive, content_encoding)
+            except DecompressedSizeExceeded:
+                response = PlainTextResponse(
+                    f"Decompressed request body exceeds {self.max_request_size} bytes", status_code=413
+                )
+                await response(scope, receive, send)
+                return
+            except Exception:
+                response = PlainTextResponse(
+                    f"Malformed {content_encoding} request body", status_code=400
+                )
+                await response(scope, receive, send)
+                return
+            scope, receive = self._replace_body(scope, body)
+
+        encoding = negotiate_encoding(headers.get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.levels, self.minimum_size))
+
+    def _decompresses(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.decompress_paths)
+
+    async def _read_decompressed(self, receive, encoding: str) -> bytes:
+        decompressor = _Decompressor(encoding, self.max_request_size)
+        parts = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            parts.append(decompressor.decompress(message.get("body", b"")))
+            more_body = message.get("more_body", False)
+        parts.append(decompressor.finish())
+        return b"".join(parts)
+
+    @staticmethod
+    def _replace_body(scope, body: bytes):
+        raw_headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        scope = dict(scope, headers=raw_headers)
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                return {"type": "http.disconnect"}
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return scope, receive
+
+class _CompressingSend:
+    """ASGI send wrapper that compresses the response body"""
+
+    def __init__(self, send, encoding: str, levels: Dict[str, int], minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.levels = levels
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or message["status"] in (204, 304):
+                self.passthrough = True
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            if self.start_message is not None:
+                await self.send(self.start_message)
+                self.start_message = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.levels)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            await self.send(start)
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
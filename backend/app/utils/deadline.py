@@ -0,0 +1,61 @@
+import time
+from typing import Optional
+
+class Deadline:
+    """
+    Latency budget for a single request
+
+    Stages check `expired()` between units of work and skip what no longer
+    fits, so a request returns partial results instead of overrunning.
+
+    Args:
+        budget_ms: Budget in milliseconds (None for no deadline)
+        started: perf_counter() time the budget is counted from (default:
+            now); pass the request's arrival so time spent waiting for
+            admission counts against the budget
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None, started: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.started = time.perf_counter() if started is None else started
+        self.expires_at = self.started + budget_ms / 1000 if budget_ms else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (infinite when no budget was given)"""
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.perf_counter())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.perf_counter() >= self.expires_at
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 3)
+
+def split_into_chunks(text: str, chunk_size: int):
+    """
+    Split text into (offset, chunk) pairs of roughly chunk_size characters
+
+    Chunks end at a sentence boundary when possible, otherwise at whitespace,
+    so terms are not cut in half.
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            boundary = max(text.rfind('. ', start, end), text.rfind('! ', start, end), text.rfind('? ', start, end))
+            if boundary > start:
+                end = boundary + 2
+            else:
+                space = text.rfind(' ', start, end)
+                if space > start:
+                    end = space + 1
+        chunks.append((start, text[start:end]))
+        start = end
+    return chunks
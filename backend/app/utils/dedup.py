@@ -0,0 +1,219 @@
+"""
+Exact and near-duplicate detection for bulk scoring
+
+Generated corpora contain many texts that differ only in whitespace,
+punctuation or a single word. Texts are normalized (case, punctuation,
+whitespace) and hashed to collapse exact duplicates; the rest are compared
+with MinHash signatures over word shingles, bucketed with LSH so each text
+is only compared against a handful of candidates. Each cluster is scored
+once through its representative (the first text seen), so near-duplicates
+are confirmed against the lexicon (confirm_assignments) before they share
+the representative's scores.
+
+Estimate the savings on a corpus (one text per line, or JSON lines with a
+'text' field):
+    python -m app.utils.dedup corpus.txt --threshold 0.85
+"""
+import hashlib
+import zlib
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.normalization import tokenize
+
+# Shingle hashes and permutation coefficients stay below 2^31, so a*x+b fits in uint64
+_PRIME = (1 << 31) - 1
+
+def normalize(text: str) -> str:
+    """Normalized tokens of the text (case and punctuation removed) joined by spaces"""
+    return " ".join(tokenize(text).norms)
+
+class MinHasher:
+    """MinHash signatures over word shingles"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, num_perm).astype(np.uint64)
+
+    def shingles(self, tokens: Sequence[str]) -> set:
+        k = self.shingle_size
+        if len(tokens) <= k:
+            return {" ".join(tokens)}
+        return {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+    def signature(self, tokens: Sequence[str]) -> np.ndarray:
+        """Signature of a normalized token list"""
+        shingles = self.shingles(tokens)
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode()) & _PRIME for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Bands and rows per band for LSH bucketing
+
+    Picks the split whose S-curve midpoint (1/bands)^(1/rows) is the
+    highest one still safely below the threshold, so true near-duplicates
+    almost always share a bucket; candidates are verified afterwards.
+    """
+    best = (num_perm, 1)
+    best_midpoint = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+        if best_midpoint < midpoint <= threshold - 0.05:
+            best, best_midpoint = (bands, rows), midpoint
+    return best
+
+class Deduplicator:
+    """
+    Assigns every text to the representative of its duplicate cluster
+
+    Args:
+        threshold: Minimum estimated Jaccard similarity of word shingles for
+            two texts to count as near-duplicates; 1.0 collapses only texts
+            that are identical after normalization
+        num_perm: MinHash signature length
+        shingle_size: Words per shingle
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 3):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+
+    def assign(self, texts: Sequence[str]) -> List[int]:
+        """
+        Representative index for every text
+
+        Returns:
+            List where entry i is the index of the text that represents
+            text i (i itself for representatives)
+        """
+        assignments = []
+        exact: Dict[bytes, int] = {}
+        signatures: Dict[int, np.ndarray] = {}
+        buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+
+        for i, text in enumerate(texts):
+            tokens = normalize(text).split()
+            digest = hashlib.blake2b(" ".join(tokens).encode(), digest_size=16).digest()
+            rep = exact.get(digest)
+            if rep is None:
+                rep = i
+                if self.threshold < 1.0 and tokens:
+                    rep = self._near_duplicate(i, self.hasher.signature(tokens), signatures, buckets)
+                exact[digest] = rep
+            assignments.append(rep)
+        return assignments
+
+    def _near_duplicate(self, index: int, signature: np.ndarray, signatures: Dict[int, np.ndarray],
+                        buckets: List[Dict[bytes, List[int]]]) -> int:
+        keys = [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+        checked = set()
+        for band, key in enumerate(keys):
+            for candidate in buckets[band].get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if similarity(signatures[candidate], signature) >= self.threshold:
+                    return candidate
+
+        # New cluster; only representatives are indexed so clusters do not drift
+        signatures[index] = signature
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(index)
+        return index
+
+def confirm_assignments(texts: Sequence[str], assignments: Sequence[int], lexicon) -> List[int]:
+    """
+    Split off near-duplicates that would not get their representative's scores
+
+    Exact duplicates (identical after normalization) always stay in their
+    cluster. A near-duplicate stays only if it matches the same lexicon
+    terms the same number of times as its representative, so a member
+    that differs in a biased term is scored on its own.
+
+    Args:
+        texts: Clustered texts
+        assignments: Output of Deduplicator.assign
+        lexicon: CompiledLexicon the texts are scored with
+
+    Returns:
+        Assignments with the split-off members as their own representatives
+    """
+    confirmed = list(assignments)
+    terms: Dict[int, Counter] = {}
+
+    def term_counts(index: int) -> Counter:
+        if index not in terms:
+            terms[index] = Counter(match[3] for match in lexicon.find_token_matches(texts[index]))
+        return terms[index]
+
+    for i, rep in enumerate(assignments):
+        if rep == i or normalize(texts[i]) == normalize(texts[rep]):
+            continue
+        if term_counts(i) != term_counts(rep):
+            confirmed[i] = i
+    return confirmed
+
+def clusters(assignments: Sequence[int]) -> Dict[int, List[int]]:
+    """Member indices (including the representative) per representative"""
+    grouped: Dict[int, List[int]] = {}
+    for i, rep in enumerate(assignments):
+        grouped.setdefault(rep, []).append(i)
+    return grouped
+
+def summarize(assignments: Sequence[int]) -> Dict:
+    """Cluster statistics for a set of assignments"""
+    grouped = clusters(assignments)
+    total = len(assignments)
+    return {
+        "texts": total,
+        "clusters": len(grouped),
+        "duplicates": total - len(grouped),
+        "largest_cluster": max((len(m) for m in grouped.values()), default=0),
+        "reduction_factor": round(total / len(grouped), 2) if grouped else 1.0
+    }
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Estimate duplicate clusters in a corpus")
+    parser.add_argument("input", help="One text per line, or JSON lines with a 'text' field")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--shingle-size", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    texts = []
+    with open(args.input, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                texts.append(json.loads(line)["text"] if line.startswith("{") else line)
+
+    from app.utils.compiled_lexicon import get_compiled_lexicon
+
+    deduplicator = Deduplicator(args.threshold, args.num_perm, args.shingle_size)
+    assignments = confirm_assignments(texts, deduplicator.assign(texts), get_compiled_lexicon())
+    print(json.dumps(summarize(assignments), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from app import config
+from app.utils.lexicon import ENGINE_VERSION, hash_text
+from app.utils.serialization import dumps
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_last_access
+    ON cache (last_access);
+"""
+
+def make_key(kind: str, text: str, lexicon_version: str, *options) -> str:
+    """
+    Cache key for a detection stage
+
+    Args:
+        kind: Stage name (e.g. 'lexicon', 'highlights')
+        text: Analyzed text (only its hash is used)
+        lexicon_version: Version id of the lexicon, so lexicon changes never
+            return stale results
+        options: Stage options that change its output
+
+    The key also carries ENGINE_VERSION, so entries persisted by older code
+    (e.g. in the L2 file across a deploy) are never served.
+
+    Returns:
+        Key string
+    """
+    parts = [kind, f"e{ENGINE_VERSION}", lexicon_version, hash_text(text)]
+    parts.extend(str(option) for option in options)
+    return ":".join(parts)
+
+def _hit_rate(hits: int, misses: int) -> float:
+    lookups = hits + misses
+    return round(hits / lookups, 4) if lookups else 0.0
+
+class LRUCache:
+    """Thread-safe in-process LRU of serialized values, bounded by entry count"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: bytes):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the entries (keys, values and the table)"""
+        with self._lock:
+            return sys.getsizeof(self._entries) + sum(
+                sys.getsizeof(key) + sys.getsizeof(value) for key, value in self._entries.items()
+            )
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": _hit_rate(self.hits, self.misses),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions
+        }
+
+class SQLiteCache:
+    """
+    Node-wide cache in a SQLite database in WAL mode
+
+    Every worker process on the node opens the same file, so an entry
+    written by one worker is a hit for all others. Least recently used
+    entries are evicted once the table exceeds `max_entries`; the size is
+    checked every `evict_interval` writes to keep puts cheap.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, evict_interval: int = 256,
+                 touch_interval: float = 60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_interval = evict_interval
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after fork
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value, last_access FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                now = time.time()
+                # Refresh recency at most once per touch_interval to avoid a write per hit
+                if now - row[1] > self.touch_interval:
+                    conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            # A busy or broken L2 degrades to a miss, never to a failed request
+            self.errors += 1
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return bytes(row[0])
+
+    def put(self, key: str, value: bytes):
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, last_access) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            with self._lock:
+                self._writes += 1
+                check = self._writes % self.evict_interval == 0
+            if check:
+                self.evict()
+        except sqlite3.Error:
+            self.errors += 1
+
+    def evict(self):
+        """Delete least recently used entries beyond max_entries"""
+        conn = self._connect()
+        excess = self.count() - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            with self._lock:
+                self.evictions += excess
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self) -> Dict:
+        try:
+            entries = self.count()
+        except sqlite3.Error:
+            entries = None
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": _hit_rate(self.hits, self.misses),
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "errors": self.errors
+        }
+
+class DetectionCache:
+    """
+    Two-tier cache of detection results
+
+    L1 is a small per-process LRU; L2 is shared by every worker on the node.
+    Values are stored as JSON, so each hit returns a fresh copy that callers
+    may modify.
+    """
+
+    def __init__(self, l1: LRUCache, l2: Optional[SQLiteCache] = None):
+        self.l1 = l1
+        self.l2 = l2
+
+    def get(self, key: str):
+        value = self.l1.get(key)
+        if value is None and self.l2 is not None:
+            value = self.l2.get(key)
+            if value is not None:
+                self.l1.put(key, value)
+        return json.loads(value) if value is not None else None
+
+    def put(self, key: str, value):
+        encoded = dumps(value)
+        self.l1.put(key, encoded)
+        if self.l2 is not None:
+            self.l2.put(key, encoded)
+
+    def get_or_compute(self, key: str, compute: Callable[[], object]):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict:
+        return {
+            "l1": self.l1.stats(),
+            "l2": self.l2.stats() if self.l2 is not None else None
+        }
+
+_detection_cache = None
+
+def get_detection_cache() -> Optional[DetectionCache]:
+    """Shared detection cache, or None when caching is disabled"""
+    global _detection_cache
+    if _detection_cache is None and config.DETECTION_CACHE_ENABLED:
+        l2 = None
+        if config.DETECTION_CACHE_PATH:
+            l2 = SQLiteCache(config.DETECTION_CACHE_PATH, max_entries=config.DETECTION_CACHE_L2_MAX_ENTRIES)
+        _detection_cache = DetectionCache(LRUCache(config.DETECTION_CACHE_L1_SIZE), l2)
+    return _detection_cache
@@ -0,0 +1,60 @@
+"""
+HTTP conditional requests (ETag / If-None-Match)
+
+Detection results are a pure function of the normalized text, the request
+options and the engine and lexicon (and model) versions, so their ETag is
+computed from those before any work is done. A client that sends a matching
+If-None-Match gets a 304 without the detection running or the body being
+transferred.
+
+The ETags are weak: responses carry a timestamp, and the compression
+middleware may re-encode the body, so only semantic equality is promised.
+"""
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Response, status
+
+from app.utils.serialization import dumps
+
+def compute_etag(*parts) -> str:
+    """
+    Weak ETag for the values that determine a response
+
+    Args:
+        parts: JSON-serializable values (text hashes, options, versions)
+
+    Returns:
+        ETag header value
+    """
+    digest = hashlib.blake2b(dumps(list(parts)), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(if_none_match: Optional[str], etag: str, wildcard: bool = True) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag (weak comparison)
+
+    Args:
+        if_none_match: Header value: '*' or a comma-separated list of tags
+        etag: Current ETag of the resource
+        wildcard: Whether '*' matches. Pass False for POST endpoints: '*'
+            says nothing about the text in the body, and RFC 9110 only
+            allows a 304 for it on GET and HEAD
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return wildcard
+    current = _opaque(etag)
+    return any(_opaque(tag) == current for tag in if_none_match.split(","))
+
+def cache_headers(etag: str, cache_control: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Empty 304 response carrying the validators"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, cache_control))
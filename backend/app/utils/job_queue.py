@@ -0,0 +1,628 @@
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from app import config
+from app.utils.compiled_lexicon import get_compiled_lexicon
+from app.utils.dedup import Deduplicator, confirm_assignments
+from app.utils.detection_cache import make_key
+from app.utils.linguistic import discount_results
+from app.utils.matches import MatchArray, highlight_matches, lexicon_matches
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    options TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL REFERENCES jobs (id),
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    rep_idx INTEGER,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_claim
+    ON job_items (status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_job_items_rep
+    ON job_items (job_id, rep_idx);
+"""
+
+class JobQueue:
+    """
+    Durable SQLite-backed queue of analysis jobs
+
+    A job is split into items (one per text). Workers claim items under a
+    lease; items whose lease expires (worker crash or server restart) are
+    claimed again, so interrupted jobs resume without an external broker.
+
+    With deduplication (option 'dedup'), a job starts in status 'grouping'
+    and its items are 'ungrouped' until a worker claims the job, clusters
+    its texts and calls group(). Then only one representative per cluster
+    of duplicate texts is claimed; the other members wait in status
+    'duplicate' and are finished together with their representative.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 120, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def enqueue(self, texts: List[str], options: Optional[Dict] = None) -> str:
+        """
+        Persist a new job
+
+        Args:
+            texts: Texts to analyze
+            options: Analysis options applied to every item; with 'dedup'
+                the texts are clustered by a worker before scoring
+
+        Returns:
+            Job ID
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        options = options or {}
+        status = "grouping" if options.get("dedup") else "pending"
+        item_status = "ungrouped" if options.get("dedup") else "pending"
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, total, options) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, status, now, now, len(texts), json.dumps(options))
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, text, status) VALUES (?, ?, ?, ?)",
+                [(job_id, idx, text, item_status) for idx, text in enumerate(texts)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return job_id
+
+    def claim_grouping(self) -> Optional[Dict]:
+        """
+        Lease the oldest job waiting to be clustered
+
+        Jobs whose grouping lease expired (worker crash) are claimed again.
+
+        Returns:
+            Dict with job_id, options and texts (in item order), or None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, options FROM jobs WHERE status = 'grouping' "
+                "AND (lease_expires IS NULL OR lease_expires < ?) ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job_id, options = row
+            conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ?", (now + self.lease_seconds, job_id)
+            )
+            texts = [
+                text for (text,) in conn.execute(
+                    "SELECT text FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)
+                )
+            ]
+            conn.execute("COMMIT")
+            return {"job_id": job_id, "options": json.loads(options), "texts": texts}
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def group(self, job_id: str, assignments: List[int]):
+        """
+        Store the duplicate clusters of a job claimed with claim_grouping
+
+        Args:
+            job_id: Job ID
+            assignments: Representative index of every item (its own
+                index for representatives)
+        """
+        duplicates = sum(1 for idx, rep in enumerate(assignments) if rep != idx)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'pending', duplicates = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'grouping'",
+                (duplicates, time.time(), job_id)
+            )
+            if cursor.rowcount:
+                conn.executemany(
+                    "UPDATE job_items SET status = ?, rep_idx = ? WHERE job_id = ? AND idx = ?",
+                    [
+                        ("pending", None, job_id, idx) if rep == idx else ("duplicate", rep, job_id, idx)
+                        for idx, rep in enumerate(assignments)
+                    ]
+                )
+            # Otherwise another worker grouped the job after a lease expiry
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim(self, limit: int) -> List[Dict]:
+        """
+        Lease up to `limit` runnable items
+
+        Pending items and running items with an expired lease are runnable.
+        Items that already used up their attempts are marked failed instead.
+        Each claimed item lists the duplicates it represents under 'members'.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT i.job_id, i.idx, i.text, i.attempts, j.options FROM job_items i "
+                "JOIN jobs j ON j.id = i.job_id "
+                "WHERE i.status = 'pending' OR (i.status = 'running' AND i.lease_expires < ?) "
+                "ORDER BY j.created_at, i.idx LIMIT ?",
+                (now, limit)
+            ).fetchall()
+
+            claimed = []
+            for job_id, idx, text, attempts, options in rows:
+                if attempts >= self.max_attempts:
+                    self._finish_item(conn, job_id, idx, None, "Maximum attempts exceeded")
+                    continue
+                conn.execute(
+                    "UPDATE job_items SET status = 'running', lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ? AND idx = ?",
+                    (now + self.lease_seconds, job_id, idx)
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'pending'",
+                    (now, job_id)
+                )
+                members = conn.execute(
+                    "SELECT idx, text FROM job_items WHERE job_id = ? AND rep_idx = ? AND status = 'duplicate' "
+                    "ORDER BY idx",
+                    (job_id, idx)
+                ).fetchall()
+                claimed.append({
+                    "job_id": job_id,
+                    "idx": idx,
+                    "text": text,
+                    "options": json.loads(options),
+                    "members": [{"idx": member_idx, "text": member_text} for member_idx, member_text in members]
+                })
+            conn.execute("COMMIT")
+            return claimed
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _finish_item(self, conn: sqlite3.Connection, job_id: str, idx: int,
+                     result: Optional[Dict], error: Optional[str]):
+        cursor = conn.execute(
+            "UPDATE job_items SET status = ?, result = ?, error = ?, lease_expires = NULL "
+            "WHERE job_id = ? AND idx = ? AND status != 'done' AND status != 'failed'",
+            (
+                "done" if error is None else "failed",
+                json.dumps(result) if result is not None else None,
+                error,
+                job_id,
+                idx
+            )
+        )
+        if cursor.rowcount == 0:
+            # Already finished by another worker after a lease expiry
+            return
+        counter = "completed" if error is None else "failed"
+        conn.execute(
+            f"UPDATE jobs SET {counter} = {counter} + 1, updated_at = ?, "
+            "status = CASE WHEN completed + failed + 1 >= total THEN 'completed' ELSE 'running' END "
+            "WHERE id = ?",
+            (time.time(), job_id)
+        )
+
+        # Members of a duplicate cluster without their own outcome share the representative's
+        members = conn.execute(
+            "SELECT idx FROM job_items WHERE job_id = ? AND rep_idx = ? AND status = 'duplicate'",
+            (job_id, idx)
+        ).fetchall()
+        for (member_idx,) in members:
+            self._finish_item(conn, job_id, member_idx, result, error)
+
+    def complete(self, outcomes: List[Dict]):
+        """
+        Store the outcome of claimed items
+
+        Args:
+            outcomes: Dicts with job_id, idx and either result or error.
+                Outcomes of duplicate-cluster members must come before their
+                representative's; members without one get the
+                representative's outcome.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for outcome in outcomes:
+                self._finish_item(
+                    conn, outcome["job_id"], outcome["idx"],
+                    outcome.get("result"), outcome.get("error")
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Job status and progress, or None if the job does not exist"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, status, created_at, updated_at, total, completed, failed, duplicates, options "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+
+        job_id, status, created_at, updated_at, total, completed, failed, duplicates, options = row
+        return {
+            "job_id": job_id,
+            "status": status,
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "duplicates": duplicates,
+            "progress": round((completed + failed) / total, 3) if total else 1.0,
+            "options": json.loads(options),
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    def get_results(self, job_id: str, after: int = -1, limit: int = 100) -> List[Dict]:
+        """
+        Page of finished item results in input order
+
+        Items finish out of order, so pages are keyed by item index rather
+        than by position among finished items, and a page stops before the
+        first unfinished item. A cursor therefore never passes an item that
+        may still finish: following it returns every result exactly once.
+
+        Args:
+            job_id: Job ID
+            after: Return items with an index greater than this (cursor)
+            limit: Maximum number of results
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT idx, status, result, error FROM job_items "
+                "WHERE job_id = ? AND idx > ? AND status IN ('done', 'failed') AND idx < COALESCE("
+                "    (SELECT MIN(idx) FROM job_items WHERE job_id = ? AND idx > ? "
+                "     AND status NOT IN ('done', 'failed')), idx + 1"
+                ") ORDER BY idx LIMIT ?",
+                (job_id, after, job_id, after, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                "index": idx,
+                "status": status,
+                "result": json.loads(result) if result is not None else None,
+                "error": error
+            }
+            for idx, status, result, error in rows
+        ]
+
+def process_job_item(text: str, options: Dict, detector=None, cache=None,
+                     lexicon_version: Optional[str] = None, linguistic_filter=None) -> Dict:
+    """
+    Run lexicon detection (and optionally highlighting) for a single job item
+
+    Args:
+        text: Text to analyze
+        options: Job options (categories, include_highlights)
+        detector: BiasDetector instance (defaults to the shared detector)
+        cache: DetectionCache shared with the API (optional)
+        lexicon_version: Version id of the detector's lexicon, required with cache
+        linguistic_filter: LinguisticFilter confirming lexicon hits (optional)
+
+    Returns:
+        Result dict in the same shape as the /detect response, without the text
+    """
+    return process_job_items([text], [options], detector, cache, lexicon_version, linguistic_filter)[0]
+
+def process_job_items(texts: List[str], options: List[Dict], detector=None, cache=None,
+                      lexicon_version: Optional[str] = None, linguistic_filter=None,
+                      scorer=None) -> List[Dict]:
+    """
+    process_job_item for a batch of texts
+
+    The linguistic stage parses all texts with lexicon hits in one
+    nlp.pipe call, using the filter's worker processes. With a BatchScorer
+    the whole batch is scored with sparse matrix products instead of the
+    detector.
+    """
+    if detector is None and scorer is None:
+        from app.models.bias_detector import bias_detector as detector
+
+    if scorer is not None:
+        scored = scorer.score(texts)
+    elif cache is None:
+        scored = [detector.detect_lexicon_bias(text) for text in texts]
+    else:
+        scored = [
+            cache.get_or_compute(
+                make_key("lexicon", text, lexicon_version), lambda text=text: detector.detect_lexicon_bias(text)
+            )
+            for text in texts
+        ]
+
+    batch = []
+    for results, item_options in zip(scored, options):
+        categories = item_options.get("categories")
+        if categories:
+            results["bias_categories"] = [cat for cat in results["bias_categories"] if cat in categories]
+            results["bias_scores"] = {
+                cat: score for cat, score in results["bias_scores"].items() if cat in categories
+            }
+            results["has_bias"] = len(results["bias_categories"]) > 0
+        batch.append(results)
+
+    confirmed = [None] * len(texts)
+    if linguistic_filter is not None:
+        lexicon = get_compiled_lexicon()
+        matches = [
+            lexicon_matches(text, lexicon, results["bias_categories"]) if results["has_bias"]
+            else MatchArray(text, categories=lexicon.categories)
+            for text, results in zip(texts, batch)
+        ]
+        confirmed = linguistic_filter.filter(texts, matches)
+        batch = [
+            discount_results(results, text_matches, text_confirmed)
+            for results, text_matches, text_confirmed in zip(batch, matches, confirmed)
+        ]
+
+    outputs = []
+    for text, item_options, results, text_confirmed in zip(texts, options, batch, confirmed):
+        highlights = []
+        if item_options.get("include_highlights", True) and results["has_bias"]:
+            if text_confirmed is None:
+                text_confirmed = highlight_matches(
+                    text, results["bias_categories"], get_compiled_lexicon(), cache, lexicon_version
+                )
+            highlights = text_confirmed.to_highlights()
+
+        outputs.append({
+            "has_bias": results["has_bias"],
+            "bias_categories": results["bias_categories"],
+            "bias_scores": results["bias_scores"],
+            "severity": results["severity"],
+            "overall_score": results.get("overall_score"),
+            "highlights": highlights
+        })
+    return outputs
+
+def member_result(result: Dict, text: str, options: Dict, cache=None,
+                  lexicon_version: Optional[str] = None) -> Dict:
+    """
+    Result of a duplicate-cluster member from its representative's result
+
+    Scores and categories are shared; highlights are recomputed on the
+    member's own text so their offsets are correct.
+    """
+    highlights = []
+    if options.get("include_highlights", True) and result["has_bias"]:
+        highlights = highlight_matches(
+            text, result["bias_categories"], get_compiled_lexicon(), cache, lexicon_version
+        ).to_highlights()
+    return dict(result, highlights=highlights)
+
+def group_job(job: Dict, lexicon=None) -> List[int]:
+    """
+    Duplicate-cluster assignments for a job claimed with claim_grouping
+
+    Near-duplicates only share their representative's outcome when they
+    match the same lexicon terms; the others are scored on their own.
+    """
+    deduplicator = Deduplicator(
+        job["options"].get("dedup_threshold") or config.DEDUP_THRESHOLD,
+        num_perm=config.DEDUP_NUM_PERM,
+        shingle_size=config.DEDUP_SHINGLE_SIZE
+    )
+    texts = job["texts"]
+    return confirm_assignments(texts, deduplicator.assign(texts), lexicon or get_compiled_lexicon())
+
+def _worker_main(db_path: str, stop_event, chunk_size: int, poll_interval: float,
+                 lease_seconds: float, max_attempts: int):
+    """Entry point of a job worker process"""
+    from app.models.bias_detector import bias_detector
+    from app.utils.batch_scoring import get_batch_scorer
+    from app.utils.detection_cache import get_detection_cache
+    from app.utils.lexicon import get_lexicon_version
+    from app.utils.linguistic import get_linguistic_filter
+    from app.utils.results_store import results_store
+
+    cache = get_detection_cache()
+    linguistic_filter = get_linguistic_filter()
+    scorer = get_batch_scorer() if config.BATCH_SCORING_FOR_JOBS else None
+    if scorer is not None and not scorer.calibrated:
+        logger.warning("BATCH_SCORING_FOR_JOBS is set but no calibrated weights are loaded; using the detector")
+        scorer = None
+    job_queue = JobQueue(db_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    while not stop_event.is_set():
+        try:
+            job = job_queue.claim_grouping()
+            if job is not None:
+                try:
+                    assignments = group_job(job)
+                except Exception:
+                    logger.exception("Grouping job %s failed; scoring every text", job["job_id"])
+                    assignments = list(range(len(job["texts"])))
+                job_queue.group(job["job_id"], assignments)
+            items = job_queue.claim(chunk_size)
+        except sqlite3.OperationalError as e:
+            logger.warning("Job queue unavailable: %s", e)
+            stop_event.wait(poll_interval)
+            continue
+
+        if not items:
+            stop_event.wait(poll_interval)
+            continue
+
+        texts = [item["text"] for item in items]
+        try:
+            results = process_job_items(
+                texts, [item["options"] for item in items], bias_detector,
+                cache=cache, lexicon_version=get_lexicon_version(), linguistic_filter=linguistic_filter,
+                scorer=scorer
+            )
+        except Exception:
+            # Fall back to one item at a time so a bad item only fails itself
+            logger.exception("Batch of %d job items failed; retrying individually", len(items))
+            results = None
+
+        outcomes = []
+        for i, item in enumerate(items):
+            try:
+                result = results[i] if results is not None else process_job_item(
+                    item["text"], item["options"], bias_detector,
+                    cache=cache, lexicon_version=get_lexicon_version(), linguistic_filter=linguistic_filter
+                )
+                # Members first, so they are not finished with the representative's highlights
+                shared = [
+                    (member, member_result(
+                        result, member["text"], item["options"], cache=cache, lexicon_version=get_lexicon_version()
+                    ))
+                    for member in item["members"]
+                ]
+                for member, member_outcome in shared:
+                    outcomes.append({"job_id": item["job_id"], "idx": member["idx"], "result": member_outcome})
+                outcomes.append({"job_id": item["job_id"], "idx": item["idx"], "result": result})
+                if results_store is not None:
+                    for member, member_outcome in shared:
+                        results_store.record(member["text"], member_outcome, get_lexicon_version(), source="job")
+                    results_store.record(item["text"], result, get_lexicon_version(), source="job")
+            except Exception as e:
+                logger.exception("Job item %s/%s failed", item["job_id"], item["idx"])
+                outcomes.append({"job_id": item["job_id"], "idx": item["idx"], "error": str(e)})
+        job_queue.complete(outcomes)
+
+    if results_store is not None:
+        results_store.close()
+
+class JobWorkerPool:
+    """Pool of worker processes draining a JobQueue"""
+
+    def __init__(self, db_path: str, processes: int = 2, chunk_size: int = 16,
+                 poll_interval: float = 0.5, lease_seconds: float = 120, max_attempts: int = 3):
+        self.db_path = db_path
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = None
+        self._workers: List[multiprocessing.Process] = []
+
+    def start(self):
+        """Start the worker processes"""
+        if self._workers:
+            return
+        self._stop_event = self._context.Event()
+        for i in range(self.processes):
+            worker = self._context.Process(
+                target=_worker_main,
+                args=(self.db_path, self._stop_event, self.chunk_size, self.poll_interval,
+                      self.lease_seconds, self.max_attempts),
+                name=f"job-worker-{i}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = 10):
+        """Ask workers to finish their current chunk and exit"""
+        if not self._workers:
+            return
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                # Its leased items are picked up again after restart
+                worker.terminate()
+        self._workers = []
+
+_job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """Shared JobQueue for the configured database"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            config.JOBS_DB_PATH,
+            lease_seconds=config.JOB_LEASE_SECONDS,
+            max_attempts=config.JOB_MAX_ATTEMPTS
+        )
+    return _job_queue
+
+def create_worker_pool() -> JobWorkerPool:
+    """Worker pool configured from environment settings"""
+    return JobWorkerPool(
+        config.JOBS_DB_PATH,
+        processes=config.JOB_WORKERS,
+        chunk_size=config.JOB_CHUNK_SIZE,
+        lease_seconds=config.JOB_LEASE_SECONDS,
+        max_attempts=config.JOB_MAX_ATTEMPTS
+    )
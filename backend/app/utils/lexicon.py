@@ -0,0 +1,37 @@
+import hashlib
+import json
+from typing import Dict
+
+# Version of the code that turns a text and a lexicon into results (detector,
+# matcher, tokenization and term normalization). Bump it whenever a change
+# alters results, so persisted cache entries and ETags from older code are
+# never served again.
+# 2: shared Unicode-aware tokenizer (app.utils.normalization)
+ENGINE_VERSION = 2
+
+def compute_lexicon_version(lexicons: Dict) -> str:
+    """
+    Compute a short, deterministic version id for a lexicon
+
+    Args:
+        lexicons: Lexicon dictionary (category -> groups -> terms)
+
+    Returns:
+        12 character hex digest of the canonical JSON form
+    """
+    canonical = json.dumps(lexicons, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+_default_version = None
+
+def get_lexicon_version() -> str:
+    """Version id of the lexicon loaded by the shared bias detector"""
+    global _default_version
+    if _default_version is None:
+        from app.models.bias_detector import bias_detector
+        _default_version = compute_lexicon_version(bias_detector.bias_lexicons)
+    return _default_version
+
+def hash_text(text: str) -> str:
+    """SHA-256 hex digest of a text, used to identify analyses without storing them"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
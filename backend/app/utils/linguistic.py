@@ -0,0 +1,183 @@
+"""
+Optional spaCy stage that confirms or discounts lexicon hits
+
+Bare lexicon hits such as "black car", "a 40 years old house" or a generic
+"they" are false positives. For texts that have lexicon hits, this stage
+parses them with a small spaCy pipeline (tagger and parser only) and keeps
+a hit only when its part of speech and dependency context fit a reference
+to people. Texts without hits never reach spaCy.
+"""
+import logging
+from typing import Dict, List, Optional, Set
+
+from app import config
+from app.utils.matches import MatchArray
+from app.utils.metrics import calculate_bias_severity, calculate_overall_bias_score
+
+logger = logging.getLogger(__name__)
+
+# Components the stage does not need; disabling them roughly halves parse time
+DISABLED_COMPONENTS = ["ner", "lemmatizer", "textcat", "senter"]
+
+PERSON_NOUNS = {
+    "people", "person", "persons", "man", "men", "woman", "women", "boy", "boys", "girl", "girls",
+    "child", "children", "kid", "kids", "guy", "guys", "lady", "ladies", "student", "students",
+    "worker", "workers", "employee", "employees", "applicant", "applicants", "candidate", "candidates",
+    "family", "families", "community", "communities", "neighbor", "neighbors", "youth", "youths",
+    "immigrant", "immigrants", "citizen", "citizens", "voter", "voters", "folk", "folks", "individual",
+    "individuals", "population", "group", "groups", "parent", "parents", "adult", "adults",
+    "teenager", "teenagers", "resident", "residents", "population", "staff", "team", "colleague",
+    "colleagues", "leader", "leaders", "member", "members", "patient", "patients"
+}
+
+# Lexicon groups whose pronoun hits are too generic to count on their own
+PRONOUN_DISCOUNT_GROUPS = ("race.coded_language",)
+
+class LinguisticFilter:
+    """
+    Confirms lexicon hits from part-of-speech and dependency context
+
+    The spaCy pipeline is loaded on first use. Texts are parsed with
+    nlp.pipe in batches; bulk callers can pass n_process > 1 to parse in
+    several processes.
+    """
+
+    def __init__(self, model_name: str = "en_core_web_sm", batch_size: int = 64,
+                 n_process: int = 1, lexicon=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self._lexicon = lexicon
+        self._nlp = None
+        self._person_nouns: Optional[Set[str]] = None
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            import spacy
+
+            self._nlp = spacy.load(self.model_name, disable=DISABLED_COMPONENTS)
+            logger.info("Loaded spaCy pipeline %s (%s)", self.model_name, ", ".join(self._nlp.pipe_names))
+        return self._nlp
+
+    @property
+    def lexicon(self):
+        if self._lexicon is None:
+            from app.utils.compiled_lexicon import get_compiled_lexicon
+            self._lexicon = get_compiled_lexicon()
+        return self._lexicon
+
+    @property
+    def person_nouns(self) -> Set[str]:
+        # Occupations and gendered nouns from the lexicon also refer to people
+        if self._person_nouns is None:
+            nouns = set(PERSON_NOUNS)
+            lexicon = self.lexicon
+            for term_id in range(lexicon.n_terms):
+                groups = [lexicon.groups[g] for g in lexicon.term_groups(term_id)]
+                if any(g.endswith(("occupations", "male_terms", "female_terms")) for g in groups):
+                    nouns.add(lexicon.term(term_id))
+            self._person_nouns = nouns
+        return self._person_nouns
+
+    def filter(self, texts: List[str], matches: List[MatchArray],
+               n_process: Optional[int] = None, lexicon=None) -> List[MatchArray]:
+        """
+        Keep only confirmed hits
+
+        Args:
+            texts: Texts the matches were found in
+            matches: Lexicon matches per text (e.g. from lexicon_matches)
+            n_process: Parser processes (default: the filter's n_process)
+            lexicon: CompiledLexicon the matches' term ids refer to (default:
+                the filter's lexicon)
+
+        Returns:
+            Confirmed matches per text; texts without hits are returned as is
+        """
+        pending = [i for i, text_matches in enumerate(matches) if len(text_matches)]
+        confirmed = list(matches)
+        if not pending:
+            return confirmed
+
+        docs = self.nlp.pipe(
+            (texts[i] for i in pending),
+            batch_size=self.batch_size,
+            n_process=n_process or self.n_process
+        )
+        lexicon = lexicon or self.lexicon
+        for i, doc in zip(pending, docs):
+            confirmed[i] = self._filter_doc(doc, matches[i], lexicon)
+        return confirmed
+
+    def _filter_doc(self, doc, matches: MatchArray, lexicon) -> MatchArray:
+        kept = MatchArray(matches.text, matches.terms, matches.categories)
+        for start, end, term_id, category_id in matches:
+            span = doc.char_span(start, end, alignment_mode="expand")
+            if span is None or self._confirmed(span.root, term_id, lexicon):
+                kept.append(start, end, term_id, category_id)
+        return kept
+
+    def _confirmed(self, token, term_id: int, lexicon) -> bool:
+        if token.pos_ == "PRON":
+            if term_id < 0:
+                return True
+            groups = [lexicon.groups[g] for g in lexicon.term_groups(term_id)]
+            return not any(g.startswith(PRONOUN_DISCOUNT_GROUPS) for g in groups)
+
+        if token.pos_ == "ADJ":
+            # "40 years old", "two weeks old"
+            if any(child.dep_ == "npadvmod" for child in token.children):
+                return False
+            if token.dep_ == "amod":
+                return self._refers_to_person(token.head)
+            if token.dep_ in ("acomp", "attr"):
+                subjects = [child for child in token.head.children if child.dep_ in ("nsubj", "nsubjpass")]
+                if subjects:
+                    return self._refers_to_person(subjects[0])
+        return True
+
+    def _refers_to_person(self, token) -> bool:
+        return token.pos_ in ("PRON", "PROPN") or token.lower_ in self.person_nouns
+
+def discount_results(results: Dict, matches: MatchArray, confirmed: MatchArray) -> Dict:
+    """
+    Drop categories whose lexicon hits were all discounted
+
+    Categories without any lexicon hit in `matches` (e.g. flagged by other
+    detector rules) are kept. Severity and overall score are recomputed
+    from the remaining category scores.
+
+    Returns:
+        Updated copy of results, with 'discounted_categories' listing the
+        categories that were dropped
+    """
+    hit = {matches.categories[c] for c in matches.category_ids}
+    kept = {confirmed.categories[c] for c in confirmed.category_ids}
+    dropped = [cat for cat in results["bias_categories"] if cat in hit and cat not in kept]
+
+    updated = dict(results, discounted_categories=dropped)
+    if not dropped:
+        return updated
+
+    updated["bias_categories"] = [cat for cat in results["bias_categories"] if cat not in dropped]
+    updated["bias_scores"] = {
+        cat: score for cat, score in results["bias_scores"].items() if cat not in dropped
+    }
+    updated["has_bias"] = len(updated["bias_categories"]) > 0
+    updated["severity"] = calculate_bias_severity(updated["bias_scores"]) if updated["has_bias"] else "none"
+    updated["overall_score"] = calculate_overall_bias_score(updated["bias_scores"])
+    return updated
+
+_linguistic_filter = None
+
+def get_linguistic_filter() -> Optional[LinguisticFilter]:
+    """Shared filter, or None when the linguistic stage is disabled"""
+    global _linguistic_filter
+    if _linguistic_filter is None and config.LINGUISTIC_FILTER_ENABLED:
+        _linguistic_filter = LinguisticFilter(
+            config.SPACY_MODEL,
+            batch_size=config.SPACY_BATCH_SIZE,
+            n_process=config.SPACY_N_PROCESS
+        )
+    return _linguistic_filter
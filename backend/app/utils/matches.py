@@ -0,0 +1,162 @@
+"""
+Compact, array-backed match records
+
+Highlighting a dense document used to allocate a dict (plus a sliced context
+string) per match. MatchArray keeps matches as parallel integer arrays of
+start, end, term id and category id; term and context strings are only
+materialized when the matches are serialized.
+"""
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTEXT_CHARS = 30
+
+class MatchArray:
+    """Matches in one text as parallel arrays"""
+
+    __slots__ = ("text", "terms", "categories", "starts", "ends", "term_ids", "category_ids")
+
+    def __init__(self, text: str, terms: Optional[Sequence[str]] = None,
+                 categories: Optional[Sequence[Optional[str]]] = None):
+        """
+        Args:
+            text: Text the offsets refer to
+            terms: Term strings indexed by term id (None: use the matched text)
+            categories: Category names indexed by category id
+        """
+        self.text = text
+        self.terms = terms
+        self.categories = categories if categories is not None else [None]
+        self.starts = array("i")
+        self.ends = array("i")
+        self.term_ids = array("i")
+        self.category_ids = array("i")
+
+    def append(self, start: int, end: int, term_id: int = -1, category_id: int = 0):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.term_ids.append(term_id)
+        self.category_ids.append(category_id)
+
+    def extend(self, other: "MatchArray", offset: int = 0):
+        """Append matches found in a chunk of this text that starts at `offset`"""
+        if offset:
+            self.starts.extend(start + offset for start in other.starts)
+            self.ends.extend(end + offset for end in other.ends)
+        else:
+            self.starts.extend(other.starts)
+            self.ends.extend(other.ends)
+        self.term_ids.extend(other.term_ids)
+        self.category_ids.extend(other.category_ids)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def sort(self):
+        """Order matches by start offset (stable)"""
+        starts = self.starts
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        if all(order[i] == i for i in range(len(order))):
+            return
+        for name in ("starts", "ends", "term_ids", "category_ids"):
+            column = getattr(self, name)
+            setattr(self, name, array("i", (column[i] for i in order)))
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int, int]]:
+        return zip(self.starts, self.ends, self.term_ids, self.category_ids)
+
+    def _term(self, start: int, end: int, term_id: int) -> str:
+        if self.terms is not None and term_id >= 0:
+            return self.terms[term_id]
+        return self.text[start:end]
+
+    def to_highlights(self, highlight_format: str = "full") -> List[Dict]:
+        """
+        Materialize highlight dicts
+
+        full: term, category, offsets and a context snippet
+        compact: term, category and offsets
+        offsets: category and offsets only
+        """
+        text, categories = self.text, self.categories
+        if highlight_format == "offsets":
+            return [
+                {"start": start, "end": end, "category": categories[category_id]}
+                for start, end, _, category_id in self
+            ]
+
+        highlights = []
+        for start, end, term_id, category_id in self:
+            highlight = {"term": self._term(start, end, term_id), "start": start, "end": end}
+            if categories[category_id] is not None:
+                highlight["category"] = categories[category_id]
+            if highlight_format == "full":
+                highlight["context"] = text[max(0, start - CONTEXT_CHARS):min(len(text), end + CONTEXT_CHARS)]
+            highlights.append(highlight)
+        return highlights
+
+    def to_columns(self) -> Dict:
+        """Compact JSON-serializable form (e.g. for caching); text is not included"""
+        return {
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "term_ids": self.term_ids.tolist(),
+            "category_ids": self.category_ids.tolist()
+        }
+
+    @classmethod
+    def from_columns(cls, text: str, columns: Dict, terms: Optional[Sequence[str]] = None,
+                     categories: Optional[Sequence[Optional[str]]] = None) -> "MatchArray":
+        matches = cls(text, terms, categories)
+        matches.starts = array("i", columns["starts"])
+        matches.ends = array("i", columns["ends"])
+        matches.term_ids = array("i", columns["term_ids"])
+        matches.category_ids = array("i", columns["category_ids"])
+        return matches
+
+def lexicon_matches(text: str, lexicon, categories: Optional[List[str]] = None) -> MatchArray:
+    """
+    Lexicon terms in text as a MatchArray
+
+    A term that belongs to several of the selected categories yields one
+    match per category, like highlight_biased_terms.
+
+    Args:
+        text: Text to scan
+        lexicon: CompiledLexicon
+        categories: Categories to report (default: all)
+
+    Returns:
+        Matches ordered by start offset; terms are the matched text
+    """
+    wanted = None
+    if categories is not None:
+        wanted = {lexicon.category_ids[name] for name in categories if name in lexicon.category_ids}
+
+    matches = MatchArray(text, categories=lexicon.categories)
+    group_categories = lexicon.group_categories
+    for _, start, end, term_id in lexicon.find_token_matches(text):
+        seen = set()
+        for group_id in lexicon.term_groups(term_id):
+            category_id = group_categories[group_id]
+            if category_id in seen or (wanted is not None and category_id not in wanted):
+                continue
+            seen.add(category_id)
+            matches.append(start, end, term_id, category_id)
+    return matches
+
+def highlight_matches(text: str, categories: List[str], lexicon, cache=None,
+                      lexicon_version: Optional[str] = None) -> MatchArray:
+    """
+    lexicon_matches for the categories, through the detection cache if given
+
+    The cache holds the integer columns only, not per-match dicts.
+    """
+    if cache is None:
+        return lexicon_matches(text, lexicon, categories)
+
+    from app.utils.detection_cache import make_key
+
+    key = make_key("highlight_matches", text, lexicon_version, ",".join(sorted(categories)))
+    columns = cache.get_or_compute(key, lambda: lexicon_matches(text, lexicon, categories).to_columns())
+    return MatchArray.from_columns(text, columns, categories=lexicon.categories)
@@ -0,0 +1,254 @@
+"""
+Memory diagnostics for long-running workers
+
+Process RSS and garbage collector counters are cheap and reported on every
+/metrics call, so growth can be tracked over days. The expensive views are
+admin-only (see app.routes.memory):
+    - sizes of the caches and lexicon structures, to see which one grows
+    - tracemalloc snapshots and a diff of the top allocation sites between
+      two of them, to find what allocates the memory that is not released
+
+tracemalloc slows allocation down noticeably, so it only runs between the
+first snapshot request and an explicit stop (or from process start when
+PYTHONTRACEMALLOC is set).
+"""
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app import config
+
+def _proc_status() -> Dict[str, int]:
+    """VmRSS/VmHWM from /proc/self/status in bytes (Linux only)"""
+    values = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    name, amount, _ = line.split()
+                    values[name.rstrip(":")] = int(amount) * 1024
+    except OSError:
+        pass
+    return values
+
+def process_memory() -> Dict:
+    """
+    Resident set size of this process
+
+    Returns:
+        Current and peak RSS in bytes (current is None where /proc is not
+        available)
+    """
+    status = _proc_status()
+    peak = status.get("VmHWM")
+    if peak is None:
+        import resource
+
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = maxrss if sys.platform == "darwin" else maxrss * 1024
+    return {"pid": os.getpid(), "rss_bytes": status.get("VmRSS"), "peak_rss_bytes": peak}
+
+def gc_stats() -> Dict:
+    """Garbage collector counters per generation"""
+    return {
+        "enabled": gc.isenabled(),
+        "counts": list(gc.get_count()),
+        "thresholds": list(gc.get_threshold()),
+        "generations": gc.get_stats(),
+        "uncollectable": len(gc.garbage)
+    }
+
+def deep_sizeof(obj, limit: int = 1_000_000) -> int:
+    """
+    Approximate bytes held by an object and everything it references
+
+    Containers and instance attributes are followed (not modules, classes or
+    functions); shared objects are counted once.
+
+    Args:
+        obj: Root object
+        limit: Stop after this many objects (the result is then a lower bound)
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, (type, types.ModuleType)) or callable(current):
+            continue
+        seen.add(id(current))
+        # numpy arrays include their buffer in __sizeof__
+        total += sys.getsizeof(current, 0)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+        for slot in getattr(type(current), "__slots__", ()):
+            if hasattr(current, slot):
+                stack.append(getattr(current, slot))
+    return total
+
+def component_sizes() -> Dict:
+    """
+    Memory held by this worker's caches and lexicon structures
+
+    Returns:
+        Bytes (and entry counts) per component; components that are
+        disabled are None
+    """
+    from app.models.bias_detector import bias_detector
+    from app.utils.compiled_lexicon import get_compiled_lexicon
+    from app.utils.detection_cache import get_detection_cache
+    from app.utils.sentence_cache import get_sentence_cache
+    from app.utils.tenant_lexicons import get_tenant_registry
+
+    compiled = get_compiled_lexicon()
+    detection_cache = get_detection_cache()
+    sentence_cache = get_sentence_cache()
+    registry = get_tenant_registry()
+    tenant_lexicons = registry.cached()
+
+    l2 = None
+    if detection_cache is not None and detection_cache.l2 is not None:
+        path = detection_cache.l2.path
+        l2 = {
+            "entries": detection_cache.l2.count(),
+            "disk_bytes": sum(
+                os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p)
+            )
+        }
+    return {
+        "detector_lexicons_bytes": deep_sizeof(bias_detector.bias_lexicons),
+        "compiled_lexicon": {
+            "bytes": compiled.size_bytes,
+            # Mapped pages are shared by every worker and only resident once touched
+            "memory_mapped": compiled.info()["memory_mapped"]
+        },
+        "detection_cache": {
+            "l1": {"entries": len(detection_cache.l1), "bytes": detection_cache.l1.memory_bytes()},
+            "l2": l2
+        } if detection_cache is not None else None,
+        "sentence_cache": {
+            "entries": len(sentence_cache), "bytes": sentence_cache.lru.memory_bytes()
+        } if sentence_cache is not None else None,
+        "tenant_lexicons": {
+            "entries": len(tenant_lexicons),
+            "compiled_bytes": sum(lexicon.compiled.size_bytes for lexicon in tenant_lexicons),
+            "lexicons_bytes": sum(deep_sizeof(lexicon.detector.bias_lexicons) for lexicon in tenant_lexicons)
+        }
+    }
+
+def _statistic(stat) -> Dict:
+    frame = stat.traceback[0]
+    return {"file": frame.filename, "line": frame.lineno, "size_bytes": stat.size, "count": stat.count}
+
+def _statistic_diff(stat) -> Dict:
+    return dict(_statistic(stat), size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+
+class SnapshotStore:
+    """
+    tracemalloc snapshots of this worker, kept in memory
+
+    Args:
+        max_snapshots: Snapshots kept before the oldest is dropped
+        frames: Stack frames recorded per allocation when tracing starts
+    """
+
+    def __init__(self, max_snapshots: int = 4, frames: int = 1):
+        self.max_snapshots = max_snapshots
+        self.frames = frames
+        self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._taken_at: Dict[int, float] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def take(self, top: int = 25) -> Dict:
+        """
+        Start tracing if needed and snapshot current allocations
+
+        Allocations made before tracing started are not visible, so the
+        first snapshot is a baseline to diff later ones against.
+
+        Returns:
+            Snapshot ID, traced memory and the top allocation sites
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        taken_at = time.time()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = snapshot
+            self._taken_at[snapshot_id] = taken_at
+            while len(self._snapshots) > self.max_snapshots:
+                dropped, _ = self._snapshots.popitem(last=False)
+                self._taken_at.pop(dropped, None)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "snapshot_id": snapshot_id,
+            "taken_at": taken_at,
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": [_statistic(stat) for stat in snapshot.statistics("lineno")[:top]]
+        }
+
+    def diff(self, base_id: int, current_id: int, top: int = 25) -> Optional[Dict]:
+        """
+        Allocation sites that grew the most between two snapshots
+
+        Returns:
+            Total growth and the top sites by size difference, or None if
+            either snapshot does not exist
+        """
+        with self._lock:
+            base = self._snapshots.get(base_id)
+            current = self._snapshots.get(current_id)
+            if base is None or current is None:
+                return None
+            seconds = self._taken_at[current_id] - self._taken_at[base_id]
+        stats = current.compare_to(base, "lineno")
+        return {
+            "base": base_id,
+            "current": current_id,
+            "seconds": round(seconds, 3),
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "top": [_statistic_diff(stat) for stat in stats[:top]]
+        }
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [{"snapshot_id": sid, "taken_at": self._taken_at[sid]} for sid in self._snapshots]
+
+    def stop(self):
+        """Stop tracing and drop all snapshots"""
+        with self._lock:
+            self._snapshots.clear()
+            self._taken_at.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def status(self) -> Dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "snapshots": self.list()
+        }
+
+snapshot_store = SnapshotStore(config.MEMORY_MAX_SNAPSHOTS, config.TRACEMALLOC_FRAMES)
@@ -1,3 +1,4 @@
+import threading
 from typing import Dict, List
 import numpy as np
 from sklearn.metrics import precision_score, recall_score, f1_score, confusion_matrix
@@ -169,7 +170,233 @@ def calculate_confidence_interval(scores: List[float], confidence: float = 0.95)
     n = len(scores)
     
     # Calculate margin of error
-    z_score = 1.96 if confidence == 0.95 else 2.576  # for 95% or 99%
-    margin = z_score * (std / np.sqrt(n))
+    margin = _z_score(confidence) * (std / np.sqrt(n))
     
     return (round(mean - margin, 3), round(mean + margin, 3))
+
+def calculate_proportion_confidence_interval(proportion: float, n: float, confidence: float = 0.95) -> tuple:
+    """
+    Wilson score interval for a proportion
+
+    Unlike the normal approximation used by calculate_confidence_interval,
+    the interval stays inside [0, 1] and does not collapse to a point for
+    proportions of 0 or 1, which matters for rare bias categories.
+
+    Args:
+        proportion: Observed (or estimated) proportion
+        n: Sample size; for weighted estimates such as stratified samples,
+            the effective sample size p(1-p)/variance
+        confidence: Confidence level (default 0.95)
+
+    Returns:
+        Tuple of (lower_bound, upper_bound)
+    """
+    if n <= 0:
+        return (0, 1)
+
+    z = _z_score(confidence)
+    denominator = 1 + z * z / n
+    center = (proportion + z * z / (2 * n)) / denominator
+    margin = z / denominator * float(np.sqrt(proportion * (1 - proportion) / n + z * z / (4 * n * n)))
+
+    return (round(max(0.0, center - margin), 4), round(min(1.0, center + margin), 4))
+
+def _z_score(confidence: float) -> float:
+    """Two-sided z-score for the supported confidence levels"""
+    return 1.96 if confidence == 0.95 else 2.576  # for 95% or 99%
+
+class RunningStats:
+    """
+    Online count/mean/variance accumulator (Welford's algorithm)
+
+    Updates are O(1) and two accumulators can be merged exactly, so partial
+    statistics from separate worker processes can be combined.
+    """
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float) -> None:
+        """Add a single observation"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Merge another accumulator into this one (Chan et al.)"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return self
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Population variance (matches np.var)"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (matches np.std)"""
+        return float(np.sqrt(self.variance))
+
+    def confidence_interval(self, confidence: float = 0.95) -> tuple:
+        """
+        Confidence interval for the running mean
+
+        Args:
+            confidence: Confidence level (default 0.95)
+
+        Returns:
+            Tuple of (lower_bound, upper_bound), same as calculate_confidence_interval
+        """
+        if self.count == 0:
+            return (0, 0)
+
+        margin = _z_score(confidence) * (self.std / np.sqrt(self.count))
+        return (round(self.mean - margin, 3), round(self.mean + margin, 3))
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> 'RunningStats':
+        return cls(int(data['count']), float(data['mean']), float(data['m2']))
+
+class StreamingAggregator:
+    """
+    Streaming counterpart of aggregate_scores / calculate_category_distribution
+
+    Keeps per-category RunningStats, category and severity counts for an
+    unbounded stream of detection results without storing them. A category
+    missing from a detection counts as a score of 0, as in aggregate_scores.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.category_stats: Dict[str, RunningStats] = {}
+        self.distribution: Dict[str, int] = {}
+        self.severity_counts: Dict[str, int] = {}
+
+    def update(self, detection: Dict) -> None:
+        """
+        Add one detection result (output of detect_lexicon_bias)
+
+        Cost is O(number of categories), independent of stream length.
+        """
+        scores = detection.get('bias_scores', {}) or {}
+
+        for category in scores:
+            if category not in self.category_stats:
+                # Backfill the zeros this category had in earlier detections
+                self.category_stats[category] = RunningStats(count=self.count)
+
+        for category, stats in self.category_stats.items():
+            stats.update(float(scores.get(category, 0)))
+
+        for category in detection.get('bias_categories', []):
+            self.distribution[category] = self.distribution.get(category, 0) + 1
+
+        severity = detection.get('severity')
+        if severity:
+            self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+
+        self.count += 1
+
+    def merge(self, other: 'StreamingAggregator') -> 'StreamingAggregator':
+        """Merge the state of another aggregator (e.g. from another worker)"""
+        for category in set(self.category_stats) | set(other.category_stats):
+            mine = self.category_stats.get(category) or RunningStats(count=self.count)
+            theirs = other.category_stats.get(category) or RunningStats(count=other.count)
+            self.category_stats[category] = mine.merge(RunningStats(theirs.count, theirs.mean, theirs.m2))
+
+        for category, n in other.distribution.items():
+            self.distribution[category] = self.distribution.get(category, 0) + n
+        for severity, n in other.severity_counts.items():
+            self.severity_counts[severity] = self.severity_counts.get(severity, 0) + n
+
+        self.count += other.count
+        return self
+
+    def aggregate_scores(self) -> Dict[str, float]:
+        """Average score per category, same as aggregate_scores over the stream"""
+        return {category: round(stats.mean, 3) for category, stats in self.category_stats.items()}
+
+    def confidence_intervals(self, confidence: float = 0.95) -> Dict[str, tuple]:
+        """Confidence interval of the mean score per category"""
+        return {
+            category: stats.confidence_interval(confidence)
+            for category, stats in self.category_stats.items()
+        }
+
+    def bias_rates(self) -> Dict[str, float]:
+        """Fraction of detections flagged for each category"""
+        if self.count == 0:
+            return {}
+        return {category: round(n / self.count, 3) for category, n in self.distribution.items()}
+
+    def summary(self, confidence: float = 0.95) -> Dict:
+        """Snapshot suitable for a dashboard or JSON response"""
+        return {
+            'count': self.count,
+            'mean_scores': self.aggregate_scores(),
+            'confidence_intervals': {
+                category: list(interval)
+                for category, interval in self.confidence_intervals(confidence).items()
+            },
+            'category_distribution': dict(self.distribution),
+            'bias_rates': self.bias_rates(),
+            'severity_distribution': dict(self.severity_counts)
+        }
+
+    def to_dict(self) -> Dict:
+        """Serializable state, e.g. for sending between worker processes"""
+        return {
+            'count': self.count,
+            'category_stats': {c: s.to_dict() for c, s in self.category_stats.items()},
+            'distribution': dict(self.distribution),
+            'severity_counts': dict(self.severity_counts)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StreamingAggregator':
+        aggregator = cls()
+        aggregator.count = int(data.get('count', 0))
+        aggregator.category_stats = {
+            c: RunningStats.from_dict(s) for c, s in data.get('category_stats', {}).items()
+        }
+        aggregator.distribution = dict(data.get('distribution', {}))
+        aggregator.severity_counts = dict(data.get('severity_counts', {}))
+        return aggregator
+
+_detection_stats = StreamingAggregator()
+_detection_stats_lock = threading.Lock()
+_not_modified = 0
+
+def record_detection(detection: Dict) -> None:
+    """Add a served detection result to this worker's streaming aggregates"""
+    with _detection_stats_lock:
+        _detection_stats.update(detection)
+
+def record_not_modified() -> None:
+    """Count a detection request answered with 304, which has no result to aggregate"""
+    global _not_modified
+    with _detection_stats_lock:
+        _not_modified += 1
+
+def detection_summary(confidence: float = 0.95) -> Dict:
+    """Streaming aggregates of the detections served by this worker, plus the 304 count"""
+    with _detection_stats_lock:
+        return dict(_detection_stats.summary(confidence), not_modified=_not_modified)
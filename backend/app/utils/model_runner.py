@@ -0,0 +1,144 @@
+import logging
+import time
+from typing import Dict, List, Optional
+
+from app.utils.text_processing import get_sentences
+
+logger = logging.getLogger(__name__)
+
+class ModelRunner:
+    """
+    Transformer text classifier loaded on demand
+
+    transformers/torch are imported in load() so that importing this module
+    (and the app) stays cheap when no model is configured.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", max_length: int = 512):
+        self.model_name = model_name
+        self.device = device
+        self.max_length = max_length
+        self.pipeline = None
+        self.load_ms: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.pipeline is not None
+
+    @property
+    def version(self) -> str:
+        """Model name, weights revision and max length; cached outputs are only reused within a version"""
+        revision = getattr(getattr(getattr(self.pipeline, "model", None), "config", None), "_commit_hash", None)
+        return f"{self.model_name}@{revision or 'local'}:{self.max_length}"
+
+    def load(self):
+        """Load tokenizer and model weights"""
+        from transformers import pipeline
+
+        started = time.perf_counter()
+        self.pipeline = pipeline(
+            "text-classification",
+            model=self.model_name,
+            device=self.device,
+            truncation=True,
+            max_length=self.max_length
+        )
+        self.load_ms = (time.perf_counter() - started) * 1000
+        logger.info("Loaded model %s in %.0f ms", self.model_name, self.load_ms)
+
+    def warmup(self, texts: List[str], batch_size: int = 8):
+        """Run a dummy batch so the first real request does not pay for lazy initialization"""
+        self.predict(texts, batch_size=batch_size)
+
+    def predict(self, texts: List[str], batch_size: int = 8) -> List[Dict]:
+        """
+        Classify texts
+
+        Args:
+            texts: Texts to classify
+            batch_size: Texts per forward pass
+
+        Returns:
+            List of {'label', 'score'} dicts, one per text
+        """
+        if self.pipeline is None:
+            raise RuntimeError("Model is not loaded")
+        predictions = self.pipeline(texts, batch_size=batch_size)
+        return [
+            {"label": prediction["label"], "score": round(float(prediction["score"]), 4)}
+            for prediction in predictions
+        ]
+
+    def predict_distributions(self, texts: List[str], batch_size: int = 8) -> List[Dict[str, float]]:
+        """
+        Probability of every label for each text
+
+        Returns:
+            List of {label: probability} dicts, one per text
+        """
+        if self.pipeline is None:
+            raise RuntimeError("Model is not loaded")
+        predictions = self.pipeline(texts, batch_size=batch_size, top_k=None)
+        return [
+            {prediction["label"]: float(prediction["score"]) for prediction in labels}
+            for labels in predictions
+        ]
+
+    def predict_documents(self, texts: List[str], cache=None, batch_size: int = 8) -> List[Dict]:
+        """
+        Classify texts sentence by sentence, reusing cached sentence outputs
+
+        Each document is split with get_sentences; sentences missing from
+        the cache (deduplicated across the batch) go to inference and are
+        cached. A document's label distribution is the mean of its
+        sentences' distributions weighted by sentence length.
+
+        Args:
+            texts: Texts to classify
+            cache: SentenceCache (None classifies every sentence)
+            batch_size: Sentences per forward pass
+
+        Returns:
+            List of {'label', 'score', 'sentences', 'cached_sentences'}
+            dicts, one per text (cached_sentences did not go to inference)
+        """
+        version = self.version
+        documents = []
+        known: Dict[str, Dict[str, float]] = {}
+        pending: Dict[str, None] = {}
+        for text in texts:
+            sentences = [s.strip() for s in get_sentences(text) if s.strip()] or [text]
+            documents.append(sentences)
+            for sentence in sentences:
+                if sentence in known or sentence in pending:
+                    continue
+                distribution = cache.get(version, sentence) if cache is not None else None
+                if distribution is None:
+                    pending[sentence] = None
+                else:
+                    known[sentence] = distribution
+
+        if pending:
+            sentences = list(pending)
+            for sentence, distribution in zip(sentences, self.predict_distributions(sentences, batch_size=batch_size)):
+                known[sentence] = distribution
+                if cache is not None:
+                    cache.put(version, sentence, distribution)
+
+        results = []
+        for sentences in documents:
+            totals: Dict[str, float] = {}
+            weight_sum = 0
+            for sentence in sentences:
+                weight = len(sentence)
+                weight_sum += weight
+                for label, probability in known[sentence].items():
+                    totals[label] = totals.get(label, 0.0) + weight * probability
+            label = max(totals, key=totals.get)
+            results.append({
+                "label": label,
+                "score": round(totals[label] / weight_sum, 4),
+                "sentences": len(sentences),
+                "cached_sentences": sum(sentence not in pending for sentence in sentences)
+            })
+        return results
@@ -0,0 +1,165 @@
+"""
+Shared text normalization and tokenization
+
+Every stage that looks at words (lexicon matching, highlights, proximity
+patterns, batch scoring, text statistics, request validation) goes through
+this module, so they agree on what a word is:
+
+    - tokens are runs of word characters and combining marks, so a
+      decomposed "café" is one token, as is CJK text without spaces
+    - each token's normalized form is NFKC + casefold, with typographic
+      apostrophes and hyphens mapped to ASCII (translation table built once
+      at import, normalized forms memoized)
+    - offsets always refer to the original text
+    - the gap before each token is classified once as a joiner for
+      multi-word terms: whitespace (" "), a single hyphen ("-") or a single
+      apostrophe ("'"); anything else ends a multi-word term
+
+tokenize() memoizes the last few texts, so the stages of one request share
+a single pass over the text. Vocabularies (e.g. a compiled lexicon's term
+tokens) turn the normalized forms into token IDs once per text.
+"""
+import functools
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from app import config
+
+# Word characters plus combining marks (decomposed accents stay in their word)
+_TOKEN_RE = re.compile(r"(?:\w|[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f])+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_APOSTROPHES = "\u2018\u2019\u02bc\u02b9\u2032\uff07"
+_HYPHENS = "\u2010\u2011\u2012\u2013\u2212\ufe63\uff0d"
+_SOFT_HYPHEN = "\u00ad"
+_FOLD_TABLE = str.maketrans(
+    {**{c: "'" for c in _APOSTROPHES}, **{c: "-" for c in _HYPHENS}, _SOFT_HYPHEN: None}
+)
+
+# Joiner for the common gaps; other gaps are classified by _classify_gap
+_JOINERS = {" ": " ", "-": "-", "'": "'"}
+_JOINERS.update({c: "'" for c in _APOSTROPHES})
+_JOINERS.update({c: "-" for c in _HYPHENS})
+
+def fold(text: str) -> str:
+    """Map typographic apostrophes and hyphens to ASCII and drop soft hyphens"""
+    return text.translate(_FOLD_TABLE)
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a whole text for request validation and cleaning
+
+    Composes characters (NFC), collapses whitespace runs to one space and
+    strips the ends. Case and punctuation are kept, so offsets reported
+    against the result stay meaningful to the client.
+    """
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+@functools.lru_cache(maxsize=65536)
+def normalize_token(token: str) -> str:
+    """Normalized form of a single token (NFKC, folded, casefolded)"""
+    if token.isascii():
+        return token.lower()
+    return fold(unicodedata.normalize("NFKC", token)).casefold()
+
+def _classify_gap(gap: str) -> Optional[str]:
+    joiner = _JOINERS.get(gap)
+    if joiner is not None:
+        return joiner
+    return " " if gap.isspace() else None
+
+class TokenizedText:
+    """
+    Tokens of a text: normalized forms, original offsets and joiners
+
+    Attributes:
+        text: Original text
+        norms: Normalized form of each token
+        starts, ends: Offsets of each token in the original text
+        joiners: Joiner between each token and the previous one (" ", "-",
+            "'" or None; None for the first token)
+    """
+
+    __slots__ = ("text", "norms", "starts", "ends", "joiners", "_ids")
+
+    def __init__(self, text: str):
+        self.text = text
+        norms, starts, ends, joiners = [], [], [], []
+        previous_end = None
+        for match in _TOKEN_RE.finditer(text):
+            start, end = match.span()
+            joiners.append(None if previous_end is None else _classify_gap(text[previous_end:start]))
+            norms.append(normalize_token(match.group()))
+            starts.append(start)
+            ends.append(end)
+            previous_end = end
+        self.norms = norms
+        self.starts = starts
+        self.ends = ends
+        self.joiners = joiners
+        self._ids = None
+
+    def __len__(self) -> int:
+        return len(self.norms)
+
+    def ids(self, vocabulary: Dict[str, int]) -> List[int]:
+        """
+        Token IDs in a vocabulary (-1 for tokens it does not contain)
+
+        The IDs for the most recently used vocabulary are kept, so stages
+        matching the same lexicon map the tokens once.
+        """
+        cached = self._ids
+        if cached is not None and cached[0] is vocabulary:
+            return cached[1]
+        get = vocabulary.get
+        ids = [get(norm, -1) for norm in self.norms]
+        self._ids = (vocabulary, ids)
+        return ids
+
+    def phrase(self, start: int, end: int) -> Optional[str]:
+        """
+        Normalized form of tokens start..end-1 joined by their joiners
+
+        Returns:
+            The phrase, or None if a gap between the tokens is not a joiner
+        """
+        parts = [self.norms[start]]
+        for i in range(start + 1, end):
+            joiner = self.joiners[i]
+            if joiner is None:
+                return None
+            parts.append(joiner)
+            parts.append(self.norms[i])
+        return "".join(parts)
+
+@functools.lru_cache(maxsize=config.TOKENIZE_CACHE_SIZE)
+def _tokenize_cached(text: str) -> TokenizedText:
+    return TokenizedText(text)
+
+def tokenize(text: str) -> TokenizedText:
+    """
+    Tokenize a text, reusing the result for recently tokenized texts
+
+    Texts longer than TOKENIZE_CACHE_MAX_CHARS (long job documents) are not
+    memoized to keep the cache's memory bounded.
+    """
+    if len(text) > config.TOKENIZE_CACHE_MAX_CHARS:
+        return TokenizedText(text)
+    return _tokenize_cached(text)
+
+def normalize_term(term: str) -> str:
+    """
+    Canonical form of a lexicon term, comparable with TokenizedText.phrase
+
+    Tokens are normalized like text tokens; whitespace and single hyphens
+    or apostrophes between them become the joiner (e.g. "Inner–City" ->
+    "inner-city", "those  people" -> "those people").
+    """
+    tokens = TokenizedText(term)
+    phrase = tokens.phrase(0, len(tokens)) if tokens.norms else None
+    if phrase is None:
+        # Not made of joinable tokens (e.g. "u.s."): kept as is, never matched
+        return " ".join(term.casefold().split())
+    return phrase
@@ -0,0 +1,192 @@
+"""
+Positional index of lexicon hits and proximity (co-occurrence) rules
+
+A text is scanned once with the compiled lexicon; every hit is filed under
+each lexicon group its term belongs to, in token order. A proximity rule
+such as "a gender term within 5 tokens of a negative trait" is then a merge
+of two sorted position lists, so each additional rule costs O(hits) rather
+than another pass over the text or a scan per term pair.
+"""
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.compiled_lexicon import CompiledLexicon, get_compiled_lexicon
+
+# (token position, start offset, end offset, term id)
+Hit = Tuple[int, int, int, int]
+
+class PositionalIndex:
+    """Lexicon hits of one text, grouped by lexicon group and term"""
+
+    def __init__(self, lexicon: CompiledLexicon, hits: List[Hit]):
+        self.lexicon = lexicon
+        self.hits = hits
+        self._by_group: Dict[int, List[Hit]] = {}
+        self._by_term: Dict[int, List[Hit]] = {}
+        for hit in hits:
+            term_id = hit[3]
+            self._by_term.setdefault(term_id, []).append(hit)
+            for group_id in lexicon.term_groups(term_id):
+                self._by_group.setdefault(group_id, []).append(hit)
+
+    @classmethod
+    def build(cls, text: str, lexicon: Optional[CompiledLexicon] = None) -> "PositionalIndex":
+        """Scan text once and index its lexicon hits"""
+        lexicon = lexicon or get_compiled_lexicon()
+        return cls(lexicon, lexicon.find_token_matches(text))
+
+    def positions(self, selector: str) -> List[Hit]:
+        """
+        Hits for a selector, sorted by token position
+
+        Args:
+            selector: A group name ('gender.male_terms'), a group prefix that
+                covers nested groups ('race.racial_activities') or a single
+                term ('term:asian')
+
+        Returns:
+            Sorted list of hits
+        """
+        if selector.startswith("term:"):
+            term_id = self.lexicon.lookup(selector[5:])
+            return self._by_term.get(term_id, []) if term_id >= 0 else []
+
+        lists = [
+            self._by_group[group_id]
+            for group_id, name in enumerate(self.lexicon.groups)
+            if (name == selector or name.startswith(selector + ".")) and group_id in self._by_group
+        ]
+        return _merge(lists)
+
+    def categories(self) -> Dict[str, int]:
+        """Number of hits per category"""
+        counts: Dict[str, int] = {}
+        for group_id, hits in self._by_group.items():
+            category = self.lexicon.categories[self.lexicon.group_categories[group_id]]
+            counts[category] = counts.get(category, 0) + len(hits)
+        return counts
+
+def _merge(lists: List[List[Hit]]) -> List[Hit]:
+    """Merge sorted hit lists, dropping hits that appear in several of them"""
+    if not lists:
+        return []
+    if len(lists) == 1:
+        return lists[0]
+    merged = []
+    for hit in heapq.merge(*lists):
+        if not merged or merged[-1] != hit:
+            merged.append(hit)
+    return merged
+
+def pairs_within(left: List[Hit], right: List[Hit], window: int,
+                 ordered: bool = False) -> List[Tuple[Hit, Hit]]:
+    """
+    All (left, right) hit pairs at most `window` tokens apart
+
+    Both lists must be sorted by token position. A sliding lower bound over
+    `right` makes this a single merge pass plus the pairs found.
+
+    Args:
+        left: Sorted hits of the first selector
+        right: Sorted hits of the second selector
+        window: Maximum distance between the first tokens of the two hits
+        ordered: Only count right hits that follow the left hit
+
+    Returns:
+        Matching pairs in left order
+    """
+    pairs = []
+    lo = 0
+    for a in left:
+        lower = a[0] if ordered else a[0] - window
+        while lo < len(right) and right[lo][0] < lower:
+            lo += 1
+        j = lo
+        while j < len(right) and right[j][0] <= a[0] + window:
+            b = right[j]
+            # The same span can belong to both selectors
+            if (b[1], b[2]) != (a[1], a[2]):
+                pairs.append((a, b))
+            j += 1
+    return pairs
+
+class ProximityRule:
+    """Terms of two lexicon selectors occurring within a token window"""
+
+    def __init__(self, name: str, category: str, left: List[str], right: List[str],
+                 window: int = 5, ordered: bool = False, weight: float = 1.0):
+        self.name = name
+        self.category = category
+        self.left = left
+        self.right = right
+        self.window = window
+        self.ordered = ordered
+        self.weight = weight
+
+    def evaluate(self, index: PositionalIndex) -> List[Tuple[Hit, Hit]]:
+        left = _merge([index.positions(selector) for selector in self.left])
+        if not left:
+            return []
+        right = _merge([index.positions(selector) for selector in self.right])
+        return pairs_within(left, right, self.window, self.ordered)
+
+def default_rules(lexicon: Optional[CompiledLexicon] = None) -> List[ProximityRule]:
+    """
+    Built-in co-occurrence rules for the lexicon
+
+    Gender terms near negative traits or occupations, and racial group terms
+    near the activities stereotypically associated with that group. Rules
+    whose groups are missing from the lexicon are left out.
+    """
+    lexicon = lexicon or get_compiled_lexicon()
+    rules = []
+    gender_terms = [g for g in ("gender.male_terms", "gender.female_terms") if g in lexicon.group_ids]
+    if gender_terms and "gender.negative_traits" in lexicon.group_ids:
+        rules.append(ProximityRule("gender_trait", "gender", gender_terms, ["gender.negative_traits"], window=5))
+    if gender_terms and "gender.occupations" in lexicon.group_ids:
+        rules.append(ProximityRule("gender_occupation", "gender", gender_terms, ["gender.occupations"], window=3))
+
+    prefix = "race.racial_activities."
+    for group in lexicon.groups:
+        if group.startswith(prefix):
+            subgroup = group[len(prefix):]
+            if lexicon.lookup(subgroup) >= 0:
+                rules.append(ProximityRule(f"race_activity_{subgroup}", "race", [f"term:{subgroup}"], [group], window=8))
+    return rules
+
+_default_rules = None
+
+def find_patterns(text: str, rules: Optional[List[ProximityRule]] = None,
+                  index: Optional[PositionalIndex] = None) -> List[Dict]:
+    """
+    Evaluate proximity rules against a text
+
+    Args:
+        text: Text to analyze
+        rules: Rules to evaluate (default: default_rules() for the shared lexicon)
+        index: Prebuilt index of text (built if omitted)
+
+    Returns:
+        One dict per matching pair with the rule, category, both terms and
+        the span covering them, sorted by start offset
+    """
+    global _default_rules
+    if rules is None:
+        if _default_rules is None:
+            _default_rules = default_rules()
+        rules = _default_rules
+    if index is None:
+        index = PositionalIndex.build(text)
+
+    patterns = []
+    for rule in rules:
+        for a, b in rule.evaluate(index):
+            patterns.append({
+                "rule": rule.name,
+                "category": rule.category,
+                "terms": [text[a[1]:a[2]], text[b[1]:b[2]]],
+                "start": min(a[1], b[1]),
+                "end": max(a[2], b[2])
+            })
+    patterns.sort(key=lambda pattern: (pattern["start"], pattern["end"]))
+    return patterns
@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+WARMUP_TEXTS = [
+    "The weather today is pleasant and sunny.",
+    "The female nurse assisted the male doctor with surgery.",
+    "The inner-city youth were suspected of criminal activity.",
+    "Muslim immigrants are likely to be terrorists.",
+    "Poor people are lazy and looking for handouts.",
+    "The elderly worker is too old to learn new technology.",
+]
+
+class Readiness:
+    """
+    Loads heavy components in a background thread and tracks their state
+
+    Components load in registration order. The process is ready once every
+    component is ready (or disabled); a failed component keeps it unready.
+    """
+
+    def __init__(self):
+        self._loaders: List[Tuple[str, Callable[[], Optional[str]]]] = []
+        self._states: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+
+    def register(self, name: str, loader: Callable[[], Optional[str]]):
+        """
+        Add a component
+
+        Args:
+            name: Component name reported by /health/ready
+            loader: Loads and warms the component; returns DISABLED to
+                mark it as not configured
+        """
+        self._loaders.append((name, loader))
+        self._states[name] = {"state": PENDING}
+
+    def _set(self, name: str, **state):
+        with self._lock:
+            self._states[name] = state
+
+    def load(self, names: Optional[List[str]] = None):
+        """Load components synchronously (skipping those already loaded)"""
+        for name, loader in self._loaders:
+            if names is not None and name not in names:
+                continue
+            if self._states[name]["state"] in (READY, DISABLED):
+                continue
+            self._set(name, state=LOADING)
+            started = time.perf_counter()
+            try:
+                outcome = loader()
+            except Exception as e:
+                logger.exception("Failed to load %s", name)
+                self._set(name, state=FAILED, error=str(e))
+                continue
+            self._set(
+                name,
+                state=DISABLED if outcome == DISABLED else READY,
+                load_ms=round((time.perf_counter() - started) * 1000, 1)
+            )
+
+    def start(self):
+        """Load all components in a daemon thread; returns immediately"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._done.clear()
+
+        def run():
+            try:
+                self.load()
+            finally:
+                self._done.set()
+
+        self._thread = threading.Thread(target=run, name="readiness-loader", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until background loading finishes; returns whether the process is ready"""
+        self._done.wait(timeout)
+        return self.is_ready()
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            return self._states[name]["state"]
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(state["state"] in (READY, DISABLED) for state in self._states.values())
+
+    def status(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(state) for name, state in self._states.items()}
+
+_model_runner = None
+
+def get_model_runner():
+    """The loaded ModelRunner, or None while it is loading or when no model is configured"""
+    if _model_runner is not None and _model_runner.loaded:
+        return _model_runner
+    return None
+
+def _load_lexicon() -> None:
+    from app.utils.matches import highlight_matches
+    from app.utils.normalization import tokenize
+    from app.utils.tenant_lexicons import get_default_lexicon
+
+    # Compiles the lexicon and computes its version
+    lexicon = get_default_lexicon()
+    # Warm the paths requests run: detection, the shared tokenizer, compiled
+    # lexicon matching (and its token vocabulary) and the proximity rules
+    for text in WARMUP_TEXTS:
+        results = lexicon.detector.detect_lexicon_bias(text)
+        tokenize(text)
+        if results["has_bias"]:
+            highlight_matches(text, results["bias_categories"], lexicon.compiled).to_highlights()
+        lexicon.find_patterns(text)
+
+def _load_caches() -> Optional[str]:
+    from app.utils.detection_cache import get_detection_cache
+    from app.utils.sentence_cache import get_sentence_cache
+
+    detection_cache = get_detection_cache()
+    sentence_cache = get_sentence_cache()
+    if detection_cache is None and sentence_cache is None:
+        return DISABLED
+    return None
+
+def _load_model() -> Optional[str]:
+    global _model_runner
+    if not config.MODEL_NAME:
+        return DISABLED
+
+    from app.utils.model_runner import ModelRunner
+
+    runner = ModelRunner(config.MODEL_NAME, device=config.MODEL_DEVICE, max_length=config.MODEL_MAX_LENGTH)
+    runner.load()
+    batch = (WARMUP_TEXTS * config.MODEL_WARMUP_BATCH_SIZE)[:config.MODEL_WARMUP_BATCH_SIZE]
+    runner.warmup(batch, batch_size=config.MODEL_WARMUP_BATCH_SIZE)
+    # Publish only after warm-up so requests never hit a cold model
+    _model_runner = runner
+    return None
+
+readiness = Readiness()
+readiness.register("lexicon", _load_lexicon)
+readiness.register("caches", _load_caches)
+readiness.register("model", _load_model)
@@ -0,0 +1,276 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.utils.lexicon import hash_text
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    text_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    source TEXT,
+    has_bias INTEGER NOT NULL,
+    severity TEXT NOT NULL,
+    overall_score REAL,
+    lexicon_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_detections_created
+    ON detections (created_at, severity);
+CREATE INDEX IF NOT EXISTS idx_detections_hash
+    ON detections (text_hash);
+
+CREATE TABLE IF NOT EXISTS detection_scores (
+    detection_id INTEGER NOT NULL REFERENCES detections (id),
+    category TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    score REAL NOT NULL,
+    flagged INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scores_category_time
+    ON detection_scores (category, created_at, score, flagged);
+CREATE INDEX IF NOT EXISTS idx_scores_time
+    ON detection_scores (created_at, category, score, flagged);
+"""
+
+class ResultsStore:
+    """
+    Embedded SQLite store of detection results
+
+    Writes are queued and committed in batches by a background thread so
+    recording never blocks the request path. Aggregate queries are served
+    from covering indexes on (category, created_at).
+    """
+
+    def __init__(self, path: str, batch_size: int = 200,
+                 flush_interval: float = 1.0, max_pending: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._writer = None
+        self._writer_pid = None
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_writer(self):
+        # Threads do not survive fork, so restart the writer in each worker process
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+                return
+            if self._writer_pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._writer = threading.Thread(target=self._write_loop, name="results-store-writer", daemon=True)
+            self._writer_pid = os.getpid()
+            self._writer.start()
+
+    def record(self, text: str, results: Dict, lexicon_version: Optional[str] = None,
+               source: Optional[str] = None) -> bool:
+        """
+        Queue a detection result for storage without blocking
+
+        Args:
+            text: Analyzed text (only its hash is stored)
+            results: Output of detect_lexicon_bias
+            lexicon_version: Version id of the lexicon used
+            source: Endpoint or job that produced the result
+
+        Returns:
+            False if the write queue is full and the record was dropped
+        """
+        self._ensure_writer()
+        row = (
+            hash_text(text),
+            time.time(),
+            source,
+            1 if results.get("has_bias") else 0,
+            results.get("severity", "none"),
+            results.get("overall_score"),
+            lexicon_version,
+            dict(results.get("bias_scores", {})),
+            set(results.get("bias_categories", [])),
+        )
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _write_loop(self):
+        conn = None
+        pending = self._queue
+        while True:
+            try:
+                item = pending.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is None:
+                pending.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    pending.put(None)
+                    pending.task_done()
+                    break
+                batch.append(nxt)
+
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._write_batch(conn, batch)
+            except Exception:
+                # A failed batch is rolled back and lost; keep the writer alive for the next one
+                self.failed += len(batch)
+                logger.exception("Failed to write %d detection results to %s", len(batch), self.path)
+                if conn is not None:
+                    conn.close()
+                    conn = None
+            finally:
+                for _ in batch:
+                    pending.task_done()
+        if conn is not None:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple]):
+        with conn:
+            for text_hash, created_at, source, has_bias, severity, overall, version, scores, flagged in batch:
+                cursor = conn.execute(
+                    "INSERT INTO detections (text_hash, created_at, source, has_bias, severity, "
+                    "overall_score, lexicon_version) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (text_hash, created_at, source, has_bias, severity, overall, version)
+                )
+                conn.executemany(
+                    "INSERT INTO detection_scores (detection_id, category, created_at, score, flagged) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (cursor.lastrowid, category, created_at, float(score), 1 if category in flagged else 0)
+                        for category, score in scores.items()
+                    ]
+                )
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self._writer is not None and self._writer_pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Flush pending records and stop the writer thread"""
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._writer = None
+
+    @staticmethod
+    def _time_filter(start: Optional[float], end: Optional[float], column: str = "created_at"):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{column} < ?")
+            params.append(end)
+        return clauses, params
+
+    def count(self, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        """Number of recorded detections in the time range"""
+        clauses, params = self._time_filter(start, end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM detections {where}", params).fetchone()[0]
+
+    def category_distribution(self, start: Optional[float] = None, end: Optional[float] = None,
+                              categories: Optional[List[str]] = None) -> Dict[str, int]:
+        """Same result as calculate_category_distribution over the stored detections"""
+        clauses, params = self._time_filter(start, end)
+        clauses.append("flagged = 1")
+        if categories:
+            clauses.append(f"category IN ({','.join('?' * len(categories))})")
+            params.extend(categories)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT category, COUNT(*) FROM detection_scores WHERE {' AND '.join(clauses)} "
+                "GROUP BY category",
+                params
+            ).fetchall()
+        return {category: n for category, n in rows}
+
+    def aggregate_scores(self, start: Optional[float] = None, end: Optional[float] = None,
+                         categories: Optional[List[str]] = None) -> Dict[str, float]:
+        """Same result as aggregate_scores: a missing category counts as a score of 0"""
+        total = self.count(start, end)
+        if total == 0:
+            return {}
+
+        clauses, params = self._time_filter(start, end)
+        if categories:
+            clauses.append(f"category IN ({','.join('?' * len(categories))})")
+            params.extend(categories)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT category, SUM(score) FROM detection_scores {where} GROUP BY category",
+                params
+            ).fetchall()
+        return {category: round(value / total, 3) for category, value in rows}
+
+    def severity_distribution(self, start: Optional[float] = None,
+                              end: Optional[float] = None) -> Dict[str, int]:
+        """Count of detections per severity level"""
+        clauses, params = self._time_filter(start, end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT severity, COUNT(*) FROM detections {where} GROUP BY severity", params
+            ).fetchall()
+        return {severity: n for severity, n in rows}
+
+    def summary(self, start: Optional[float] = None, end: Optional[float] = None,
+                categories: Optional[List[str]] = None) -> Dict:
+        """Combined summary for reporting endpoints"""
+        return {
+            "count": self.count(start, end),
+            "category_distribution": self.category_distribution(start, end, categories),
+            "mean_scores": self.aggregate_scores(start, end, categories),
+            "severity_distribution": self.severity_distribution(start, end),
+            "dropped_writes": self.dropped,
+            "failed_writes": self.failed
+        }
+
+results_store: Optional[ResultsStore] = (
+    ResultsStore(
+        config.RESULTS_DB_PATH,
+        batch_size=config.RESULTS_BATCH_SIZE,
+        flush_interval=config.RESULTS_FLUSH_INTERVAL,
+        max_pending=config.RESULTS_MAX_PENDING
+    )
+    if config.RESULTS_DB_PATH else None
+)
@@ -0,0 +1,260 @@
+"""
+Approximate corpus statistics from a random sample
+
+Scoring a whole corpus to learn its per-category bias rates takes hours;
+a few thousand random documents answer the same question to within a
+percentage point. The corpus is streamed once into a bounded reservoir
+(each document gets a uniform random priority and the lowest `max_samples`
+priorities are kept), so any prefix of the reservoir in priority order is a
+uniform sample without replacement. Documents are then scored in that
+order, batch by batch, until every estimated proportion's confidence
+interval is narrower than the requested precision:
+    python -m app.utils.sampling corpus.jsonl --precision 0.01
+
+With --stratify-by, each value of that JSON field is a stratum with its own
+reservoir; the sample is allocated proportionally to stratum sizes and the
+estimates are weighted by them, which narrows the intervals when strata
+differ (e.g. by source).
+"""
+import heapq
+import json
+import math
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.utils.metrics import calculate_proportion_confidence_interval
+
+SEVERITIES = ["none", "mild", "moderate", "severe"]
+
+class Reservoir:
+    """
+    Uniform sample of at most k items from a stream of unknown length
+
+    Args:
+        k: Items kept
+        rng: Random source (seed it for reproducible samples)
+    """
+
+    def __init__(self, k: int, rng: random.Random):
+        self.k = k
+        self.rng = rng
+        self.seen = 0
+        # Max-heap on priority (negated), so the largest kept priority is on top
+        self._heap: List[Tuple[float, int, object]] = []
+
+    def add(self, item):
+        priority = self.rng.random()
+        entry = (-priority, self.seen, item)
+        self.seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif priority < -self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List:
+        """Kept items in random (priority) order; every prefix is a uniform sample"""
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: -entry[0])]
+
+class ProportionEstimator:
+    """
+    Stratified estimates of several proportions from scored samples
+
+    Each stratum's proportions are weighted by its share of the population;
+    variances include the finite population correction, so a stratum that
+    is sampled completely contributes no uncertainty.
+
+    Args:
+        population: Number of documents per stratum
+    """
+
+    def __init__(self, population: Dict[str, int]):
+        self.population = population
+        self.total = sum(population.values())
+        self.sampled: Dict[str, int] = {stratum: 0 for stratum in population}
+        self.successes: Dict[str, Dict[str, int]] = {stratum: {} for stratum in population}
+
+    def update(self, stratum: str, outcomes: Iterable[str]):
+        """Record one scored document and the outcomes (e.g. 'category:gender') it has"""
+        self.sampled[stratum] += 1
+        counts = self.successes[stratum]
+        for outcome in outcomes:
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    @property
+    def n(self) -> int:
+        return sum(self.sampled.values())
+
+    def estimate(self, outcome: str, confidence: float = 0.95) -> Dict:
+        """
+        Population proportion of an outcome with a Wilson interval
+
+        Returns:
+            Dict with estimate, lower, upper and half_width
+        """
+        proportion = variance = 0.0
+        for stratum, size in self.population.items():
+            n = self.sampled[stratum]
+            if n == 0:
+                continue
+            weight = size / self.total
+            p = self.successes[stratum].get(outcome, 0) / n
+            proportion += weight * p
+            if n > 1:
+                fpc = 1 - n / size
+                variance += weight * weight * p * (1 - p) / (n - 1) * fpc
+
+        if self.n == 0:
+            n_eff = 0.0
+        elif variance > 0:
+            n_eff = proportion * (1 - proportion) / variance
+        elif self.n == self.total:
+            # Census: the proportion is exact
+            n_eff = math.inf
+        else:
+            n_eff = float(self.n)
+        lower, upper = calculate_proportion_confidence_interval(proportion, n_eff, confidence)
+        return {
+            "estimate": round(proportion, 4),
+            "lower": lower,
+            "upper": upper,
+            "half_width": round((upper - lower) / 2, 4)
+        }
+
+def outcomes(result: Dict) -> List[str]:
+    """Outcomes of one detect_lexicon_bias result that are estimated"""
+    found = ["has_bias"] if result["has_bias"] else []
+    found.extend(f"category:{category}" for category in result["bias_categories"])
+    found.append(f"severity:{result['severity']}")
+    return found
+
+def _allocation(population: Dict[str, int], available: Dict[str, int], n: int) -> Dict[str, int]:
+    """Proportional allocation of n samples, at least one per stratum, capped by what was kept"""
+    total = sum(population.values())
+    return {
+        stratum: min(available[stratum], max(1, math.ceil(n * size / total)))
+        for stratum, size in population.items()
+    }
+
+def sample_corpus(records: Iterable[Tuple[str, Optional[str]]], detector, precision: float = 0.02,
+                  confidence: float = 0.95, max_samples: int = 10000, batch_size: int = 200,
+                  min_samples: int = 100, seed: int = 0) -> Dict:
+    """
+    Estimate bias rates and the severity distribution of a corpus
+
+    Args:
+        records: (text, stratum) pairs; stratum is None for simple random sampling
+        detector: BiasDetector (only detect_lexicon_bias and bias_lexicons are used)
+        precision: Target half-width of every confidence interval
+        confidence: Confidence level (0.95 or 0.99)
+        max_samples: Documents kept per stratum reservoir (bounds memory and work)
+        batch_size: Documents scored between precision checks
+        min_samples: Documents scored before precision is checked
+        seed: Random seed
+
+    Returns:
+        Population and sample sizes, whether the precision was reached, and
+        an estimate with interval for has_bias, every category and every
+        severity level
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    reservoirs: Dict[str, Reservoir] = {}
+    for text, stratum in records:
+        stratum = "all" if stratum is None else str(stratum)
+        reservoir = reservoirs.get(stratum)
+        if reservoir is None:
+            reservoir = reservoirs[stratum] = Reservoir(max_samples, rng)
+        reservoir.add(text)
+    read_seconds = time.perf_counter() - started
+
+    population = {stratum: reservoir.seen for stratum, reservoir in reservoirs.items()}
+    samples = {stratum: reservoir.items() for stratum, reservoir in reservoirs.items()}
+    available = {stratum: len(items) for stratum, items in samples.items()}
+    estimator = ProportionEstimator(population)
+    tracked = ["has_bias"]
+    tracked += [f"category:{category}" for category in detector.bias_lexicons]
+    tracked += [f"severity:{severity}" for severity in SEVERITIES]
+
+    target = min(max(min_samples, batch_size), sum(available.values()))
+    reached = False
+    while True:
+        for stratum, wanted in _allocation(population, available, target).items():
+            for text in samples[stratum][estimator.sampled[stratum]:wanted]:
+                estimator.update(stratum, outcomes(detector.detect_lexicon_bias(text)))
+        widest = max(estimator.estimate(outcome, confidence)["half_width"] for outcome in tracked)
+        if widest <= precision:
+            reached = True
+            break
+        if estimator.n >= sum(available.values()):
+            break
+        target += batch_size
+
+    def _group(prefix: str) -> Dict[str, Dict]:
+        return {
+            outcome[len(prefix):]: estimator.estimate(outcome, confidence)
+            for outcome in tracked if outcome.startswith(prefix)
+        }
+
+    return {
+        "population": estimator.total,
+        "sampled": estimator.n,
+        "strata": {
+            stratum: {"population": size, "sampled": estimator.sampled[stratum]}
+            for stratum, size in population.items()
+        } if len(population) > 1 else None,
+        "confidence": confidence,
+        "precision": precision,
+        "precision_reached": reached,
+        "max_half_width": widest if estimator.n else None,
+        "has_bias": estimator.estimate("has_bias", confidence),
+        "bias_rates": _group("category:"),
+        "severity_distribution": _group("severity:"),
+        "read_seconds": round(read_seconds, 3),
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+
+def read_corpus(path: str, stratify_by: Optional[str] = None) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Stream (text, stratum) pairs from a file
+
+    Args:
+        path: One text per line, or JSON lines with a 'text' field
+        stratify_by: JSON field holding the stratum (plain lines are one stratum)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                yield record["text"], record.get(stratify_by) if stratify_by else None
+            else:
+                yield line, None
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Estimate corpus bias rates from a random sample")
+    parser.add_argument("input", help="One text per line, or JSON lines with a 'text' field")
+    parser.add_argument("--precision", type=float, default=0.02, help="Target confidence interval half-width")
+    parser.add_argument("--confidence", type=float, choices=[0.95, 0.99], default=0.95)
+    parser.add_argument("--max-samples", type=int, default=10000, help="Reservoir size per stratum")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--min-samples", type=int, default=100)
+    parser.add_argument("--stratify-by", default=None, help="JSON field to stratify on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from app.models.bias_detector import bias_detector
+
+    report = sample_corpus(
+        read_corpus(args.input, args.stratify_by), bias_detector,
+        precision=args.precision, confidence=args.confidence, max_samples=args.max_samples,
+        batch_size=args.batch_size, min_samples=args.min_samples, seed=args.seed
+    )
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
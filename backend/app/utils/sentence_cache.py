@@ -0,0 +1,68 @@
+"""
+Per-sentence cache of model outputs
+
+Documents sent to the transformer often share sentences (boilerplate,
+templates, edits of an earlier draft). The model runner splits documents
+with get_sentences and caches each sentence's label distribution, keyed by
+the model version and a hash of the normalized sentence, so only sentences
+it has not seen go to inference.
+"""
+import json
+import re
+import unicodedata
+from typing import Dict, Optional
+
+from app import config
+from app.utils.detection_cache import LRUCache
+from app.utils.lexicon import hash_text
+from app.utils.serialization import dumps
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sentence(sentence: str) -> str:
+    """
+    Canonical form of a sentence for cache lookups
+
+    Unicode compatibility forms and whitespace runs are folded; case and
+    punctuation are kept since the model sees them.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", sentence)).strip()
+
+class SentenceCache:
+    """
+    Bounded LRU of per-sentence label distributions
+
+    Args:
+        max_entries: Sentences kept before the least recently used is evicted
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.lru = LRUCache(max_entries)
+
+    @staticmethod
+    def key(model_version: str, sentence: str) -> str:
+        # Not make_key: model outputs do not depend on the lexicon engine, so
+        # bumping ENGINE_VERSION must not throw the sentence cache away
+        return f"sentence:{model_version}:{hash_text(normalize_sentence(sentence))}"
+
+    def get(self, model_version: str, sentence: str) -> Optional[Dict[str, float]]:
+        value = self.lru.get(self.key(model_version, sentence))
+        return json.loads(value) if value is not None else None
+
+    def put(self, model_version: str, sentence: str, distribution: Dict[str, float]):
+        self.lru.put(self.key(model_version, sentence), dumps(distribution))
+
+    def __len__(self) -> int:
+        return len(self.lru)
+
+    def stats(self) -> Dict:
+        return self.lru.stats()
+
+_sentence_cache = None
+
+def get_sentence_cache() -> Optional[SentenceCache]:
+    """Shared sentence cache, or None when it is disabled"""
+    global _sentence_cache
+    if _sentence_cache is None and config.MODEL_SENTENCE_CACHE_SIZE > 0:
+        _sentence_cache = SentenceCache(config.MODEL_SENTENCE_CACHE_SIZE)
+    return _sentence_cache
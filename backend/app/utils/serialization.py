@@ -0,0 +1,71 @@
+import json
+from typing import Dict, Iterable, List, Optional, Union
+from fastapi.responses import Response
+from app.utils.matches import MatchArray
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+HIGHLIGHT_FORMATS = ["full", "compact", "offsets"]
+
+def _default(obj):
+    # numpy scalars (e.g. scores computed with np.mean)
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(payload) -> bytes:
+    """Serialize a payload to compact UTF-8 JSON, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class FastJSONResponse(Response):
+    """JSON response rendered directly from plain dicts, skipping model validation"""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def select_fields(payload: Dict, fields: Optional[Iterable[str]], always: Iterable[str] = ()) -> Dict:
+    """
+    Keep only the requested top-level fields of a response payload
+
+    Args:
+        payload: Full response payload
+        fields: Requested field names (None keeps everything)
+        always: Fields that are always kept (e.g. partial-result flags)
+
+    Returns:
+        Projected payload, preserving the original field order
+    """
+    if fields is None:
+        return payload
+    keep = set(fields) | set(always)
+    return {key: value for key, value in payload.items() if key in keep}
+
+def format_highlights(highlights: Union[List[Dict], MatchArray, None],
+                      highlight_format: str = "full") -> List[Dict]:
+    """
+    Reduce highlight records to the requested level of detail
+
+    full: every field produced by the highlighter (term, category, offsets, context)
+    compact: term, category and offsets without the context snippet
+    offsets: category and offsets only
+    """
+    if highlights is None:
+        return []
+    if isinstance(highlights, MatchArray):
+        # Highlight dicts and context snippets are only built here
+        return highlights.to_highlights(highlight_format)
+    if highlight_format == "full":
+        return highlights
+    if highlight_format == "compact":
+        return [{key: value for key, value in h.items() if key != "context"} for h in highlights]
+    return [
+        {"start": h["start"], "end": h["end"], "category": h.get("category")}
+        for h in highlights
+    ]
@@ -0,0 +1,327 @@
+"""
+Shadow-mode comparison of a candidate engine on live /detect traffic
+
+A sampled fraction of /detect requests is handed, after the response's
+lexicon results are known, to a small background executor that runs the
+candidate engine on the same text. Disagreements in categories or severity
+are logged as JSON lines, and per-engine latency is accumulated with
+RunningStats. The executor's queue is bounded and nothing is submitted
+while requests are waiting for admission or every admission slot is taken,
+so shadow work is dropped rather than competing with traffic under load.
+
+The primary engine is never run again: the candidate is compared with the
+served result, and the primary latency is the time the request spent
+running the detector, recorded only when the result did not come from the
+detection cache. A lexicon:<id> candidate is scored by the batch scorer,
+so it is compared with the default lexicon through the same scorer
+instead, keeping engine differences out of the lexicon comparison (both
+are timed in the shadow thread). Disagreement records identify the text by
+its hash; the text itself is only logged, truncated, when
+SHADOW_LOG_TEXT_CHARS is set. The log file is rotated at
+SHADOW_LOG_MAX_BYTES, keeping one previous file.
+
+Candidates (SHADOW_ENGINE):
+    sparse          the sparse batch scorer (app.utils.batch_scoring)
+    lexicon:<id>    a lexicon registered through /lexicons
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app import config
+from app.utils.lexicon import hash_text
+from app.utils.metrics import RunningStats
+
+logger = logging.getLogger(__name__)
+
+def filter_categories(result: Dict, categories: Optional[List[str]]) -> Dict:
+    """Restrict a detection result to the requested categories, as /detect does"""
+    if not categories:
+        return result
+    scores = {c: s for c, s in result["bias_scores"].items() if c in categories}
+    flagged = [c for c in result["bias_categories"] if c in categories]
+    return dict(result, bias_categories=flagged, bias_scores=scores, has_bias=len(flagged) > 0)
+
+def resolve_engine(spec: str) -> Callable[[str], Dict]:
+    """
+    Detection function for a candidate engine spec
+
+    Raises:
+        ValueError: If the spec is unknown
+    """
+    if spec == "sparse":
+        from app.utils.batch_scoring import get_batch_scorer
+
+        scorer = get_batch_scorer()
+        return lambda text: scorer.score([text])[0]
+    if spec.startswith("lexicon:"):
+        from app.utils.tenant_lexicons import get_tenant_registry
+
+        lexicon_id = spec[len("lexicon:"):]
+        registry = get_tenant_registry()
+
+        def detect(text: str) -> Dict:
+            # Looked up per call, so the lexicon can be registered (or
+            # replaced) after startup
+            lexicon = registry.get(lexicon_id)
+            if lexicon is None:
+                raise ValueError(f"Shadow lexicon {lexicon_id} is not registered")
+            return lexicon.detector.detect_lexicon_bias(text)
+        return detect
+    raise ValueError(f"Unknown shadow engine: {spec}")
+
+def resolve_baseline(spec: str) -> Optional[Callable[[str], Dict]]:
+    """
+    Detection function the candidate is compared with, if not the served result
+
+    A lexicon:<id> candidate is scored by the batch scorer with the default
+    scorer's weights, so its baseline is the default lexicon through that
+    same scorer.
+    """
+    if spec.startswith("lexicon:"):
+        from app.utils.batch_scoring import get_batch_scorer
+
+        scorer = get_batch_scorer()
+        return lambda text: scorer.score([text])[0]
+    return None
+
+class ShadowRunner:
+    """
+    Runs a candidate engine next to the primary detector off the request path
+
+    Args:
+        engine: Candidate engine spec (see module docstring)
+        candidate: Candidate detection function
+        baseline: Detection function to compare with instead of the served
+            result (None: the served result)
+        sample_rate: Fraction of eligible requests shadowed
+        max_pending: Shadow tasks queued or running before new ones are dropped
+        workers: Executor threads
+        log_path: JSON-lines file for disagreements (None: application log only)
+        log_max_bytes: Size at which the log file is rotated (None: never)
+        log_text_chars: Characters of the text included in disagreement
+            records (0: only its hash)
+        under_load: Returns True when shadow work should be dropped
+    """
+
+    def __init__(self, engine: str, candidate: Callable[[str], Dict],
+                 baseline: Optional[Callable[[str], Dict]] = None, sample_rate: float = 0.01, max_pending: int = 32, workers: int = 1,
+                 log_path: Optional[str] = None, log_max_bytes: Optional[int] = None, log_text_chars: int = 0,
+                 under_load: Optional[Callable[[], bool]] = None, rng: Optional[random.Random] = None):
+        self.engine = engine
+        self.candidate = candidate
+        self.baseline = baseline
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.log_path = log_path
+        self.log_max_bytes = log_max_bytes
+        self.log_text_chars = log_text_chars
+        self.under_load = under_load or (lambda: False)
+        self.rng = rng or random.Random()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shadow")
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.dropped_load = 0
+        self.dropped_full = 0
+        self.errors = 0
+        self.category_disagreements = 0
+        self.severity_disagreements = 0
+        self.latency_ms = {"primary": RunningStats(), "candidate": RunningStats()}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    def maybe_submit(self, text: str, categories: Optional[List[str]], served: Dict,
+                     served_ms: Optional[float] = None) -> bool:
+        """
+        Shadow a request with probability sample_rate, unless the system is loaded
+
+        Args:
+            text: Request text
+            categories: Requested categories
+            served: Lexicon results returned to the client (before the linguistic stage)
+            served_ms: How long the request spent running the detector for
+                them (None: served from the detection cache, or not timed)
+
+        Returns:
+            Whether the request was handed to the executor
+        """
+        if self.rng.random() >= self.sample_rate:
+            return False
+        if self.under_load():
+            with self._lock:
+                self.dropped_load += 1
+            return False
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped_full += 1
+                return False
+            self.pending += 1
+            self.submitted += 1
+        # Later stages may rewrite the served result; compare against it as returned here
+        served = {
+            "bias_categories": list(served["bias_categories"]),
+            "bias_scores": dict(served["bias_scores"]),
+            "severity": served["severity"]
+        }
+        try:
+            self.executor.submit(self._run, text, categories, served, served_ms)
+        except RuntimeError:
+            # Executor shut down
+            with self._lock:
+                self.pending -= 1
+            return False
+        return True
+
+    def _timed(self, detect: Callable[[str], Dict], text: str):
+        started = time.perf_counter()
+        result = detect(text)
+        return result, (time.perf_counter() - started) * 1000
+
+    def _run(self, text: str, categories: Optional[List[str]], served: Dict, served_ms: Optional[float]):
+        try:
+            if self.baseline is not None:
+                primary, primary_ms = self._timed(self.baseline, text)
+                primary = filter_categories(primary, categories)
+            else:
+                primary, primary_ms = served, served_ms
+            candidate, candidate_ms = self._timed(self.candidate, text)
+            candidate = filter_categories(candidate, categories)
+            same_categories = set(candidate["bias_categories"]) == set(primary["bias_categories"])
+            same_severity = candidate["severity"] == primary["severity"]
+            with self._lock:
+                self.completed += 1
+                if primary_ms is not None:
+                    self.latency_ms["primary"].update(primary_ms)
+                self.latency_ms["candidate"].update(candidate_ms)
+                self.category_disagreements += not same_categories
+                self.severity_disagreements += not same_severity
+            if not (same_categories and same_severity):
+                self._log_disagreement(text, primary, candidate)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            logger.exception("Shadow engine %s failed", self.engine)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _log_disagreement(self, text: str, served: Dict, candidate: Dict):
+        record = {
+            "time": time.time(),
+            "engine": self.engine,
+            "text_hash": hash_text(text),
+            "primary": {k: served[k] for k in ("bias_categories", "bias_scores", "severity")},
+            "candidate": {k: candidate[k] for k in ("bias_categories", "bias_scores", "severity")}
+        }
+        if self.log_text_chars > 0:
+            record["text"] = text[:self.log_text_chars]
+        logger.info("Shadow disagreement (%s): %s vs %s", self.engine,
+                    record["primary"]["bias_categories"], record["candidate"]["bias_categories"])
+        if self.log_path:
+            with self._log_lock:
+                self._rotate_log()
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def _rotate_log(self):
+        """Move a full log file aside, replacing the previous one"""
+        if not self.log_max_bytes:
+            return
+        try:
+            if os.path.getsize(self.log_path) < self.log_max_bytes:
+                return
+            # Atomic, so workers rotating at the same time lose at most a backup
+            os.replace(self.log_path, self.log_path + ".1")
+        except FileNotFoundError:
+            pass
+
+    def wait(self, timeout: float = 5.0):
+        """Block until queued shadow work is done (for tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latency = {}
+            for name, stats in self.latency_ms.items():
+                lower, upper = stats.confidence_interval()
+                latency[name] = {
+                    "count": stats.count,
+                    "mean": round(stats.mean, 3),
+                    "std": round(stats.std, 3),
+                    "mean_ci": [lower, upper]
+                }
+            primary, candidate = self.latency_ms["primary"], self.latency_ms["candidate"]
+            completed = self.completed
+            return {
+                "engine": self.engine,
+                "baseline": "served" if self.baseline is None else "sparse",
+                "sample_rate": self.sample_rate,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "completed": completed,
+                "dropped_load": self.dropped_load,
+                "dropped_full": self.dropped_full,
+                "errors": self.errors,
+                "category_agreement": round(1 - self.category_disagreements / completed, 4) if completed else None,
+                "severity_agreement": round(1 - self.severity_disagreements / completed, 4) if completed else None,
+                "latency_ms": latency,
+                "speedup": round(primary.mean / candidate.mean, 3) if completed and candidate.mean > 0 else None
+            }
+
+def _admission_busy() -> bool:
+    """
+    Whether requests are waiting for admission or every admission slot is taken
+
+    The calling request's own slot is not counted: it is released before
+    the shadow work matters, and with max_concurrency=1 it would otherwise
+    always fill the controller.
+    """
+    from app.utils.admission import admission_controller, admission_slot
+
+    others = admission_controller.in_flight - (1 if admission_slot.get() else 0)
+    return admission_controller.queue_depth > 0 or others >= admission_controller.max_concurrency
+
+_shadow_runner = None
+_shadow_failed = False
+
+def get_shadow_runner() -> Optional[ShadowRunner]:
+    """Shared shadow runner, or None when shadow mode is off (or its engine cannot be loaded)"""
+    global _shadow_runner, _shadow_failed
+    if _shadow_runner is None and not _shadow_failed and config.SHADOW_ENGINE and config.SHADOW_SAMPLE_RATE > 0:
+        try:
+            candidate = resolve_engine(config.SHADOW_ENGINE)
+            baseline = resolve_baseline(config.SHADOW_ENGINE)
+        except Exception:
+            # Never let the shadow engine break the primary path
+            logger.exception("Shadow mode disabled: cannot load engine %s", config.SHADOW_ENGINE)
+            _shadow_failed = True
+            return None
+        if config.SHADOW_LOG_PATH:
+            os.makedirs(os.path.dirname(os.path.abspath(config.SHADOW_LOG_PATH)), exist_ok=True)
+        _shadow_runner = ShadowRunner(
+            config.SHADOW_ENGINE, candidate, baseline,
+            sample_rate=config.SHADOW_SAMPLE_RATE,
+            max_pending=config.SHADOW_MAX_PENDING,
+            workers=config.SHADOW_WORKERS,
+            log_path=config.SHADOW_LOG_PATH or None,
+            log_max_bytes=config.SHADOW_LOG_MAX_BYTES or None,
+            log_text_chars=config.SHADOW_LOG_TEXT_CHARS,
+            under_load=_admission_busy
+        )
+    return _shadow_runner
+
+def stop_shadow_runner():
+    """Drop queued shadow work on shutdown"""
+    if _shadow_runner is not None:
+        _shadow_runner.shutdown()
@@ -0,0 +1,505 @@
+"""
+Per-tenant custom lexicons
+
+A tenant registers a lexicon that extends (or replaces) bias_lexicons.json
+by adding and removing terms, and then references it with `lexicon_id` on
+detection requests. Definitions are stored in SQLite so every worker on the
+node sees them. Each worker compiles a definition on first use and keeps the
+compiled lexicons in a size-bounded LRU, so one deployment serves many
+tenants without recompiling per request or keeping every tenant in memory.
+Tenant lexicons are scored through their own compiled lexicon, never
+through a copy of the shared detector.
+"""
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app import config
+from app.utils.compiled_lexicon import CompiledLexicon, flatten_lexicon, normalize_term
+from app.utils.lexicon import compute_lexicon_version
+
+LEXICON_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+_GROUP_RE = re.compile(r"^\w+$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lexicons (
+    lexicon_id TEXT PRIMARY KEY,
+    definition TEXT NOT NULL,
+    version TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+class LexiconValidationError(ValueError):
+    """A lexicon definition that cannot be applied"""
+
+class TenantScoringUnavailable(RuntimeError):
+    """Custom lexicons cannot be scored until calibrated batch scoring weights are loaded"""
+
+def _check_groups(value, path: str, removing: bool = False):
+    if isinstance(value, dict):
+        if not value and not removing:
+            raise LexiconValidationError(f"{path} is empty")
+        for key, child in value.items():
+            if not isinstance(key, str) or not _GROUP_RE.match(key):
+                raise LexiconValidationError(f"Invalid group name {key!r} in {path}")
+            _check_groups(child, f"{path}.{key}", removing)
+    elif isinstance(value, list):
+        for term in value:
+            if not isinstance(term, str) or not term.strip():
+                raise LexiconValidationError(f"{path} contains an empty or non-string term")
+    else:
+        raise LexiconValidationError(f"{path} must be an object of groups or a list of terms")
+
+def _add(target: Dict, additions: Dict, path: str):
+    for key, value in additions.items():
+        if isinstance(value, dict):
+            existing = target.setdefault(key, {})
+            if not isinstance(existing, dict):
+                raise LexiconValidationError(f"{path}.{key} is a term list, not a group of groups")
+            _add(existing, value, f"{path}.{key}")
+        else:
+            existing = target.setdefault(key, [])
+            if not isinstance(existing, list):
+                raise LexiconValidationError(f"{path}.{key} is a group of groups, not a term list")
+            known = {normalize_term(term) for term in existing}
+            for term in value:
+                if normalize_term(term) not in known:
+                    existing.append(term.strip())
+                    known.add(normalize_term(term))
+
+def _remove(target: Dict, removals: Dict, path: str):
+    for key, value in removals.items():
+        if key not in target:
+            raise LexiconValidationError(f"Cannot remove from unknown group {path}.{key}")
+        existing = target[key]
+        if isinstance(value, dict):
+            if not isinstance(existing, dict):
+                raise LexiconValidationError(f"{path}.{key} is a term list, not a group of groups")
+            _remove(existing, value, f"{path}.{key}")
+        else:
+            if not isinstance(existing, list):
+                raise LexiconValidationError(f"{path}.{key} is a group of groups, not a term list")
+            dropped = {normalize_term(term) for term in value}
+            missing = dropped - {normalize_term(term) for term in existing}
+            if missing:
+                raise LexiconValidationError(
+                    f"Terms not in {path}.{key}: {', '.join(sorted(missing))}"
+                )
+            target[key] = [term for term in existing if normalize_term(term) not in dropped]
+
+def _skeleton(lexicons: Dict) -> Dict:
+    """The lexicon's categories and groups with every term list empty"""
+    return {
+        key: _skeleton(value) if isinstance(value, dict) else []
+        for key, value in lexicons.items()
+    }
+
+def build_lexicon(definition: Dict, base: Dict, max_terms: Optional[int] = None) -> Dict:
+    """
+    Apply a tenant definition to the base lexicon
+
+    Args:
+        definition: {'extends_default': bool, 'add': {...}, 'remove': {...}},
+            where 'add' and 'remove' mirror the nesting of the lexicon JSON
+            (category -> group -> terms). Without extends_default the
+            base's categories and groups are kept with no terms, so the
+            detector still finds the structure it expects
+        base: Default lexicon; categories outside it are rejected, since
+            scoring and category filters only know those
+        max_terms: Maximum terms in the resulting lexicon
+
+    Returns:
+        The tenant's full lexicon dictionary
+
+    Raises:
+        LexiconValidationError: If the definition is malformed or removes
+            groups or terms that do not exist
+    """
+    additions = definition.get("add") or {}
+    removals = definition.get("remove") or {}
+    for name, section in (("add", additions), ("remove", removals)):
+        if not isinstance(section, dict):
+            raise LexiconValidationError(f"'{name}' must be an object of categories")
+        unknown = [cat for cat in section if cat not in base]
+        if unknown:
+            raise LexiconValidationError(
+                f"Unknown categories in '{name}': {', '.join(unknown)}. Valid categories are: {', '.join(base)}"
+            )
+        for category, groups in section.items():
+            if not isinstance(groups, dict):
+                raise LexiconValidationError(f"{name}.{category} must be an object of groups")
+            _check_groups(groups, f"{name}.{category}", removing=name == "remove")
+
+    lexicons = copy.deepcopy(base) if definition.get("extends_default", True) else _skeleton(base)
+    _add(lexicons, additions, "lexicon")
+    _remove(lexicons, removals, "lexicon")
+
+    n_terms = sum(len(terms) for _, _, terms in flatten_lexicon(lexicons))
+    if n_terms == 0:
+        raise LexiconValidationError("The resulting lexicon has no terms")
+    if max_terms is not None and n_terms > max_terms:
+        raise LexiconValidationError(f"The resulting lexicon has {n_terms} terms (maximum {max_terms})")
+    return lexicons
+
+class CompiledLexiconDetector:
+    """
+    Lexicon scoring through a tenant's compiled lexicon only
+
+    Implements detect_lexicon_bias with a BatchScorer over the compiled
+    lexicon. Tenant lexicons keep the default categories and groups, so a
+    calibrated reference scorer's group weights and flag thresholds are
+    reused by name. Uncalibrated weights are never served (see
+    app.utils.batch_scoring): without a calibrated reference the detector
+    refuses to score.
+
+    Args:
+        lexicons: The tenant's full lexicon dictionary
+        compiled: The same lexicon compiled
+        reference: Scorer of the default lexicon to take calibrated weights from
+    """
+
+    def __init__(self, lexicons: Dict, compiled: CompiledLexicon, reference=None):
+        from app.utils.batch_scoring import BatchScorer
+
+        self.bias_lexicons = lexicons
+        if reference is not None and reference.calibrated:
+            self.scorer = BatchScorer(
+                compiled,
+                dict(zip(reference.lexicon.groups, reference.group_weights.tolist())),
+                reference.calibration,
+                dict(zip(reference.lexicon.categories, reference.thresholds.tolist()))
+            )
+        else:
+            self.scorer = None
+
+    @property
+    def calibrated(self) -> bool:
+        return self.scorer is not None
+
+    @property
+    def engine(self) -> str:
+        """Identity of the scoring engine and weights, part of the tenant's version"""
+        return f"sparse:{self.scorer.weights_digest()}" if self.scorer is not None else "uncalibrated"
+
+    def detect_lexicon_bias(self, text: str) -> Dict:
+        """
+        Scores in the shape of BiasDetector.detect_lexicon_bias results
+
+        Raises:
+            TenantScoringUnavailable: If no calibrated weights are loaded
+        """
+        if self.scorer is None:
+            raise TenantScoringUnavailable(
+                "Custom lexicons cannot be scored until batch scoring weights are calibrated"
+            )
+        return self.scorer.score([text])[0]
+
+class TenantLexicon:
+    """
+    A lexicon ready for detection: scoring detector, compiled matcher and version
+
+    The default lexicon is represented the same way with lexicon_id None, so
+    detection code handles both alike. `version` identifies the results
+    (cache keys and ETags); `definition_version` identifies the lexicon
+    content alone and is what the store compares.
+    """
+
+    def __init__(self, lexicon_id: Optional[str], version: str, detector, compiled: CompiledLexicon,
+                 definition_version: Optional[str] = None):
+        self.lexicon_id = lexicon_id
+        self.version = version
+        self.detector = detector
+        self.compiled = compiled
+        self.definition_version = definition_version or version
+        self._rules = None
+
+    @classmethod
+    def build(cls, lexicon_id: str, lexicons: Dict, reference_scorer=None) -> "TenantLexicon":
+        """
+        Compile a tenant lexicon
+
+        The detector matches through the compiled lexicon only (see
+        CompiledLexiconDetector), so no state of the shared detector is
+        reused with a lexicon it was not built for. The version covers the
+        lexicon ID and the scoring weights as well as the content: a tenant
+        with the default's terms is still scored by another engine, and a
+        recalibration changes every tenant's results.
+        """
+        compiled = CompiledLexicon.build(lexicons)
+        detector = CompiledLexiconDetector(lexicons, compiled, reference_scorer)
+        definition_version = compute_lexicon_version(lexicons)
+        version = compute_lexicon_version({
+            "lexicon_id": lexicon_id, "definition": definition_version, "engine": detector.engine
+        })
+        return cls(lexicon_id, version, detector, compiled, definition_version)
+
+    def find_patterns(self, text: str) -> List[Dict]:
+        """Proximity patterns (see app.utils.proximity) using this lexicon"""
+        from app.utils.proximity import PositionalIndex, default_rules, find_patterns
+
+        if self.lexicon_id is None:
+            return find_patterns(text)
+        if self._rules is None:
+            self._rules = default_rules(self.compiled)
+        return find_patterns(text, self._rules, PositionalIndex.build(text, self.compiled))
+
+_default_lexicon = None
+
+def get_default_lexicon() -> TenantLexicon:
+    """The deployment's own lexicon as a TenantLexicon"""
+    global _default_lexicon
+    if _default_lexicon is None:
+        from app.models.bias_detector import bias_detector
+        from app.utils.compiled_lexicon import get_compiled_lexicon
+        from app.utils.lexicon import get_lexicon_version
+
+        _default_lexicon = TenantLexicon(None, get_lexicon_version(), bias_detector, get_compiled_lexicon())
+    return _default_lexicon
+
+class TenantLexiconStore:
+    """SQLite table of registered lexicon definitions"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def put(self, lexicon_id: str, definition: Dict, version: str):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO lexicons (lexicon_id, definition, version, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (lexicon_id) DO UPDATE SET "
+                "definition = excluded.definition, version = excluded.version, updated_at = excluded.updated_at",
+                (lexicon_id, json.dumps(definition), version, now, now)
+            )
+        finally:
+            conn.close()
+
+    def get(self, lexicon_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT lexicon_id, definition, version, created_at, updated_at FROM lexicons WHERE lexicon_id = ?",
+                (lexicon_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {
+            "lexicon_id": row[0],
+            "definition": json.loads(row[1]),
+            "version": row[2],
+            "created_at": row[3],
+            "updated_at": row[4]
+        }
+
+    def version(self, lexicon_id: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT version FROM lexicons WHERE lexicon_id = ?", (lexicon_id,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def list(self) -> List[Dict]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT lexicon_id, version, created_at, updated_at FROM lexicons ORDER BY lexicon_id"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [
+            {"lexicon_id": lexicon_id, "version": version, "created_at": created_at, "updated_at": updated_at}
+            for lexicon_id, version, created_at, updated_at in rows
+        ]
+
+    def delete(self, lexicon_id: str) -> bool:
+        conn = self._connect()
+        try:
+            return conn.execute("DELETE FROM lexicons WHERE lexicon_id = ?", (lexicon_id,)).rowcount > 0
+        finally:
+            conn.close()
+
+class TenantLexiconRegistry:
+    """
+    Registered lexicons with an LRU of compiled matchers per worker
+
+    Cached entries are re-checked against the store at most every
+    `refresh_seconds`, so a lexicon updated through another worker is
+    picked up without a restart. Usage counters are kept for the
+    `usage_capacity` most recently used lexicons.
+    """
+
+    def __init__(self, store: TenantLexiconStore, base_lexicons: Dict, reference_scorer=None,
+                 capacity: int = 32, refresh_seconds: float = 30, max_terms: Optional[int] = None,
+                 usage_capacity: int = 1024):
+        self.store = store
+        self.base_lexicons = base_lexicons
+        self.reference_scorer = reference_scorer
+        self.capacity = capacity
+        self.usage_capacity = usage_capacity
+        self.refresh_seconds = refresh_seconds
+        self.max_terms = max_terms
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compile_seconds = 0.0
+        self._entries: "OrderedDict[str, TenantLexicon]" = OrderedDict()
+        self._checked: Dict[str, float] = {}
+        self._usage: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _compile(self, lexicon_id: str, definition: Dict) -> TenantLexicon:
+        started = time.perf_counter()
+        lexicons = build_lexicon(definition, self.base_lexicons, self.max_terms)
+        lexicon = TenantLexicon.build(lexicon_id, lexicons, self.reference_scorer)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.compile_seconds += elapsed
+            self._usage_entry(lexicon_id)["compiles"] += 1
+        return lexicon
+
+    def _insert(self, lexicon: TenantLexicon):
+        with self._lock:
+            self._entries[lexicon.lexicon_id] = lexicon
+            self._entries.move_to_end(lexicon.lexicon_id)
+            self._checked[lexicon.lexicon_id] = time.monotonic()
+            while len(self._entries) > self.capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                self._checked.pop(evicted, None)
+                self.evictions += 1
+
+    def register(self, lexicon_id: str, definition: Dict) -> TenantLexicon:
+        """
+        Validate, compile and store a lexicon (replacing any previous version)
+
+        Raises:
+            LexiconValidationError: If the ID or definition is invalid
+        """
+        if not LEXICON_ID_RE.match(lexicon_id):
+            raise LexiconValidationError(
+                "lexicon_id must be 1-64 letters, digits, '_', '-' or '.', starting with a letter or digit"
+            )
+        lexicon = self._compile(lexicon_id, definition)
+        self.store.put(lexicon_id, definition, lexicon.definition_version)
+        self._insert(lexicon)
+        return lexicon
+
+    def get(self, lexicon_id: str) -> Optional[TenantLexicon]:
+        """Compiled lexicon for an ID, or None if it is not registered"""
+        now = time.monotonic()
+        with self._lock:
+            lexicon = self._entries.get(lexicon_id)
+            fresh = lexicon is not None and now - self._checked[lexicon_id] < self.refresh_seconds
+            if fresh:
+                self._entries.move_to_end(lexicon_id)
+                self.hits += 1
+                self._touch(lexicon_id)
+                return lexicon
+
+        if lexicon is not None and self.store.version(lexicon_id) == lexicon.definition_version:
+            with self._lock:
+                self._checked[lexicon_id] = now
+                self.hits += 1
+                self._touch(lexicon_id)
+            return lexicon
+
+        record = self.store.get(lexicon_id)
+        if record is None:
+            with self._lock:
+                self._entries.pop(lexicon_id, None)
+                self._checked.pop(lexicon_id, None)
+                self._usage.pop(lexicon_id, None)
+            return None
+
+        lexicon = self._compile(lexicon_id, record["definition"])
+        self._insert(lexicon)
+        with self._lock:
+            self.misses += 1
+            self._touch(lexicon_id)
+        return lexicon
+
+    def _usage_entry(self, lexicon_id: str) -> Dict:
+        usage = self._usage.get(lexicon_id)
+        if usage is None:
+            usage = self._usage[lexicon_id] = {"requests": 0, "compiles": 0, "last_used": None}
+            while len(self._usage) > self.usage_capacity:
+                self._usage.popitem(last=False)
+        self._usage.move_to_end(lexicon_id)
+        return usage
+
+    def _touch(self, lexicon_id: str):
+        usage = self._usage_entry(lexicon_id)
+        usage["requests"] += 1
+        usage["last_used"] = time.time()
+
+    def delete(self, lexicon_id: str) -> bool:
+        """Remove a lexicon; other workers drop it at their next refresh check"""
+        deleted = self.store.delete(lexicon_id)
+        with self._lock:
+            self._entries.pop(lexicon_id, None)
+            self._checked.pop(lexicon_id, None)
+            self._usage.pop(lexicon_id, None)
+        return deleted
+
+    def usage(self, lexicon_id: str) -> Optional[Dict]:
+        with self._lock:
+            usage = self._usage.get(lexicon_id)
+            return dict(usage, cached=lexicon_id in self._entries) if usage else None
+
+    def cached(self) -> List[TenantLexicon]:
+        """Lexicons currently compiled in this worker"""
+        with self._lock:
+            return list(self._entries.values())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "compile_seconds": round(self.compile_seconds, 4),
+                "compiled_bytes": sum(lexicon.compiled.size_bytes for lexicon in self._entries.values())
+            }
+
+_registry = None
+
+def get_tenant_registry() -> TenantLexiconRegistry:
+    """Shared registry for the configured database"""
+    global _registry
+    if _registry is None:
+        from app.models.bias_detector import bias_detector
+        from app.utils.batch_scoring import get_batch_scorer
+
+        _registry = TenantLexiconRegistry(
+            TenantLexiconStore(config.TENANT_LEXICONS_DB_PATH),
+            bias_detector.bias_lexicons,
+            get_batch_scorer(),
+            capacity=config.TENANT_LEXICON_CACHE_SIZE,
+            refresh_seconds=config.TENANT_LEXICON_REFRESH_SECONDS,
+            max_terms=config.TENANT_LEXICON_MAX_TERMS
+        )
+    return _registry
@@ -2,6 +2,8 @@ import re
 from typing import List, Dict
 import nltk
 from collections import Counter
+from app.utils.matches import MatchArray
+from app.utils.normalization import fold, normalize_text, tokenize
 
 # Download required NLTK data (run once)
 try:
@@ -10,8 +12,9 @@ except LookupError:
     nltk.download('punkt', quiet=True)
 
 def tokenize_text(text: str) -> List[str]:
-    """Tokenize text into words"""
-    return re.findall(r'\b\w+\b', text.lower())
+    """Tokenize text into normalized words (shared with lexicon matching)"""
+    # A copy: the memoized tokenization is shared with the other stages
+    return list(tokenize(text).norms)
 
 def get_sentences(text: str) -> List[str]:
     """Split text into sentences"""
@@ -46,26 +49,25 @@ def get_word_frequencies(text: str, top_n: int = 20) -> Dict[str, int]:
 
 def clean_text(text: str) -> str:
     """Clean and normalize text"""
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
+    # Compose characters, collapse whitespace, ASCII apostrophes and hyphens
+    text = fold(normalize_text(text))
     # Remove special characters but keep punctuation
     text = re.sub(r'[^\w\s.,!?;:\'-]', '', text)
     return text.strip()
 
 def highlight_terms(text: str, terms: List[str], case_sensitive: bool = False) -> List[Dict]:
     """Find and highlight specific terms in text"""
-    highlights = []
-    
+    return find_term_matches(text, terms, case_sensitive).to_highlights()
+
+def find_term_matches(text: str, terms: List[str], case_sensitive: bool = False) -> MatchArray:
+    """Find specific terms in text as compact match records (context is built on serialization)"""
+    matches = MatchArray(text)
+    flags = 0 if case_sensitive else re.IGNORECASE
+
     for term in terms:
-        flags = 0 if case_sensitive else re.IGNORECASE
         pattern = r'\b' + re.escape(term) + r'\b'
-        
         for match in re.finditer(pattern, text, flags):
-            highlights.append({
-                "term": match.group(),
-                "start": match.start(),
-                "end": match.end(),
-                "context": text[max(0, match.start()-30):min(len(text), match.end()+30)]
-            })
-    
-    return sorted(highlights, key=lambda x: x['start'])
+            matches.append(match.start(), match.end())
+
+    matches.sort()
+    return matches
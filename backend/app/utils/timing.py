@@ -0,0 +1,112 @@
+"""
+Per-request stage timings and opt-in profiling
+
+A RequestTimer is attached to each request through a context variable, so
+route code (including sync handlers running in the threadpool) can record
+stages with `with stage("highlighting"):` without passing it around. The
+timings are returned in a Server-Timing header.
+"""
+import cProfile
+import functools
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app import config
+
+_current_timer: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+class RequestTimer:
+    """Stage durations (ms) of one request"""
+
+    __slots__ = ("started", "handler_started", "stages", "profile", "profile_stats")
+
+    def __init__(self, profile: bool = False):
+        self.started = time.perf_counter()
+        self.handler_started: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.profile = profile
+        self.profile_stats: Optional[List[Dict]] = None
+
+    def add(self, name: str, ms: float):
+        # Stages that run more than once (e.g. per chunk) accumulate
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def header(self) -> str:
+        """Server-Timing header value, including the total so far"""
+        entries = [f"{name};dur={ms:.3f}" for name, ms in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.3f}")
+        return ", ".join(entries)
+
+def start_request(profile: bool = False):
+    """Attach a new timer to the current context; returns (timer, token for end_request)"""
+    timer = RequestTimer(profile=profile)
+    return timer, _current_timer.set(timer)
+
+def end_request(token):
+    _current_timer.reset(token)
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current_timer.get()
+
+def profiling_active() -> bool:
+    """Whether the current request runs under the profiler"""
+    timer = _current_timer.get()
+    return timer is not None and timer.profile
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a named stage of the current request (no-op outside a request)"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, (time.perf_counter() - started) * 1000)
+
+def top_functions(profiler: cProfile.Profile, limit: int = 25) -> List[Dict]:
+    """Most expensive functions of a profile by cumulative time"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3)
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+def instrumented(func):
+    """
+    Decorator for route handlers
+
+    Records the time from request arrival to the handler (body parsing and
+    validation) as the 'validation' stage, and runs the handler under
+    cProfile when the request asked for profiling. cProfile only sees the
+    current thread, so the profile is taken inside the handler itself.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timer = _current_timer.get()
+        if timer is None:
+            return func(*args, **kwargs)
+        timer.handler_started = time.perf_counter()
+        # Everything before the handler except waiting for admission
+        waited = timer.stages.get("queue", 0.0)
+        timer.add("validation", (timer.handler_started - timer.started) * 1000 - waited)
+        if not timer.profile:
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            timer.profile_stats = top_functions(profiler, config.PROFILE_TOP_FUNCTIONS)
+    return wrapper
@@ -0,0 +1,140 @@
+"""
+Throughput benchmark for the detection pipeline stages
+
+Measures texts per second for lexicon detection alone, with highlighting,
+and with the spaCy linguistic stage (for each requested process count),
+so the cost of each optional stage is visible before it is enabled. The
+sparse batch scorer used by /detect/batch is measured too, with its parity
+against the detector.
+
+Usage (from backend/):
+    python benchmarks/bench_pipeline.py --texts 2000
+    python benchmarks/bench_pipeline.py --input corpus.txt --n-process 1 2 4 --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_TEXTS = [
+    "The weather today is pleasant and sunny.",
+    "The female nurse assisted the male doctor with surgery.",
+    "He bought a black car and an old house last year.",
+    "The inner-city youth were suspected of criminal activity.",
+    "Muslim immigrants are likely to be terrorists.",
+    "Poor people are lazy and looking for handouts.",
+    "The elderly worker is too old to learn new technology.",
+    "Asian students are naturally good at math and science.",
+    "The committee reviewed the quarterly budget in detail.",
+    "Women are too emotional to be effective leaders.",
+]
+
+def load_texts(path: str, count: int) -> List[str]:
+    """Texts from a file (one per line, or JSON lines with a 'text' field), else the samples"""
+    if path:
+        texts = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                texts.append(json.loads(line)["text"] if line.startswith("{") else line)
+    else:
+        texts = SAMPLE_TEXTS
+    return (texts * (count // len(texts) + 1))[:count]
+
+def measure(name: str, texts: List[str], run: Callable[[List[str]], None], repeat: int) -> Dict:
+    """Best-of-`repeat` throughput of run(texts)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(texts)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "stage": name,
+        "texts": len(texts),
+        "seconds": round(best, 4),
+        "texts_per_second": round(len(texts) / best, 1) if best else None,
+        "ms_per_text": round(best * 1000 / len(texts), 4)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark detection pipeline stages")
+    parser.add_argument("--input", default="", help="Corpus file (default: built-in samples)")
+    parser.add_argument("--texts", type=int, default=1000, help="Number of texts to process")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (best is reported)")
+    parser.add_argument("--batch-size", type=int, default=64, help="spaCy nlp.pipe batch size")
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1], help="spaCy process counts to test")
+    parser.add_argument("--spacy-model", default="en_core_web_sm")
+    parser.add_argument("--json", default="", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    from app.models.bias_detector import bias_detector
+    from app.utils.batch_scoring import compare, get_batch_scorer
+    from app.utils.compiled_lexicon import get_compiled_lexicon
+    from app.utils.matches import lexicon_matches
+
+    texts = load_texts(args.input, args.texts)
+    lexicon = get_compiled_lexicon()
+
+    def lexicon_stage(batch):
+        return [bias_detector.detect_lexicon_bias(text) for text in batch]
+
+    def with_matches(batch):
+        results = lexicon_stage(batch)
+        return [
+            lexicon_matches(text, lexicon, r["bias_categories"]) if r["has_bias"]
+            else lexicon_matches(text, lexicon, [])
+            for text, r in zip(batch, results)
+        ]
+
+    scorer = get_batch_scorer()
+
+    def sparse_batch(batch):
+        return scorer.score(batch)
+
+    rows = [
+        measure("lexicon", texts, lexicon_stage, args.repeat),
+        measure("lexicon+highlights", texts, with_matches, args.repeat),
+        measure("sparse batch" + ("" if scorer.calibrated else " (uncalibrated)"), texts, sparse_batch, args.repeat),
+    ]
+    parity = compare(lexicon_stage(texts), sparse_batch(texts))
+
+    try:
+        from app.utils.linguistic import LinguisticFilter
+        linguistic_filter = LinguisticFilter(args.spacy_model, batch_size=args.batch_size, lexicon=lexicon)
+        linguistic_filter.nlp
+    except (ImportError, OSError) as e:
+        print(f"Skipping linguistic stage: {e}", file=sys.stderr)
+    else:
+        for n_process in args.n_process:
+            def with_linguistic(batch, n_process=n_process):
+                linguistic_filter.filter(batch, with_matches(batch), n_process=n_process)
+
+            rows.append(measure(f"lexicon+linguistic (n_process={n_process})", texts, with_linguistic, args.repeat))
+
+    baseline = rows[0]["texts_per_second"]
+    print(f"{'stage':<40} {'texts/s':>10} {'ms/text':>10} {'vs lexicon':>11}")
+    for row in rows:
+        row["relative_throughput"] = round(row["texts_per_second"] / baseline, 3) if baseline else None
+        print(f"{row['stage']:<40} {row['texts_per_second']:>10} {row['ms_per_text']:>10} "
+              f"{row['relative_throughput']:>10}x")
+    print(f"\nsparse batch vs detector: {parity['category_agreement']:.1%} same categories, "
+          f"{parity['within_tolerance']:.1%} within {parity['tolerance']}, mean abs error {parity['mean_abs_error']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "texts": len(texts),
+                "batch_size": args.batch_size,
+                "results": rows,
+                "sparse_parity": parity
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Load-testing harness: throughput and latency across concurrency levels
+
+Drives the API with a configurable traffic mix (neutral vs biased, short vs
+long texts, /detect vs /analyze) at each requested concurrency level and
+reports throughput, p50/p99 latency and error rates.
+
+Two targets are supported:
+  * in-process (default): the ASGI app is called through httpx's ASGI
+    transport, with no network or server in between
+  * --server: app.server is launched locally once per --workers value and
+    driven over HTTP, to see how throughput scales with worker processes
+
+Usage (from backend/):
+    python benchmarks/load_test.py --concurrency 1 4 16 64 --duration 10
+    python benchmarks/load_test.py --server --workers 1 2 4 --concurrency 8 32 --json capacity.json
+    python benchmarks/load_test.py --mix detect=0.5,analyze=0.5 --biased 0.3 --long 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+NEUTRAL_TEXTS = [
+    "The weather today is pleasant and sunny.",
+    "The committee reviewed the quarterly budget in detail.",
+    "Our team shipped the new release after a week of testing.",
+    "The library extended its opening hours during exams.",
+]
+BIASED_TEXTS = [
+    "The female nurse assisted the male doctor with surgery.",
+    "Women are too emotional to be effective leaders.",
+    "The inner-city youth were suspected of criminal activity.",
+    "The elderly worker is too old to learn new technology.",
+    "Poor people are lazy and looking for handouts.",
+]
+LONG_TEXT_CHARS = 8000
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse 'detect=0.7,analyze=0.3' into endpoint weights"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("detect", "analyze"):
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+class TrafficMix:
+    """Generates request (path, body, kind) tuples with the configured proportions"""
+
+    def __init__(self, endpoints: Dict[str, float], biased: float, long: float, seed: int = 0):
+        self.endpoints = list(endpoints)
+        self.weights = [endpoints[name] for name in self.endpoints]
+        self.biased = biased
+        self.long = long
+        self.random = random.Random(seed)
+
+    def _text(self, biased: bool, long: bool) -> str:
+        pool = BIASED_TEXTS if biased else NEUTRAL_TEXTS
+        if not long:
+            return self.random.choice(pool)
+        sentences = []
+        while sum(len(s) + 1 for s in sentences) < LONG_TEXT_CHARS:
+            sentences.append(self.random.choice(pool if self.random.random() < 0.3 else NEUTRAL_TEXTS))
+        return " ".join(sentences)
+
+    def next(self):
+        endpoint = self.random.choices(self.endpoints, self.weights)[0]
+        biased = self.random.random() < self.biased
+        long = self.random.random() < self.long
+        kind = f"{endpoint}/{'biased' if biased else 'neutral'}/{'long' if long else 'short'}"
+        return f"/api/v1/{endpoint}", {"text": self._text(biased, long)}, kind
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+async def run_level(client: httpx.AsyncClient, mix: TrafficMix, concurrency: int,
+                    duration: float, warmup: float) -> Dict:
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    failures = 0
+    measuring = False
+
+    async def user():
+        nonlocal failures
+        while not stop:
+            path, body, _ = mix.next()
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if not measuring:
+                continue
+            if status_code is None:
+                failures += 1
+            else:
+                statuses[status_code] = statuses.get(status_code, 0) + 1
+                if status_code < 400:
+                    latencies.append(elapsed_ms)
+
+    stop = False
+    users = [asyncio.create_task(user()) for _ in range(concurrency)]
+    await asyncio.sleep(warmup)
+    measuring = True
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    measuring = False
+    elapsed = time.perf_counter() - started
+    stop = True
+    await asyncio.gather(*users)
+
+    total = sum(statuses.values()) + failures
+    errors = failures + sum(n for code, n in statuses.items() if code >= 400 and code != 503)
+    shed = statuses.get(503, 0)
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "shed_rate": round(shed / total, 4) if total else 0.0,
+        "status_counts": {str(code): n for code, n in sorted(statuses.items())}
+    }
+
+async def sweep(client: httpx.AsyncClient, args, workers: Optional[int]) -> List[Dict]:
+    rows = []
+    for concurrency in args.concurrency:
+        mix = TrafficMix(args.mix, args.biased, args.long, seed=args.seed)
+        row = await run_level(client, mix, concurrency, args.duration, args.warmup)
+        row["workers"] = workers
+        rows.append(row)
+        print_row(row)
+    return rows
+
+def print_header():
+    print(f"{'workers':>7} {'conc':>5} {'reqs':>7} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7} {'shed':>7}")
+
+def print_row(row: Dict):
+    def fmt(value):
+        return "-" if value is None else value
+    print(f"{fmt(row['workers']):>7} {row['concurrency']:>5} {row['requests']:>7} {row['throughput_rps']:>9} "
+          f"{fmt(row['p50_ms']):>9} {fmt(row['p99_ms']):>9} {row['error_rate']:>7.2%} {row['shed_rate']:>7.2%}",
+          flush=True)
+
+def launch_server(workers: int, port: int, ready_timeout: float = 120) -> subprocess.Popen:
+    """Start app.server and wait until every worker is warmed up"""
+    ready_file = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "ready")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", str(workers), "--port", str(port),
+         "--host", "127.0.0.1", "--ready-file", ready_file, "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ, JOB_WORKERS="0")
+    )
+    deadline = time.monotonic() + ready_timeout
+    while not os.path.exists(ready_file):
+        if process.poll() is not None or time.monotonic() > deadline:
+            stop_server(process)
+            raise RuntimeError(f"Server with {workers} workers did not become ready")
+        time.sleep(0.2)
+    return process
+
+def stop_server(process: subprocess.Popen):
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def main_async(args) -> List[Dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    timeout = httpx.Timeout(args.timeout)
+    rows = []
+    print_header()
+
+    if not args.server:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            rows.extend(await sweep(client, args, None))
+        return rows
+
+    for workers in args.workers:
+        process = launch_server(workers, args.port)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}",
+                                         limits=limits, timeout=timeout) as client:
+                rows.extend(await sweep(client, args, workers))
+        finally:
+            stop_server(process)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Bias Detection API")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="Concurrent in-flight requests to test")
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before each level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("detect=0.8,analyze=0.2"),
+                        help="Endpoint weights, e.g. detect=0.8,analyze=0.2")
+    parser.add_argument("--biased", type=float, default=0.5, help="Fraction of biased texts")
+    parser.add_argument("--long", type=float, default=0.1, help=f"Fraction of ~{LONG_TEXT_CHARS}-char texts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--server", action="store_true", help="Launch app.server instead of calling the app in-process")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="Worker counts to test with --server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", default="", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    rows = asyncio.run(main_async(args))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "target": "server" if args.server else "in-process",
+                "mix": args.mix,
+                "biased": args.biased,
+                "long": args.long,
+                "duration_seconds": args.duration,
+                "results": rows
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Tests for admission control and load shedding
+"""
+import pytest
+import sys
+import os
+import asyncio
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.admission import AdmissionController
+
+
+def _controller(**kwargs):
+    options = {"max_concurrency": 1, "max_queue": 1, "queue_timeout": 0.5,
+               "paths": ["/api/v1/detect", "/api/v1/analyze"]}
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+class TestAdmissionController:
+    """Tests for bounded concurrency and the wait queue"""
+
+    def test_paths(self):
+        """Test that only detection paths are controlled and health is exempt"""
+        controller = _controller()
+        assert controller.applies_to("/api/v1/detect")
+        assert controller.applies_to("/api/v1/analyze")
+        assert not controller.applies_to("/api/v1/detector")
+        assert not controller.applies_to("/api/v1/health")
+        assert not controller.applies_to("/health")
+
+    def test_queue_full_is_rejected(self):
+        """Test that requests beyond the queue bound are shed immediately"""
+        async def scenario():
+            controller = _controller()
+            assert await controller.acquire() is None
+            waiting = asyncio.ensure_future(controller.acquire())
+            await asyncio.sleep(0)
+            assert controller.queue_depth == 1
+
+            assert await controller.acquire() == "queue_full"
+
+            controller.release()
+            assert await waiting is None
+            controller.release()
+            return controller
+
+        controller = asyncio.run(scenario())
+        stats = controller.stats()
+        assert stats["in_flight"] == 0
+        assert stats["admitted"] == 2
+        assert stats["rejected_queue_full"] == 1
+
+    def test_queue_deadline(self):
+        """Test that waiters give up after the queue timeout"""
+        async def scenario():
+            controller = _controller(queue_timeout=0.05)
+            assert await controller.acquire() is None
+            assert await controller.acquire() == "timeout"
+            assert controller.queue_depth == 0
+            controller.release()
+            return controller
+
+        controller = asyncio.run(scenario())
+        assert controller.in_flight == 0
+        assert controller.rejected_timeout == 1
+
+    def test_concurrency_is_bounded(self):
+        """Test that in-flight work never exceeds the configured cap"""
+        async def scenario():
+            controller = _controller(max_concurrency=2, max_queue=10, queue_timeout=5)
+            peak = 0
+
+            async def work():
+                nonlocal peak
+                assert await controller.acquire() is None
+                try:
+                    peak = max(peak, controller.in_flight)
+                    await asyncio.sleep(0.01)
+                finally:
+                    controller.release()
+
+            await asyncio.gather(*(work() for _ in range(8)))
+            return controller, peak
+
+        controller, peak = asyncio.run(scenario())
+        assert peak == 2
+        assert controller.in_flight == 0
+        assert controller.admitted == 8
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
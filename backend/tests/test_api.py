@@ -5,6 +5,7 @@ import pytest
 from fastapi.testclient import TestClient
 import sys
 import os
+import uuid
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,6 +26,23 @@ class TestHealthEndpoint:
         assert data["status"] == "healthy"
         assert "model_loaded" in data
 
+    def test_liveness(self):
+        """Test liveness only reports that the process is up"""
+        response = client.get("/api/v1/health/live")
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+
+    def test_readiness_after_loading(self):
+        """Test readiness lists components and is 200 once they are loaded"""
+        from app.utils.readiness import readiness
+        readiness.load()
+        response = client.get("/api/v1/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert data["components"]["lexicon"]["state"] == "ready"
+        assert data["components"]["model"]["state"] in ("ready", "disabled")
+
 
 class TestDetectEndpoint:
     """Tests for bias detection endpoint"""
@@ -40,6 +58,14 @@ class TestDetectEndpoint:
         assert data["has_bias"] == False
         assert data["severity"] == "none"
 
+    def test_detections_are_aggregated_in_metrics(self):
+        """Test that served detections feed the streaming aggregates in /metrics"""
+        before = client.get("/api/v1/metrics").json()["detections"]["count"]
+        client.post("/api/v1/detect", json={"text": "A completely ordinary sentence."})
+        detections = client.get("/api/v1/metrics").json()["detections"]
+        assert detections["count"] == before + 1
+        assert "severity_distribution" in detections
+
     def test_detect_gender_bias(self):
         """Test detection of gender bias"""
         response = client.post(
@@ -264,5 +290,511 @@ class TestResponseStructure:
         assert "timestamp" in data
 
 
+class TestDeadlines:
+    """Tests for per-request latency budgets"""
+
+    def test_complete_response_without_budget(self):
+        """Test that responses are not partial without a budget"""
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "The female nurse assisted the male doctor."}
+        )
+        data = response.json()
+        assert data["partial"] == False
+        assert data["skipped_stages"] == []
+
+    def test_expired_budget_returns_scores_only(self, monkeypatch):
+        """Test that an exhausted budget still returns lexicon scores"""
+        from app.utils.deadline import Deadline
+        monkeypatch.setattr(Deadline, "expired", lambda self: True)
+
+        response = client.post(
+            "/api/v1/analyze",
+            json={"text": "The female nurse assisted the male doctor.", "budget_ms": 50}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["partial"] == True
+        assert data["bias_analysis"]["has_bias"] == True
+        assert data["highlights"] == []
+        assert set(data["skipped_stages"]) == {"highlighting", "recommendations", "statistics", "patterns"}
+        assert data["bias_analysis"]["patterns"] is None
+
+    def test_admission_wait_counts_against_budget(self, monkeypatch):
+        """Test that time queued for admission uses up the budget"""
+        import asyncio
+        from app.utils.admission import admission_controller
+
+        async def slow_acquire():
+            await asyncio.sleep(0.05)
+            return None
+        monkeypatch.setattr(admission_controller, "acquire", slow_acquire)
+        monkeypatch.setattr(admission_controller, "release", lambda: None)
+
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "The female nurse assisted the male doctor.", "budget_ms": 20}
+        )
+        data = response.json()
+        assert data["partial"] == True
+        assert "highlighting" in data["skipped_stages"]
+
+    def test_budget_header(self):
+        """Test that the budget can be sent as a header"""
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "The weather is nice."},
+            headers={"X-Latency-Budget-Ms": "5000"}
+        )
+        assert response.status_code == 200
+
+    def test_invalid_budget(self):
+        """Test that non-positive budgets are rejected"""
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "The weather is nice."},
+            headers={"X-Latency-Budget-Ms": "0"}
+        )
+        assert response.status_code == 400
+
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "The weather is nice.", "budget_ms": 0}
+        )
+        assert response.status_code == 422
+
+
+class TestFieldSelection:
+    """Tests for sparse response field selection"""
+
+    def test_detect_scores_only(self):
+        """Test that only requested fields are returned"""
+        response = client.post(
+            "/api/v1/detect",
+            json={
+                "text": "The female nurse assisted the male doctor.",
+                "fields": ["bias_scores", "severity"]
+            }
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"bias_scores", "severity", "partial", "skipped_stages"}
+
+    def test_detect_offsets_only_highlights(self):
+        """Test that offsets-only highlights omit terms and context"""
+        response = client.post(
+            "/api/v1/detect",
+            json={
+                "text": "The female nurse assisted the male doctor.",
+                "fields": ["highlights"],
+                "highlight_format": "offsets"
+            }
+        )
+        data = response.json()
+        assert len(data["highlights"]) > 0
+        for highlight in data["highlights"]:
+            assert set(highlight) == {"start", "end", "category"}
+
+    def test_unrequested_stages_do_not_run(self, monkeypatch):
+        """Test that highlighting is skipped when highlights are not requested"""
+        from app.routes import detection
+
+        def fail(*args, **kwargs):
+            raise AssertionError("highlighting should not run")
+
+        monkeypatch.setattr(detection, "highlight_matches", fail)
+        monkeypatch.setattr(detection, "lexicon_matches", fail)
+        response = client.post(
+            "/api/v1/analyze",
+            json={"text": "The female nurse assisted the male doctor.", "fields": ["bias_analysis"]}
+        )
+        assert response.status_code == 200
+        assert set(response.json()) == {"bias_analysis", "partial", "skipped_stages"}
+
+    def test_patterns_only_run_for_bias_analysis(self, monkeypatch):
+        """Test that proximity patterns are skipped when bias_analysis is not requested"""
+        from app.utils.tenant_lexicons import TenantLexicon
+
+        def fail(*args, **kwargs):
+            raise AssertionError("patterns should not run")
+
+        monkeypatch.setattr(TenantLexicon, "find_patterns", fail)
+        response = client.post(
+            "/api/v1/analyze",
+            json={"text": "The female nurse assisted the male doctor.", "fields": ["statistics"]}
+        )
+        assert response.status_code == 200
+        assert response.json()["skipped_stages"] == []
+
+    def test_invalid_field(self):
+        """Test that unknown fields are rejected"""
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "Test text", "fields": ["bogus"]}
+        )
+        assert response.status_code == 422
+
+
+class TestServerTiming:
+    """Tests for Server-Timing headers and admin-only profiling"""
+
+    def test_stage_timings(self):
+        """Test that detection responses report per-stage timings"""
+        response = client.post("/api/v1/analyze", json={"text": "The female nurse assisted the male doctor."})
+        assert response.status_code == 200
+        stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        for name in ("validation", "detection", "recommendations", "serialization", "total"):
+            assert name in stages
+
+    def test_every_response_has_total(self):
+        """Test that other endpoints get at least the total"""
+        response = client.get("/api/v1/categories")
+        assert "total;dur=" in response.headers["server-timing"]
+
+    def test_profiling_requires_admin(self, monkeypatch):
+        """Test that profiling is refused without the admin token"""
+        from app import config
+        monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "The female nurse."},
+            headers={"X-Profile": "1", "X-Admin-Token": "wrong"}
+        )
+        assert response.status_code == 403
+
+    def test_profiling_returns_top_functions(self, monkeypatch):
+        """Test that an admin request returns the profile next to the response"""
+        from app import config
+        monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+        response = client.post(
+            "/api/v1/detect",
+            json={"text": "The female nurse."},
+            headers={"X-Profile": "1", "X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["response"]["text"] == "The female nurse."
+        functions = data["profile"]["top_functions"]
+        assert len(functions) > 0
+        assert any("detect_lexicon_bias" in row["function"] for row in functions)
+
+
+
+
+class TestBatchDetection:
+    """Tests for the sparse batch scoring endpoint"""
+
+    def test_batch_results_in_order(self):
+        """Test that every text gets a result in input order"""
+        texts = ["The weather today is pleasant.", "The female nurse assisted the male doctor."]
+        response = client.post("/api/v1/detect/batch", json={"texts": texts, "include_highlights": True})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 2
+        assert data["results"][0]["has_bias"] is False
+        assert data["results"][0]["highlights"] == []
+        for result in data["results"]:
+            assert result["severity"] in ["none", "mild", "moderate", "severe"]
+
+    def test_uncalibrated_batch_matches_detect(self):
+        """Test that without calibrated weights the batch is scored by the detector"""
+        from app.utils.batch_scoring import compare
+
+        texts = ["The weather today is pleasant.", "The female nurse assisted the male doctor.",
+                 "Old people are slow with technology."]
+        batch = client.post("/api/v1/detect/batch", json={"texts": texts, "categories": ["gender"]}).json()
+        assert batch["engine"] == "detector"
+        assert batch["calibrated"] is False
+
+        single = [
+            client.post("/api/v1/detect", json={"text": text, "categories": ["gender"]}).json() for text in texts
+        ]
+        parity = compare(single, batch["results"], tolerance=0.0)
+        assert parity["category_agreement"] == 1.0
+        assert parity["within_tolerance"] == 1.0
+        for result, expected in zip(batch["results"], single):
+            assert set(result) == set(expected) - {"timestamp", "partial", "skipped_stages"}
+
+    def test_calibrated_batch_uses_sparse_scorer(self, monkeypatch):
+        """Test that calibrated weights are served by the sparse scorer in the /detect shape"""
+        from app.routes import detection
+        from app.utils.batch_scoring import BatchScorer
+        from app.utils.compiled_lexicon import get_compiled_lexicon
+
+        scorer = BatchScorer(get_compiled_lexicon(), calibration={"texts": 0}, thresholds={"gender": 0.5})
+        monkeypatch.setattr(detection, "get_batch_scorer", lambda: scorer)
+        texts = ["The weather today is pleasant.", "The female nurse assisted the male doctor."]
+        data = client.post("/api/v1/detect/batch", json={"texts": texts}).json()
+        assert data["engine"] == "sparse"
+        assert data["calibrated"] is True
+        assert [result["text"] for result in data["results"]] == texts
+        for result in data["results"]:
+            assert all(score >= 0.5 for cat, score in result["bias_scores"].items()
+                       if cat == "gender" and cat in result["bias_categories"])
+            assert set(result["bias_categories"]) <= set(result["bias_scores"])
+
+    def test_batch_validation(self):
+        """Test that empty texts and unknown categories are rejected"""
+        assert client.post("/api/v1/detect/batch", json={"texts": ["ok", "  "]}).status_code == 422
+        assert client.post("/api/v1/detect/batch", json={"texts": ["ok"], "categories": ["invalid"]}).status_code == 422
+
+
+class TestResults:
+    """Tests for the recorded results endpoints"""
+
+    @pytest.fixture
+    def store(self, monkeypatch, tmp_path):
+        from app.routes import results
+        from app.utils.results_store import ResultsStore
+
+        store = ResultsStore(str(tmp_path / "results.db"))
+        monkeypatch.setattr(results, "results_store", store)
+        yield store
+        store.close()
+
+    def test_naive_and_aware_times_compare(self, store):
+        """Test that a naive start and an offset end are both taken as UTC"""
+        params = {"start": "2024-01-01T12:00:00", "end": "2024-01-01T13:00:00+01:00"}
+        assert client.get("/api/v1/results/summary", params=params).status_code == 400
+
+        params["end"] = "2024-01-01T14:00:00+01:00"
+        response = client.get("/api/v1/results/summary", params=params)
+        assert response.status_code == 200
+        assert response.json()["count"] == 0
+
+
+class TestTenantLexicons:
+    """Tests for registering and using custom lexicons"""
+
+    @pytest.fixture(autouse=True)
+    def registry(self, monkeypatch, tmp_path):
+        """Admin token and a registry backed by a temporary database"""
+        from app import config
+        from app.utils import tenant_lexicons
+        monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+        monkeypatch.setattr(config, "TENANT_LEXICONS_DB_PATH", str(tmp_path / "lexicons.db"))
+        monkeypatch.setattr(tenant_lexicons, "_registry", None)
+
+    @pytest.fixture
+    def calibrated(self, monkeypatch):
+        """Calibrated batch scoring weights, which custom lexicons are scored with"""
+        from app.utils import batch_scoring
+        from app.utils.compiled_lexicon import get_compiled_lexicon
+        monkeypatch.setattr(
+            batch_scoring, "_batch_scorer", batch_scoring.BatchScorer(get_compiled_lexicon(), calibration={"texts": 0})
+        )
+
+    def test_registration_requires_admin(self):
+        """Test that lexicons cannot be managed without the admin token"""
+        response = client.put("/api/v1/lexicons/acme", json={})
+        assert response.status_code == 403
+
+    def test_invalid_definition(self):
+        """Test that invalid definitions are rejected with 400"""
+        response = client.put(
+            "/api/v1/lexicons/acme",
+            json={"remove": {"gender": {"no_such_group": ["x"]}}},
+            headers={"X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 400
+
+    def test_detect_with_custom_lexicon(self, calibrated):
+        """Test that a request using a registered lexicon is scored against it"""
+        response = client.put(
+            "/api/v1/lexicons/acme",
+            json={"extends_default": False, "add": {"gender": {"male_terms": ["chap"], "occupations": ["welder"]}}},
+            headers={"X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 200
+        assert response.json()["terms"] == 2
+
+        response = client.post("/api/v1/detect", json={"text": "The chap was a welder.", "lexicon_id": "acme"})
+        assert response.status_code == 200
+        terms = {h["term"] for h in response.json()["highlights"]}
+        assert terms <= {"chap", "welder"}
+
+        listing = client.get("/api/v1/lexicons", headers={"X-Admin-Token": "secret"}).json()
+        assert listing["lexicons"][0]["lexicon_id"] == "acme"
+        assert listing["lexicons"][0]["usage"]["requests"] >= 1
+
+    def test_uncalibrated_custom_lexicon_is_unavailable(self):
+        """Test that custom lexicons are refused with 503 until weights are calibrated"""
+        client.put("/api/v1/lexicons/acme", json={}, headers={"X-Admin-Token": "secret"})
+        response = client.post("/api/v1/detect", json={"text": "The nurse.", "lexicon_id": "acme"})
+        assert response.status_code == 503
+
+    def test_custom_lexicon_does_not_share_default_results(self, calibrated):
+        """Test that a tenant with the default's terms does not get the default's cached results"""
+        client.put("/api/v1/lexicons/acme", json={}, headers={"X-Admin-Token": "secret"})
+        body = {"text": "The female nurse assisted the male doctor."}
+        default = client.post("/api/v1/detect", json=body)
+        tenant = client.post("/api/v1/detect", json=dict(body, lexicon_id="acme"))
+        assert tenant.status_code == 200
+        assert tenant.headers["ETag"] != default.headers["ETag"]
+
+    def test_unknown_lexicon_id(self):
+        """Test that referencing an unregistered lexicon fails with 400"""
+        response = client.post("/api/v1/detect", json={"text": "Some text.", "lexicon_id": "missing"})
+        assert response.status_code == 400
+        assert "missing" in response.json()["detail"]
+
+    def test_delete(self):
+        """Test that deleted lexicons return 404"""
+        headers = {"X-Admin-Token": "secret"}
+        client.put("/api/v1/lexicons/acme", json={}, headers=headers)
+        assert client.delete("/api/v1/lexicons/acme", headers=headers).status_code == 200
+        assert client.get("/api/v1/lexicons/acme", headers=headers).status_code == 404
+
+class TestConditionalRequests:
+    """Tests for ETag / If-None-Match handling"""
+
+    def test_detect_not_modified(self, monkeypatch):
+        """Test that a matching If-None-Match skips detection and returns 304"""
+        body = {"text": "The female nurse assisted the male doctor."}
+        first = client.post("/api/v1/detect", json=body)
+        etag = first.headers["ETag"]
+        assert etag.startswith('W/"')
+        assert first.headers["Cache-Control"] == "private, no-cache"
+
+        from app.routes import detection
+        monkeypatch.setattr(detection, "_detect_lexicon", lambda *args: pytest.fail("detection ran"))
+        before = client.get("/api/v1/metrics").json()["detections"]["not_modified"]
+        second = client.post("/api/v1/detect", json=body, headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+        assert client.get("/api/v1/metrics").json()["detections"]["not_modified"] == before + 1
+
+    def test_wildcard_does_not_match_detection_posts(self):
+        """Test that If-None-Match: * never turns a detection POST into a 304"""
+        response = client.post("/api/v1/detect", json={"text": "Some text."}, headers={"If-None-Match": "*"})
+        assert response.status_code == 200
+        response = client.post("/api/v1/analyze", json={"text": "Some text."}, headers={"If-None-Match": "*"})
+        assert response.status_code == 200
+
+    def test_etag_depends_on_text_and_options(self):
+        """Test that whitespace-equivalent texts share an ETag and options change it"""
+        etag = client.post("/api/v1/detect", json={"text": "The  weather is nice."}).headers["ETag"]
+        assert client.post("/api/v1/detect", json={"text": " The weather is nice. "}).headers["ETag"] == etag
+        other = client.post("/api/v1/detect", json={"text": "The weather is nice.", "highlight_format": "offsets"})
+        assert other.headers["ETag"] != etag
+        stale = client.post("/api/v1/detect", json={"text": "The weather is nice.", "categories": ["age"]},
+                            headers={"If-None-Match": etag})
+        assert stale.status_code == 200
+
+    def test_etag_depends_on_engine_version(self, monkeypatch):
+        """Test that an engine change invalidates ETags clients already hold"""
+        from app.routes import detection
+
+        body = {"text": "The female nurse assisted the male doctor."}
+        etag = client.post("/api/v1/detect", json=body).headers["ETag"]
+        monkeypatch.setattr(detection, "ENGINE_VERSION", detection.ENGINE_VERSION + 1)
+        response = client.post("/api/v1/detect", json=body, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_partial_responses_have_no_etag(self, monkeypatch):
+        """Test that responses with skipped stages are never offered for reuse"""
+        from app.utils.deadline import Deadline
+        monkeypatch.setattr(Deadline, "expired", lambda self: True)
+        response = client.post("/api/v1/analyze", json={"text": "The female nurse assisted the male doctor."})
+        assert response.json()["partial"] == True
+        assert "ETag" not in response.headers
+
+    def test_categories_and_health_revalidation(self):
+        """Test that the GET endpoints are cacheable and answer 304 when unchanged"""
+        categories = client.get("/api/v1/categories")
+        assert categories.headers["Cache-Control"].startswith("public, max-age=")
+        revalidated = client.get("/api/v1/categories", headers={"If-None-Match": categories.headers["ETag"]})
+        assert revalidated.status_code == 304
+
+        health = client.get("/api/v1/health")
+        assert health.headers["Cache-Control"] == "no-cache"
+        assert client.get("/api/v1/health", headers={"If-None-Match": health.headers["ETag"]}).status_code == 304
+
+class TestMemoryDiagnostics:
+    """Tests for the admin-only memory endpoints"""
+
+    @pytest.fixture(autouse=True)
+    def admin(self, monkeypatch):
+        from app import config
+        from app.utils.memory import snapshot_store
+        monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+        yield
+        snapshot_store.stop()
+
+    def test_requires_admin(self):
+        """Test that memory diagnostics are rejected without the admin token"""
+        response = client.get("/api/v1/admin/memory")
+        assert response.status_code == 403
+        assert response.json()["detail"] == "Reading memory diagnostics requires a valid X-Admin-Token"
+        assert client.post("/api/v1/admin/memory/snapshots").status_code == 403
+
+    def test_not_in_public_metrics(self):
+        """Test that process memory and GC stats are not exposed by the unauthenticated /metrics"""
+        data = client.get("/api/v1/metrics").json()
+        assert "memory" not in data
+
+    def test_report(self):
+        """Test that the report covers the process, GC and component sizes"""
+        data = client.get("/api/v1/admin/memory", headers={"X-Admin-Token": "secret"}).json()
+        assert data["process"]["peak_rss_bytes"] > 0
+        assert len(data["gc"]["counts"]) == 3
+        assert data["components"]["detector_lexicons_bytes"] > 0
+        assert data["components"]["compiled_lexicon"]["bytes"] > 0
+        assert "vocabulary_bytes" not in data["components"]["compiled_lexicon"]
+
+    def test_snapshot_diff(self):
+        """Test that two snapshots can be diffed and unknown IDs give 404"""
+        headers = {"X-Admin-Token": "secret"}
+        base = client.post("/api/v1/admin/memory/snapshots", headers=headers).json()
+        current = client.post("/api/v1/admin/memory/snapshots", params={"top": 5}, headers=headers).json()
+        assert len(current["top"]) <= 5
+        diff = client.get(
+            "/api/v1/admin/memory/snapshots/diff",
+            params={"base": base["snapshot_id"], "current": current["snapshot_id"]},
+            headers=headers
+        )
+        assert diff.status_code == 200
+        assert "size_diff_bytes" in diff.json()
+        missing = client.get("/api/v1/admin/memory/snapshots/diff", params={"base": 0, "current": 1}, headers=headers)
+        assert missing.status_code == 404
+
+class TestShadowMode:
+    """Tests for shadowing /detect with a candidate engine"""
+
+    def test_sparse_engine_shadow(self, monkeypatch, tmp_path):
+        """Test that sampled requests are compared and reported in /metrics"""
+        from app import config
+        from app.utils import shadow
+        monkeypatch.setattr(config, "SHADOW_ENGINE", "sparse")
+        monkeypatch.setattr(config, "SHADOW_SAMPLE_RATE", 1.0)
+        monkeypatch.setattr(config, "SHADOW_LOG_PATH", str(tmp_path / "shadow.jsonl"))
+        monkeypatch.setattr(shadow, "_shadow_runner", None)
+
+        # A text no earlier run can have left in the shared detection cache
+        body = {"text": f"The female nurse assisted the male doctor {uuid.uuid4().hex}."}
+        for _ in range(2):
+            assert client.post("/api/v1/detect", json=body).status_code == 200
+        runner = shadow.get_shadow_runner()
+        runner.wait()
+        stats = client.get("/api/v1/metrics").json()["shadow"]
+        assert stats["engine"] == "sparse"
+        assert stats["completed"] == 2
+        # The repeat was a detection cache hit, which says nothing about the detector's latency
+        assert stats["latency_ms"]["primary"]["count"] == 1
+        runner.shutdown()
+        monkeypatch.setattr(shadow, "_shadow_runner", None)
+
+    def test_tenant_lexicon_requests_are_not_shadowed(self, monkeypatch):
+        """Test that only default-lexicon traffic is compared"""
+        from app.routes import detection
+        from app.utils.tenant_lexicons import get_default_lexicon
+        monkeypatch.setattr(detection, "_resolve_lexicon", lambda lexicon_id: get_default_lexicon())
+        monkeypatch.setattr(detection, "get_shadow_runner", lambda: pytest.fail("shadowed"))
+        response = client.post("/api/v1/detect", json={"text": "Some text.", "lexicon_id": "acme"})
+        assert response.status_code == 200
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
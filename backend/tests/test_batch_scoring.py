@@ -0,0 +1,139 @@
+"""
+Tests for sparse-matrix batch scoring
+"""
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.batch_scoring import BatchScorer, compare, count_matrix, vectorized_severity
+from app.utils.compiled_lexicon import CompiledLexicon
+from app.utils.metrics import calculate_bias_severity, calculate_overall_bias_score
+
+
+LEXICONS = {
+    "gender": {"male_terms": ["he", "man"], "female_terms": ["she", "woman"], "negative_traits": ["emotional", "weak"]},
+    "age": {"terms": ["elderly", "old"], "stereotypes": ["slow", "senile"]},
+}
+TEXTS = [
+    "The weather is nice.",
+    "She is emotional and weak.",
+    "The elderly man is slow.",
+    "He is old, slow and senile; she is emotional.",
+    "Emotional, emotional, emotional, emotional.",
+]
+WEIGHTS = {
+    "gender.male_terms": 0.0, "gender.female_terms": 0.1, "gender.negative_traits": 0.3,
+    "age.terms": 0.05, "age.stereotypes": 0.4,
+}
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    """Compile the test lexicon"""
+    return CompiledLexicon.build(LEXICONS)
+
+
+def _reference(text, lexicon):
+    """Per-text scoring with the same group weights, written the slow way"""
+    scores = {}
+    for _, _, _, term_id in lexicon.find_token_matches(text):
+        for group_id in lexicon.term_groups(term_id):
+            category = lexicon.categories[lexicon.group_categories[group_id]]
+            scores[category] = scores.get(category, 0.0) + WEIGHTS[lexicon.groups[group_id]]
+    scores = {cat: round(min(score, 1.0), 3) for cat, score in scores.items() if score > 0}
+    return {
+        "has_bias": bool(scores),
+        "bias_categories": list(scores),
+        "bias_scores": scores,
+        "severity": calculate_bias_severity(scores) if scores else "none",
+        "overall_score": calculate_overall_bias_score(scores)
+    }
+
+
+class TestCountMatrix:
+    """Tests for the document x term matrix"""
+
+    def test_counts(self, lexicon):
+        """Test that repeated terms are counted"""
+        counts = count_matrix(TEXTS, lexicon)
+        assert counts.shape == (len(TEXTS), lexicon.n_terms)
+        assert counts[4, lexicon.lookup("emotional")] == 4
+        assert counts[0].nnz == 0
+
+
+class TestSeverity:
+    """Tests for vectorized severity"""
+
+    def test_matches_scalar_severity(self):
+        """Test that every row matches calculate_bias_severity"""
+        rng = np.random.RandomState(0)
+        scores = np.round(rng.rand(200, 4), 3)
+        flagged = rng.rand(200, 4) > 0.5
+        severities = vectorized_severity(scores, flagged)
+        for row in range(200):
+            expected = {c: scores[row, c] for c in range(4) if flagged[row, c]}
+            assert severities[row] == (calculate_bias_severity(expected) if expected else "none")
+
+
+class TestBatchScorer:
+    """Tests for batch scoring and calibration"""
+
+    def test_matches_per_text_scoring(self, lexicon):
+        """Test that batch results match per-text scoring with the same weights"""
+        scorer = BatchScorer(lexicon, WEIGHTS)
+        results = scorer.score(TEXTS)
+        reference = [_reference(text, lexicon) for text in TEXTS]
+        assert compare(reference, results, tolerance=1e-9)["within_tolerance"] == 1.0
+        for ref, result in zip(reference, results):
+            assert result["severity"] == ref["severity"]
+            assert result["overall_score"] == pytest.approx(ref["overall_score"])
+
+    def test_category_filter(self, lexicon):
+        """Test that unrequested categories are not reported"""
+        results = BatchScorer(lexicon, WEIGHTS).score(TEXTS, categories=["age"])
+        assert all(result["bias_categories"] in ([], ["age"]) for result in results)
+
+    def test_calibration_recovers_weights(self, lexicon):
+        """Test that calibration fits weights that reproduce the reference"""
+        corpus = TEXTS + ["She is weak.", "The old woman.", "He is senile.", "Slow and weak."]
+        reference = [_reference(text, lexicon) for text in corpus]
+        scorer = BatchScorer(lexicon)
+        report = scorer.calibrate(corpus, reference)
+        assert report["within_tolerance"] == 1.0
+        assert scorer.calibrated
+
+    def test_calibrated_thresholds(self, lexicon):
+        """Test that a category is only flagged at the detector's own threshold"""
+        corpus = TEXTS + ["She is weak.", "The old woman.", "He is senile.", "Slow and weak."]
+        reference = []
+        for text in corpus:
+            result = _reference(text, lexicon)
+            flagged = [cat for cat, score in result["bias_scores"].items() if score >= 0.4]
+            reference.append(dict(result, bias_categories=flagged, has_bias=bool(flagged)))
+        scorer = BatchScorer(lexicon)
+        report = scorer.calibrate(corpus, reference)
+        assert report["category_agreement"] == 1.0
+        assert compare(reference, scorer.score(corpus))["category_agreement"] == 1.0
+        weak = scorer.score(["The old man."])[0]
+        assert weak["bias_scores"] and not weak["has_bias"]
+        assert weak["severity"] == "none"
+
+    def test_save_and_load(self, lexicon, tmp_path):
+        """Test that weights round-trip through the calibration file"""
+        path = str(tmp_path / "weights.json")
+        scorer = BatchScorer(lexicon, WEIGHTS, thresholds={"gender": 0.3})
+        scorer.save(path)
+        loaded = BatchScorer.load(lexicon, path)
+        assert loaded.score(TEXTS) == scorer.score(TEXTS)
+
+    def test_empty_batch(self, lexicon):
+        """Test that an empty batch returns no results"""
+        assert BatchScorer(lexicon).score([]) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
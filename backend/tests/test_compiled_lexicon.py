@@ -0,0 +1,138 @@
+"""
+Tests for the compiled, memory-mappable lexicon
+"""
+import pytest
+import sys
+import os
+import re
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.utils import compiled_lexicon as compiled_lexicon_module
+from app.utils.compiled_lexicon import CompiledLexicon, flatten_lexicon, load_lexicon_json, main
+from app.utils.lexicon import compute_lexicon_version
+
+
+SAMPLE_TEXT = (
+    "The female nurse from the inner-city was surprisingly articulate. "
+    "Those people in the Upper-Class are out-of-touch, and the elderly "
+    "boomer said the Asian students love math. He is a tech-savvy CEO."
+)
+
+
+@pytest.fixture(scope="module")
+def lexicons():
+    return load_lexicon_json()
+
+
+@pytest.fixture(scope="module")
+def compiled(lexicons):
+    return CompiledLexicon.build(lexicons)
+
+
+def _reference_matches(lexicons, text):
+    """Regex \\bterm\\b matches for every lexicon term"""
+    found = set()
+    for _, _, terms in flatten_lexicon(lexicons):
+        for term in terms:
+            for m in re.finditer(r"\b" + re.escape(term) + r"\b", text, re.IGNORECASE):
+                found.add((m.start(), m.end(), term.lower()))
+    return found
+
+
+class TestCompiledLexicon:
+    """Tests for building and querying compiled lexicons"""
+
+    def test_metadata(self, lexicons, compiled):
+        """Test that categories, nested groups and version are recorded"""
+        assert compiled.categories == list(lexicons.keys())
+        assert "race.racial_activities.asian" in compiled.groups
+        assert compiled.lexicon_version == compute_lexicon_version(lexicons)
+
+    def test_lookup(self, compiled):
+        """Test term lookup and group membership"""
+        term_id = compiled.lookup("inner-city")
+        assert term_id >= 0
+        groups = {compiled.groups[g] for g in compiled.term_groups(term_id)}
+        assert groups == {"race.stereotypes", "race.coded_language"}
+        assert compiled.lookup("not-a-term") == -1
+
+    def test_matches_equal_regex_reference(self, lexicons, compiled):
+        """Test that matching agrees with word-boundary regex matching"""
+        matches = {(s, e, compiled.term(t)) for s, e, t in compiled.find_matches(SAMPLE_TEXT)}
+        assert matches == _reference_matches(lexicons, SAMPLE_TEXT)
+
+    def test_save_and_mmap(self, compiled, tmp_path):
+        """Test that a saved artifact loads memory-mapped with identical results"""
+        path = str(tmp_path / "lexicon.blex")
+        compiled.save(path)
+        mapped = CompiledLexicon.load(path)
+
+        assert mapped.info()["memory_mapped"] == True
+        assert mapped.lexicon_version == compiled.lexicon_version
+        assert mapped.find_matches(SAMPLE_TEXT) == compiled.find_matches(SAMPLE_TEXT)
+
+    def test_build_command(self, tmp_path):
+        """Test the artifact build command"""
+        path = str(tmp_path / "built.blex")
+        main(["build", "--output", path])
+        assert CompiledLexicon.load(path).n_terms > 0
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that non-artifact files are rejected"""
+        path = tmp_path / "bogus.blex"
+        path.write_bytes(b"\0" * 128)
+        with pytest.raises(ValueError):
+            CompiledLexicon.load(str(path))
+
+    def test_vocabulary_is_read_from_the_artifact(self, compiled):
+        """Test that token IDs come from the artifact's token table"""
+        vocabulary = compiled.vocabulary
+        assert vocabulary.get("inner") >= 0
+        assert "city" in vocabulary
+        assert vocabulary.get("not-a-token") == -1
+        assert vocabulary.get("not-a-token", None) is None
+        assert len(vocabulary) == compiled.n_tokens
+        assert len({vocabulary.get(norm) for norm in ("inner", "city", "those", "people")}) == 4
+
+
+class TestGetCompiledLexicon:
+    """Tests for choosing between the artifact and in-memory compilation"""
+
+    @pytest.fixture
+    def artifact(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "lexicon.blex")
+        monkeypatch.setattr(config, "COMPILED_LEXICON_PATH", path)
+        monkeypatch.setattr(compiled_lexicon_module, "_compiled_lexicon", None)
+        return path
+
+    def test_uses_current_artifact(self, artifact, compiled):
+        """Test that an artifact built from the current JSON is memory-mapped"""
+        compiled.save(artifact)
+        assert compiled_lexicon_module.get_compiled_lexicon().info()["memory_mapped"] == True
+
+    def test_rebuilds_artifact_from_other_json(self, artifact, lexicons):
+        """Test that the header version, not the file time, decides freshness"""
+        stale = dict(lexicons, extra={"group": ["stale term"]})
+        CompiledLexicon.build(stale).save(artifact)
+        os.utime(artifact, (2 ** 31, 2 ** 31))
+
+        lexicon = compiled_lexicon_module.get_compiled_lexicon()
+        assert lexicon.info()["memory_mapped"] == False
+        assert lexicon.lexicon_version == compute_lexicon_version(lexicons)
+
+    @pytest.mark.parametrize("size", [16, 200])
+    def test_rebuilds_truncated_artifact(self, artifact, compiled, size):
+        """Test that a truncated artifact is compiled in memory instead of failing startup"""
+        with open(artifact, "wb") as f:
+            f.write(bytes(compiled._buffer[:size]))
+
+        lexicon = compiled_lexicon_module.get_compiled_lexicon()
+        assert lexicon.info()["memory_mapped"] == False
+        assert lexicon.n_terms == compiled.n_terms
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,181 @@
+"""
+Tests for HTTP compression middleware
+"""
+import pytest
+import sys
+import os
+import gzip
+import json
+import tracemalloc
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.utils.compression import (
+    CompressionMiddleware, DecompressedSizeExceeded, _Decompressor, negotiate_encoding
+)
+
+
+def _bomb(encoding: str, size: int = 200 * 1024 * 1024) -> bytes:
+    """A few hundred bytes that expand to `size` zero bytes"""
+    block = b"\0" * (1024 * 1024)
+    if encoding == "br":
+        import brotli
+        compressor = brotli.Compressor(quality=1)
+        parts = [compressor.process(block) for _ in range(size // len(block))]
+        return b"".join(parts) + compressor.finish()
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=1).compressobj()
+    parts = [compressor.compress(block) for _ in range(size // len(block))]
+    return b"".join(parts) + compressor.flush()
+
+
+def _make_client(**options):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, decompress_paths=["/echo"], **options)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        payload = await request.json()
+        return {"size": len(payload["text"]), "text": payload["text"]}
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+class TestNegotiation:
+    """Tests for Accept-Encoding negotiation"""
+
+    def test_server_preference_on_ties(self):
+        """Test that equal q-values use the server preference order"""
+        assert negotiate_encoding("gzip, br, zstd", ["zstd", "br", "gzip"]) == "zstd"
+
+    def test_q_values(self):
+        """Test that client q-values are honoured"""
+        assert negotiate_encoding("gzip;q=1.0, br;q=0.5", ["br", "gzip"]) == "gzip"
+        assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+        assert negotiate_encoding("*", ["gzip"]) == "gzip"
+        assert negotiate_encoding(None, ["gzip"]) is None
+
+
+class TestResponseCompression:
+    """Tests for compressing responses"""
+
+    def test_large_response_is_gzipped(self):
+        """Test that large responses are compressed"""
+        client = _make_client(minimum_size=100)
+        response = client.post(
+            "/echo", json={"text": "repetitive text " * 200},
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()["size"] == len("repetitive text " * 200)
+
+    def test_small_response_is_not_compressed(self):
+        """Test that responses below the threshold are sent as-is"""
+        client = _make_client(minimum_size=100)
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+    def test_optional_encodings(self, encoding, module):
+        """Test brotli and zstd when their libraries are installed"""
+        pytest.importorskip(module)
+        client = _make_client(minimum_size=100)
+        response = client.post(
+            "/echo", json={"text": "repetitive text " * 200},
+            headers={"Accept-Encoding": encoding}
+        )
+        assert response.headers["content-encoding"] == encoding
+
+
+class TestRequestDecompression:
+    """Tests for compressed request bodies"""
+
+    def test_gzip_request_body(self):
+        """Test that gzip request bodies are decompressed"""
+        client = _make_client()
+        body = gzip.compress(json.dumps({"text": "hello " * 1000}).encode())
+        response = client.post(
+            "/echo", content=body,
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"}
+        )
+        assert response.status_code == 200
+        assert response.json()["size"] == 6000
+
+    def test_expansion_cap(self):
+        """Test that bodies expanding beyond the cap are rejected"""
+        client = _make_client(max_request_size=10000)
+        body = gzip.compress(json.dumps({"text": "a" * 1000000}).encode())
+        response = client.post(
+            "/echo", content=body,
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"}
+        )
+        assert response.status_code == 413
+
+    @pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+    def test_bomb_is_bounded(self, encoding, module):
+        """Test that a brotli/zstd bomb is rejected without expanding in memory"""
+        pytest.importorskip(module)
+        bomb = _bomb(encoding)
+        assert len(bomb) < 1024 * 1024
+
+        decompressor = _Decompressor(encoding, 100000)
+        tracemalloc.start()
+        try:
+            with pytest.raises(DecompressedSizeExceeded):
+                for start in range(0, len(bomb), 4096):
+                    decompressor.decompress(bomb[start:start + 4096])
+                decompressor.finish()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < 10 * 1024 * 1024
+
+    @pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+    def test_optional_request_encodings(self, encoding, module):
+        """Test brotli/zstd request bodies within the cap, and a bomb through the middleware"""
+        pytest.importorskip(module)
+        client = _make_client(max_request_size=100000)
+        if encoding == "br":
+            import brotli
+            body = brotli.compress(json.dumps({"text": "hello " * 1000}).encode())
+        else:
+            import zstandard
+            body = zstandard.ZstdCompressor().compress(json.dumps({"text": "hello " * 1000}).encode())
+        headers = {"Content-Encoding": encoding, "Content-Type": "application/json"}
+        response = client.post("/echo", content=body, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["size"] == 6000
+
+        response = client.post("/echo", content=_bomb(encoding, 16 * 1024 * 1024), headers=headers)
+        assert response.status_code == 413
+
+    def test_malformed_body(self):
+        """Test that corrupt compressed bodies are rejected"""
+        client = _make_client()
+        response = client.post(
+            "/echo", content=b"not gzip at all",
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"}
+        )
+        assert response.status_code == 400
+
+    def test_unsupported_encoding(self):
+        """Test that unknown encodings are rejected"""
+        client = _make_client()
+        response = client.post(
+            "/echo", content=b"{}",
+            headers={"Content-Encoding": "compress", "Content-Type": "application/json"}
+        )
+        assert response.status_code == 415
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,65 @@
+"""
+Tests for request deadlines and text chunking
+"""
+import pytest
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.deadline import Deadline, split_into_chunks
+
+
+class TestDeadline:
+    """Tests for the Deadline helper"""
+
+    def test_no_budget_never_expires(self):
+        """Test that a deadline without budget is unlimited"""
+        deadline = Deadline()
+        assert not deadline.enabled
+        assert not deadline.expired()
+        assert deadline.remaining() == float('inf')
+
+    def test_budget_expires(self):
+        """Test that a small budget runs out"""
+        deadline = Deadline(5)
+        assert deadline.enabled
+        time.sleep(0.01)
+        assert deadline.expired()
+        assert deadline.remaining() == 0.0
+
+    def test_budget_counts_from_start(self):
+        """Test that a deadline started earlier (e.g. at request arrival) has less left"""
+        deadline = Deadline(50, started=time.perf_counter() - 0.1)
+        assert deadline.expired()
+        assert deadline.elapsed_ms() >= 100
+
+
+class TestSplitIntoChunks:
+    """Tests for chunking long text"""
+
+    def test_chunks_cover_text(self):
+        """Test that chunks reassemble to the original text with correct offsets"""
+        text = "The nurse helped. " * 200 + "trailing words without punctuation " * 50
+        chunks = split_into_chunks(text, 300)
+
+        assert "".join(chunk for _, chunk in chunks) == text
+        for offset, chunk in chunks:
+            assert text[offset:offset + len(chunk)] == chunk
+            assert len(chunk) <= 300
+
+    def test_chunks_end_on_boundaries(self):
+        """Test that words are not split across chunks"""
+        text = "word " * 500
+        for _, chunk in split_into_chunks(text, 101)[:-1]:
+            assert chunk.endswith(" ")
+
+    def test_short_text_single_chunk(self):
+        """Test that short text is a single chunk"""
+        assert split_into_chunks("Short text.", 2000) == [(0, "Short text.")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+"""
+Tests for exact and near-duplicate clustering
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.dedup import Deduplicator, MinHasher, clusters, lsh_params, normalize, similarity, summarize
+
+
+BASE = ("The hiring committee reviewed every application carefully and invited the strongest "
+        "candidates for a second interview at the downtown office next week")
+
+
+class TestNormalize:
+    """Tests for text normalization"""
+
+    def test_case_punctuation_and_whitespace(self):
+        """Test that formatting differences normalize away"""
+        assert normalize("  Hello,   WORLD!\n") == normalize("hello world") == "hello world"
+
+
+class TestMinHash:
+    """Tests for signatures and LSH parameters"""
+
+    def test_identical_tokens_identical_signature(self):
+        """Test that signatures are deterministic"""
+        hasher = MinHasher(num_perm=64)
+        tokens = normalize(BASE).split()
+        assert similarity(hasher.signature(tokens), MinHasher(num_perm=64).signature(tokens)) == 1.0
+
+    def test_similarity_tracks_overlap(self):
+        """Test that similar texts score higher than unrelated ones"""
+        hasher = MinHasher(num_perm=128)
+        base = hasher.signature(normalize(BASE).split())
+        edited = hasher.signature(normalize(BASE + " as planned").split())
+        other = hasher.signature(normalize("Quarterly revenue grew in every region despite supply issues").split())
+        assert similarity(base, edited) > 0.7
+        assert similarity(base, other) < 0.2
+
+    def test_lsh_midpoint_below_threshold(self):
+        """Test that bucketing is looser than the threshold"""
+        bands, rows = lsh_params(128, 0.9)
+        assert bands * rows == 128
+        assert (1 / bands) ** (1 / rows) < 0.9
+
+
+class TestDeduplicator:
+    """Tests for cluster assignment"""
+
+    def test_exact_duplicates_after_normalization(self):
+        """Test that whitespace/punctuation variants share a representative"""
+        texts = ["Women are too emotional.", "women are   too emotional", "Men are strong."]
+        assert Deduplicator(threshold=1.0).assign(texts) == [0, 0, 2]
+
+    def test_near_duplicates(self):
+        """Test that a small edit in a long text is collapsed"""
+        texts = [BASE, "Quarterly revenue grew in every region.", BASE.replace("next week", "next month")]
+        assignments = Deduplicator(threshold=0.8).assign(texts)
+        assert assignments == [0, 1, 0]
+
+    def test_threshold_one_keeps_near_duplicates(self):
+        """Test that a threshold of 1.0 only collapses exact duplicates"""
+        texts = [BASE, BASE.replace("next week", "next month")]
+        assert Deduplicator(threshold=1.0).assign(texts) == [0, 1]
+
+    def test_summary(self):
+        """Test cluster statistics"""
+        assignments = [0, 0, 2, 0]
+        assert clusters(assignments) == {0: [0, 1, 3], 2: [2]}
+        summary = summarize(assignments)
+        assert summary["clusters"] == 2
+        assert summary["duplicates"] == 2
+        assert summary["reduction_factor"] == 2.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Tests for the two-tier detection cache
+"""
+import pytest
+import sys
+import os
+import multiprocessing
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.detection_cache import DetectionCache, LRUCache, SQLiteCache, make_key
+
+
+RESULT = {"has_bias": True, "bias_categories": ["gender"], "bias_scores": {"gender": 0.6},
+          "severity": "severe", "overall_score": 0.6}
+
+
+def _put_from_other_process(path, key):
+    DetectionCache(LRUCache(8), SQLiteCache(path)).put(key, RESULT)
+
+
+class TestKeys:
+    """Tests for cache keys"""
+
+    def test_key_depends_on_text_version_and_options(self):
+        """Test that text, lexicon version and options all change the key"""
+        key = make_key("lexicon", "some text", "v1")
+        assert key == make_key("lexicon", "some text", "v1")
+        assert key != make_key("lexicon", "other text", "v1")
+        assert key != make_key("lexicon", "some text", "v2")
+        assert key != make_key("highlights", "some text", "v1")
+        assert make_key("highlights", "t", "v1", "gender") != make_key("highlights", "t", "v1", "race")
+
+    def test_key_depends_on_engine_version(self, monkeypatch):
+        """Test that entries written by older detection code are not reused"""
+        from app.utils import detection_cache
+        key = make_key("lexicon", "some text", "v1")
+        monkeypatch.setattr(detection_cache, "ENGINE_VERSION", detection_cache.ENGINE_VERSION + 1)
+        assert make_key("lexicon", "some text", "v1") != key
+
+
+class TestLRUCache:
+    """Tests for the in-process tier"""
+
+    def test_eviction_order(self):
+        """Test that the least recently used entry is evicted"""
+        cache = LRUCache(max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        assert cache.get("a") == b"1"
+        cache.put("c", b"3")
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1"
+        assert cache.get("c") == b"3"
+        assert cache.evictions == 1
+
+    def test_stats(self):
+        """Test hit and miss counting"""
+        cache = LRUCache(max_entries=2)
+        cache.get("a")
+        cache.put("a", b"1")
+        cache.get("a")
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+
+class TestSQLiteCache:
+    """Tests for the node-wide tier"""
+
+    def test_roundtrip(self, tmp_path):
+        """Test that stored values are returned"""
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        assert cache.get("k") is None
+        cache.put("k", b"value")
+        assert cache.get("k") == b"value"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_eviction_bound(self, tmp_path):
+        """Test that the table is trimmed to max_entries, oldest first"""
+        cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=5, evict_interval=1)
+        for i in range(10):
+            cache.put(f"k{i}", b"v")
+        assert cache.count() == 5
+        assert cache.get("k0") is None
+        assert cache.get("k9") == b"v"
+
+    def test_shared_across_processes(self, tmp_path):
+        """Test that an entry written by another process is an L2 hit"""
+        path = str(tmp_path / "cache.db")
+        key = make_key("lexicon", "The female nurse", "v1")
+        process = multiprocessing.get_context("spawn").Process(target=_put_from_other_process, args=(path, key))
+        process.start()
+        process.join(30)
+        assert process.exitcode == 0
+
+        cache = DetectionCache(LRUCache(8), SQLiteCache(path))
+        assert cache.get(key) == RESULT
+        assert cache.stats()["l1"]["misses"] == 1
+        assert cache.stats()["l2"]["hits"] == 1
+        # Promoted to L1
+        assert cache.get(key) == RESULT
+        assert cache.stats()["l1"]["hits"] == 1
+
+
+class TestDetectionCache:
+    """Tests for the combined cache"""
+
+    def test_computes_once(self, tmp_path):
+        """Test that get_or_compute only computes on a miss"""
+        calls = []
+        cache = DetectionCache(LRUCache(8), SQLiteCache(str(tmp_path / "cache.db")))
+
+        def compute():
+            calls.append(1)
+            return dict(RESULT)
+
+        assert cache.get_or_compute("k", compute) == RESULT
+        assert cache.get_or_compute("k", compute) == RESULT
+        assert len(calls) == 1
+
+    def test_hits_are_copies(self):
+        """Test that modifying a returned value does not change the cache"""
+        cache = DetectionCache(LRUCache(8))
+        cache.put("k", RESULT)
+        value = cache.get("k")
+        value["bias_categories"] = []
+        assert cache.get("k")["bias_categories"] == ["gender"]
+
+    def test_l1_only(self):
+        """Test that the cache works without a shared tier"""
+        cache = DetectionCache(LRUCache(8))
+        cache.put("k", RESULT)
+        assert cache.get("k") == RESULT
+        assert cache.stats()["l2"] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
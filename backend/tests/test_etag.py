@@ -0,0 +1,38 @@
+"""
+Tests for HTTP conditional request helpers
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.etag import compute_etag, etag_matches
+
+
+class TestETags:
+    """Tests for ETag computation and If-None-Match matching"""
+
+    def test_deterministic_weak_etag(self):
+        """Test that the ETag is weak and only depends on its inputs"""
+        etag = compute_etag("detect", "abc", {"categories": None}, "v1")
+        assert etag.startswith('W/"') and etag.endswith('"')
+        assert etag == compute_etag("detect", "abc", {"categories": None}, "v1")
+        assert etag != compute_etag("detect", "abc", {"categories": None}, "v2")
+
+    def test_matching(self):
+        """Test list, wildcard and weak/strong comparison"""
+        etag = 'W/"abc"'
+        assert etag_matches('W/"abc"', etag)
+        assert etag_matches('"abc"', etag)
+        assert etag_matches('"other", W/"abc"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches("*", etag, wildcard=False)
+        assert not etag_matches('W/"other"', etag)
+        assert not etag_matches(None, etag)
+        assert not etag_matches("", etag)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
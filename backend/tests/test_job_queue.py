@@ -0,0 +1,203 @@
+"""
+Tests for the durable background job queue
+"""
+import pytest
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.compiled_lexicon import CompiledLexicon
+from app.utils.dedup import Deduplicator
+from app.utils.job_queue import JobQueue, group_job, member_result
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    """Create a job queue backed by a temporary database"""
+    return JobQueue(str(tmp_path / "jobs.db"), lease_seconds=60, max_attempts=2)
+
+
+DEDUP = {"dedup": True, "dedup_threshold": 1.0}
+
+
+def _grouped(job_queue, texts, options=DEDUP):
+    """Enqueue a deduplicated job and group it like a worker would"""
+    job_id = job_queue.enqueue(texts, options)
+    job = job_queue.claim_grouping()
+    job_queue.group(job_id, group_job(job))
+    return job_id
+
+
+def _result(text):
+    return {"has_bias": False, "bias_categories": [], "bias_scores": {}, "severity": "none", "text_length": len(text)}
+
+
+class TestJobQueue:
+    """Tests for job submission, claiming and completion"""
+
+    def test_job_lifecycle(self, job_queue):
+        """Test that a job progresses from pending to completed"""
+        job_id = job_queue.enqueue(["one", "two", "three"], {"include_highlights": False})
+        assert job_queue.get_job(job_id)["status"] == "pending"
+
+        items = job_queue.claim(2)
+        assert [item["idx"] for item in items] == [0, 1]
+        assert items[0]["options"] == {"include_highlights": False}
+        job_queue.complete([{"job_id": job_id, "idx": i["idx"], "result": _result(i["text"])} for i in items])
+
+        job = job_queue.get_job(job_id)
+        assert job["status"] == "running"
+        assert job["completed"] == 2
+
+        items = job_queue.claim(10)
+        job_queue.complete([{"job_id": job_id, "idx": items[0]["idx"], "error": "boom"}])
+
+        job = job_queue.get_job(job_id)
+        assert job["status"] == "completed"
+        assert job["failed"] == 1
+        assert job["progress"] == 1.0
+
+    def test_results_are_paginated(self, job_queue):
+        """Test that results are returned in input order page by page"""
+        job_id = job_queue.enqueue([f"text {i}" for i in range(5)])
+        items = job_queue.claim(5)
+        job_queue.complete([{"job_id": job_id, "idx": i["idx"], "result": _result(i["text"])} for i in items])
+
+        page = job_queue.get_results(job_id, after=1, limit=2)
+        assert [r["index"] for r in page] == [2, 3]
+        assert page[0]["result"]["text_length"] == len("text 2")
+
+    def test_cursor_stops_before_unfinished_items(self, job_queue):
+        """Test that results finishing out of order are neither skipped nor repeated"""
+        job_id = job_queue.enqueue([f"text {i}" for i in range(4)])
+        items = {i["idx"]: i for i in job_queue.claim(4)}
+        job_queue.complete([{"job_id": job_id, "idx": idx, "result": _result(items[idx]["text"])} for idx in (0, 2, 3)])
+
+        page = job_queue.get_results(job_id, after=-1, limit=10)
+        assert [r["index"] for r in page] == [0]
+
+        job_queue.complete([{"job_id": job_id, "idx": 1, "result": _result(items[1]["text"])}])
+        page = job_queue.get_results(job_id, after=page[-1]["index"], limit=10)
+        assert [r["index"] for r in page] == [1, 2, 3]
+
+    def test_claimed_items_are_not_reclaimed(self, job_queue):
+        """Test that leased items are not handed to another worker"""
+        job_queue.enqueue(["a", "b"])
+        assert len(job_queue.claim(10)) == 2
+        assert job_queue.claim(10) == []
+
+    def test_expired_lease_resumes(self, tmp_path):
+        """Test that items leased by a dead worker are claimed again"""
+        path = str(tmp_path / "jobs.db")
+        crashed = JobQueue(path, lease_seconds=0.01)
+        job_id = crashed.enqueue(["a"])
+        crashed.claim(1)
+        time.sleep(0.05)
+
+        # A fresh queue (e.g. after a restart) picks the item up again
+        restarted = JobQueue(path)
+        items = restarted.claim(1)
+        assert [(i["job_id"], i["idx"]) for i in items] == [(job_id, 0)]
+
+    def test_max_attempts_marks_failed(self, tmp_path):
+        """Test that repeatedly abandoned items end up failed"""
+        job_queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.01, max_attempts=1)
+        job_id = job_queue.enqueue(["a"])
+        job_queue.claim(1)
+        time.sleep(0.05)
+
+        assert job_queue.claim(1) == []
+        job = job_queue.get_job(job_id)
+        assert job["status"] == "completed"
+        assert job["failed"] == 1
+
+    def test_missing_job(self, job_queue):
+        """Test that unknown job IDs return None"""
+        assert job_queue.get_job("missing") is None
+
+
+class TestJobDeduplication:
+    """Tests for duplicate clusters in jobs"""
+
+    def test_grouping_happens_before_claiming(self, job_queue):
+        """Test that a deduplicated job's items wait until a worker groups it"""
+        job_id = job_queue.enqueue(["Same text.", "same text"], DEDUP)
+        assert job_queue.get_job(job_id)["status"] == "grouping"
+        assert job_queue.claim(10) == []
+
+        job = job_queue.claim_grouping()
+        assert job["texts"] == ["Same text.", "same text"]
+        assert job_queue.claim_grouping() is None
+        job_queue.group(job_id, group_job(job))
+        job_queue.group(job_id, [0, 1])
+
+        assert job_queue.get_job(job_id)["status"] == "pending"
+        assert job_queue.get_job(job_id)["duplicates"] == 1
+        assert [item["idx"] for item in job_queue.claim(10)] == [0]
+
+    def test_near_duplicates_differing_in_terms_are_scored(self, job_queue):
+        """Test that a near-duplicate with another lexicon term is not fanned out"""
+        lexicon = CompiledLexicon.build({"gender": {"female": ["female nurse"], "male": ["male nurse"]}})
+        words = ("the report on staffing at the regional hospital was published on monday by the board "
+                 "and it describes shifts wards budgets rotas and the new training plan for every department")
+        texts = [f"{words} the female nurse said", f"{words} the male nurse said", f"{words} the female nurse says"]
+        job = {"options": {"dedup": True, "dedup_threshold": 0.7}, "texts": texts}
+
+        assert Deduplicator(0.7).assign(texts) == [0, 0, 0]
+        assert group_job(job, lexicon) == [0, 1, 0]
+
+    def test_only_representatives_are_claimed(self, job_queue):
+        """Test that duplicates ride along with their representative"""
+        job_id = _grouped(job_queue, ["Same text.", "same text", "Other text."])
+        assert job_queue.get_job(job_id)["duplicates"] == 1
+
+        items = job_queue.claim(10)
+        assert [item["idx"] for item in items] == [0, 2]
+        assert items[0]["members"] == [{"idx": 1, "text": "same text"}]
+        assert items[1]["members"] == []
+
+    def test_members_share_representative_outcome(self, job_queue):
+        """Test that members without their own outcome get the representative's"""
+        job_id = _grouped(job_queue, ["Same text.", "same text"])
+        items = job_queue.claim(10)
+        job_queue.complete([{"job_id": job_id, "idx": 0, "result": _result("Same text.")}])
+
+        job = job_queue.get_job(job_id)
+        assert job["status"] == "completed"
+        assert job["completed"] == 2
+        results = job_queue.get_results(job_id)
+        assert results[1]["result"] == results[0]["result"]
+
+    def test_member_outcomes_take_precedence(self, job_queue):
+        """Test that a member's own outcome is kept"""
+        job_id = _grouped(job_queue, ["Same text.", "same text"])
+        job_queue.claim(10)
+        job_queue.complete([
+            {"job_id": job_id, "idx": 1, "result": _result("same text")},
+            {"job_id": job_id, "idx": 0, "result": _result("Same text.")},
+        ])
+        results = job_queue.get_results(job_id)
+        assert results[1]["result"]["text_length"] == len("same text")
+
+    def test_failed_representative_fails_members(self, job_queue):
+        """Test that an error is fanned out to the cluster"""
+        job_id = _grouped(job_queue, ["Same text.", "same text"])
+        job_queue.claim(10)
+        job_queue.complete([{"job_id": job_id, "idx": 0, "error": "boom"}])
+        job = job_queue.get_job(job_id)
+        assert job["failed"] == 2
+        assert job["status"] == "completed"
+
+    def test_member_result_keeps_scores(self):
+        """Test that member results share scores but not highlights"""
+        result = dict(_result("x"), highlights=[{"term": "x"}])
+        shared = member_result(result, "no bias here", {"include_highlights": False})
+        assert shared["highlights"] == []
+        assert shared["bias_scores"] == result["bias_scores"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
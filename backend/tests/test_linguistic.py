@@ -0,0 +1,113 @@
+"""
+Tests for the linguistic confirmation stage
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.compiled_lexicon import CompiledLexicon
+from app.utils.linguistic import LinguisticFilter, discount_results
+from app.utils.matches import MatchArray, lexicon_matches
+
+
+LEXICON = {
+    "race": {"terms": ["black", "asian"], "coded_language": ["they", "those people"]},
+    "age": {"terms": ["old", "elderly"]},
+    "gender": {"male_terms": ["he", "men"], "occupations": ["nurse"], "negative_traits": ["weak"]}
+}
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    """Compile the test lexicon"""
+    return CompiledLexicon.build(LEXICON)
+
+
+class TestDiscountResults:
+    """Tests for dropping discounted categories"""
+
+    def test_drops_category_without_confirmed_hits(self, lexicon):
+        """Test that a category whose hits were all discounted is removed"""
+        text = "He drove an old black car."
+        results = {"has_bias": True, "bias_categories": ["race", "gender"],
+                   "bias_scores": {"race": 0.4, "gender": 0.2}, "severity": "moderate", "overall_score": 0.3}
+        matches = lexicon_matches(text, lexicon, results["bias_categories"])
+        confirmed = MatchArray(text, categories=lexicon.categories)
+        for start, end, term_id, category_id in matches:
+            if text[start:end] == "He":
+                confirmed.append(start, end, term_id, category_id)
+
+        updated = discount_results(results, matches, confirmed)
+        assert updated["bias_categories"] == ["gender"]
+        assert updated["bias_scores"] == {"gender": 0.2}
+        assert updated["discounted_categories"] == ["race"]
+        assert updated["overall_score"] == 0.2
+        assert results["bias_categories"] == ["race", "gender"]
+
+    def test_keeps_categories_without_lexicon_hits(self, lexicon):
+        """Test that categories flagged by other rules are not dropped"""
+        text = "Nothing here."
+        results = {"has_bias": True, "bias_categories": ["political"], "bias_scores": {"political": 0.5},
+                   "severity": "severe", "overall_score": 0.5}
+        empty = MatchArray(text, categories=lexicon.categories)
+        updated = discount_results(results, empty, empty)
+        assert updated["bias_categories"] == ["political"]
+        assert updated["discounted_categories"] == []
+
+    def test_no_remaining_bias(self, lexicon):
+        """Test severity when every category is dropped"""
+        text = "The old building."
+        results = {"has_bias": True, "bias_categories": ["age"], "bias_scores": {"age": 0.3},
+                   "severity": "moderate", "overall_score": 0.3}
+        matches = lexicon_matches(text, lexicon, ["age"])
+        updated = discount_results(results, matches, MatchArray(text, categories=lexicon.categories))
+        assert updated["has_bias"] is False
+        assert updated["severity"] == "none"
+        assert updated["overall_score"] == 0.0
+
+
+class TestLinguisticFilter:
+    """Tests for the spaCy-backed filter"""
+
+    def test_texts_without_hits_are_not_parsed(self, lexicon):
+        """Test that spaCy only sees texts with lexicon hits"""
+        linguistic_filter = LinguisticFilter(lexicon=lexicon)
+
+        class NoParse:
+            def pipe(self, *args, **kwargs):
+                raise AssertionError("texts without hits should not be parsed")
+
+        linguistic_filter._nlp = NoParse()
+        texts = ["Nothing to see.", "Still nothing."]
+        matches = [lexicon_matches(text, lexicon) for text in texts]
+        assert linguistic_filter.filter(texts, matches) == matches
+
+    def test_context_rules(self, lexicon):
+        """Test that hits are confirmed or discounted from their context"""
+        spacy = pytest.importorskip("spacy")
+        try:
+            spacy.load("en_core_web_sm")
+        except OSError:
+            pytest.skip("en_core_web_sm is not installed")
+
+        linguistic_filter = LinguisticFilter(lexicon=lexicon, batch_size=2)
+        texts = [
+            "He bought a black car.",
+            "Black students were stopped by police.",
+            "The house is 40 years old.",
+            "The elderly workers cannot learn.",
+        ]
+        matches = [lexicon_matches(text, lexicon) for text in texts]
+        confirmed = linguistic_filter.filter(texts, matches)
+        kept = [[text[s:e].lower() for s, e, _, _ in text_matches] for text, text_matches in zip(texts, confirmed)]
+        assert "black" not in kept[0] and "he" in kept[0]
+        assert "black" in kept[1]
+        assert "old" not in kept[2]
+        assert "elderly" in kept[3]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,104 @@
+"""
+Tests for compact array-backed match records
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.compiled_lexicon import CompiledLexicon
+from app.utils.detection_cache import DetectionCache, LRUCache
+from app.utils.matches import MatchArray, highlight_matches, lexicon_matches
+from app.utils.serialization import format_highlights
+
+
+LEXICON = {
+    "gender": {"female_terms": ["woman", "female"], "occupations": ["nurse"]},
+    "race": {"stereotypes": ["urban", "inner-city"]},
+    "socioeconomic": {"stereotypes": ["urban"]}
+}
+
+TEXT = "The female nurse moved to an urban, inner-city area."
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    """Compile the test lexicon"""
+    return CompiledLexicon.build(LEXICON)
+
+
+class TestMatchArray:
+    """Tests for the MatchArray container"""
+
+    def test_sort_is_stable(self):
+        """Test sorting by start keeps insertion order for equal starts"""
+        matches = MatchArray("abcdefghij")
+        matches.append(5, 6, 1)
+        matches.append(0, 2, 2)
+        matches.append(5, 7, 3)
+        matches.sort()
+        assert list(matches.starts) == [0, 5, 5]
+        assert list(matches.term_ids) == [2, 1, 3]
+
+    def test_extend_with_offset(self):
+        """Test appending chunk matches shifts their offsets"""
+        matches = MatchArray("0123456789")
+        chunk = MatchArray("56789")
+        chunk.append(1, 3)
+        matches.extend(chunk, offset=5)
+        assert list(matches) == [(6, 8, -1, 0)]
+
+    def test_highlight_formats(self):
+        """Test that context is only included in the full format"""
+        text = "x" * 40 + "nurse" + "y" * 40
+        matches = MatchArray(text, categories=["gender"])
+        matches.append(40, 45, -1, 0)
+        full = matches.to_highlights("full")[0]
+        assert full["term"] == "nurse"
+        assert full["category"] == "gender"
+        assert full["context"] == text[10:75]
+        assert "context" not in matches.to_highlights("compact")[0]
+        assert matches.to_highlights("offsets") == [{"start": 40, "end": 45, "category": "gender"}]
+
+    def test_columns_roundtrip(self):
+        """Test the compact cache form"""
+        matches = MatchArray(TEXT, categories=["gender"])
+        matches.append(4, 10, 0, 0)
+        restored = MatchArray.from_columns(TEXT, matches.to_columns(), categories=["gender"])
+        assert list(restored) == list(matches)
+
+
+class TestLexiconMatches:
+    """Tests for lexicon highlighting"""
+
+    def test_categories_filter(self, lexicon):
+        """Test that only requested categories are reported"""
+        highlights = lexicon_matches(TEXT, lexicon, ["gender"]).to_highlights("compact")
+        assert [(h["term"], h["category"]) for h in highlights] == [("female", "gender"), ("nurse", "gender")]
+
+    def test_term_in_several_categories(self, lexicon):
+        """Test one match per category for a term in several categories"""
+        highlights = lexicon_matches(TEXT, lexicon, ["race", "socioeconomic"]).to_highlights("offsets")
+        urban = [h for h in highlights if TEXT[h["start"]:h["end"]] == "urban"]
+        assert {h["category"] for h in urban} == {"race", "socioeconomic"}
+        assert any(TEXT[h["start"]:h["end"]] == "inner-city" for h in highlights)
+
+    def test_cached_matches(self, lexicon):
+        """Test that cached matches serialize like fresh ones"""
+        cache = DetectionCache(LRUCache(8))
+        first = highlight_matches(TEXT, ["gender"], lexicon, cache, "v1").to_highlights()
+        second = highlight_matches(TEXT, ["gender"], lexicon, cache, "v1").to_highlights()
+        assert first == second == lexicon_matches(TEXT, lexicon, ["gender"]).to_highlights()
+        assert cache.stats()["l1"]["hits"] == 1
+
+    def test_format_highlights_accepts_matches(self, lexicon):
+        """Test serialization of matches and of an empty stage"""
+        matches = lexicon_matches(TEXT, lexicon, ["gender"])
+        assert format_highlights(matches, "compact") == matches.to_highlights("compact")
+        assert format_highlights(None) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,69 @@
+"""
+Tests for memory diagnostics
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.detection_cache import LRUCache
+from app.utils.memory import SnapshotStore, deep_sizeof, process_memory
+
+
+class TestSizing:
+    """Tests for object and cache sizing"""
+
+    def test_deep_sizeof_follows_containers(self):
+        """Test that nested contents are counted and shared objects only once"""
+        terms = ["x" * 1000 + str(i) for i in range(10)]
+        assert deep_sizeof({"terms": terms}) > 10 * 1000
+        shared = "y" * 10000
+        assert deep_sizeof([shared, shared]) < 2 * 10000
+
+    def test_lru_memory_grows_with_entries(self):
+        """Test that the LRU reports the bytes its entries hold"""
+        cache = LRUCache(10)
+        empty = cache.memory_bytes()
+        cache.put("key", b"v" * 5000)
+        assert cache.memory_bytes() >= empty + 5000
+
+    def test_process_memory(self):
+        """Test that RSS is reported"""
+        memory = process_memory()
+        assert memory["pid"] == os.getpid()
+        assert memory["peak_rss_bytes"] > 0
+
+
+class TestSnapshots:
+    """Tests for tracemalloc snapshots"""
+
+    def test_diff_finds_growth(self):
+        """Test that an allocation between snapshots shows up in the diff"""
+        store = SnapshotStore(max_snapshots=4)
+        try:
+            base = store.take()["snapshot_id"]
+            retained = [bytearray(1024) for _ in range(2000)]
+            current = store.take()["snapshot_id"]
+            diff = store.diff(base, current, top=5)
+            assert diff["size_diff_bytes"] >= 2000 * 1024
+            assert diff["top"][0]["file"] == __file__
+            assert len(retained) == 2000
+        finally:
+            store.stop()
+
+    def test_bounded_and_stop(self):
+        """Test that old snapshots are dropped and stop clears everything"""
+        store = SnapshotStore(max_snapshots=2)
+        try:
+            ids = [store.take(top=1)["snapshot_id"] for _ in range(3)]
+            assert [s["snapshot_id"] for s in store.list()] == ids[1:]
+            assert store.diff(ids[0], ids[2]) is None
+        finally:
+            store.stop()
+        assert store.status() == {"tracing": False, "traced_bytes": 0, "traced_peak_bytes": 0, "snapshots": []}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,126 @@
+"""
+Unit tests for metric utilities
+"""
+import pytest
+import sys
+import os
+import random
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.metrics import (
+    RunningStats,
+    StreamingAggregator,
+    aggregate_scores,
+    calculate_category_distribution,
+    calculate_confidence_interval,
+    detection_summary,
+    record_detection,
+)
+
+
+def _make_detections(n, seed=0):
+    rng = random.Random(seed)
+    categories = ["gender", "race", "age"]
+    detections = []
+    for _ in range(n):
+        scores = {cat: round(rng.random(), 3) for cat in categories if rng.random() < 0.4}
+        detections.append({
+            "bias_scores": scores,
+            "bias_categories": [cat for cat, score in scores.items() if score > 0.3],
+            "severity": rng.choice(["none", "mild", "moderate", "severe"])
+        })
+    return detections
+
+
+class TestRunningStats:
+    """Tests for the online mean/variance accumulator"""
+
+    def test_matches_batch_confidence_interval(self):
+        """Test that running stats reproduce calculate_confidence_interval"""
+        values = [random.Random(1).random() for _ in range(200)]
+        stats = RunningStats()
+        for value in values:
+            stats.update(value)
+
+        assert stats.count == 200
+        assert stats.confidence_interval() == calculate_confidence_interval(values)
+        assert stats.confidence_interval(0.99) == calculate_confidence_interval(values, 0.99)
+
+    def test_merge_equals_sequential(self):
+        """Test that merging partial accumulators is exact"""
+        values = [float(i % 7) for i in range(50)]
+        full, left, right = RunningStats(), RunningStats(), RunningStats()
+        for i, value in enumerate(values):
+            full.update(value)
+            (left if i < 20 else right).update(value)
+
+        left.merge(right)
+        assert left.count == full.count
+        assert left.mean == pytest.approx(full.mean)
+        assert left.variance == pytest.approx(full.variance)
+
+    def test_empty_interval(self):
+        """Test that an empty accumulator behaves like an empty list"""
+        assert RunningStats().confidence_interval() == (0, 0)
+
+
+class TestStreamingAggregator:
+    """Tests for the streaming score aggregator"""
+
+    def test_matches_batch_aggregation(self):
+        """Test that streaming results match the list-based helpers"""
+        detections = _make_detections(300)
+        aggregator = StreamingAggregator()
+        for detection in detections:
+            aggregator.update(detection)
+
+        assert aggregator.aggregate_scores() == aggregate_scores(
+            [d["bias_scores"] for d in detections]
+        )
+        assert aggregator.distribution == calculate_category_distribution(detections)
+        assert sum(aggregator.severity_counts.values()) == 300
+
+    def test_merge_across_workers(self):
+        """Test that per-worker aggregators merge into the global result"""
+        detections = _make_detections(120, seed=3)
+        workers = [StreamingAggregator() for _ in range(3)]
+        for i, detection in enumerate(detections):
+            workers[i % 3].update(detection)
+
+        merged = StreamingAggregator()
+        for worker in workers:
+            merged.merge(StreamingAggregator.from_dict(worker.to_dict()))
+
+        reference = StreamingAggregator()
+        for detection in detections:
+            reference.update(detection)
+
+        assert merged.count == reference.count
+        assert merged.aggregate_scores() == reference.aggregate_scores()
+        assert merged.confidence_intervals() == reference.confidence_intervals()
+        assert merged.distribution == reference.distribution
+
+    def test_summary_structure(self):
+        """Test the dashboard summary payload"""
+        aggregator = StreamingAggregator()
+        aggregator.update({"bias_scores": {"gender": 0.5}, "bias_categories": ["gender"], "severity": "moderate"})
+        summary = aggregator.summary()
+
+        assert summary["count"] == 1
+        assert summary["bias_rates"] == {"gender": 1.0}
+        assert "confidence_intervals" in summary
+
+    def test_worker_detection_summary(self):
+        """Test that recorded detections show up in the worker summary"""
+        before = detection_summary()["count"]
+        record_detection({"bias_scores": {"age": 0.4}, "bias_categories": ["age"], "severity": "moderate"})
+        summary = detection_summary()
+
+        assert summary["count"] == before + 1
+        assert summary["category_distribution"]["age"] >= 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,146 @@
+"""
+Tests for the shared normalization and tokenization engine
+"""
+import pytest
+import sys
+import os
+import unicodedata
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.compiled_lexicon import CompiledLexicon, normalize_term
+from app.utils.normalization import (
+    TokenizedText, fold, normalize_text, normalize_token, tokenize
+)
+from app.utils.text_processing import clean_text, tokenize_text
+
+
+LEXICONS = {
+    "gender": {"stereotypes": ["female nurse", "café owner"]},
+    "race": {"coded": ["inner-city", "those people"]},
+    "age": {"stereotypes": ["ok boomer", "straße"]},
+    "socioeconomic": {"coded": ["ain't from here"]}
+}
+
+
+@pytest.fixture(scope="module")
+def compiled():
+    return CompiledLexicon.build(LEXICONS)
+
+
+def _matched(compiled, text):
+    return [(text[start:end], compiled.term(term_id)) for start, end, term_id in compiled.find_matches(text)]
+
+
+class TestTokenizer:
+    """Tokens, normalized forms and offsets"""
+
+    def test_offsets_refer_to_original_text(self):
+        text = "  The NURSE,  said hi."
+        tokens = TokenizedText(text)
+        assert tokens.norms == ["the", "nurse", "said", "hi"]
+        assert [text[s:e] for s, e in zip(tokens.starts, tokens.ends)] == ["The", "NURSE", "said", "hi"]
+
+    def test_decomposed_accent_is_one_token(self):
+        nfd = unicodedata.normalize("NFD", "Café owner")
+        tokens = TokenizedText(nfd)
+        assert len(tokens) == 2
+        assert tokens.norms[0] == "café"
+        assert nfd[tokens.starts[0]:tokens.ends[0]] == nfd[:5]
+
+    def test_casefold_and_compatibility_forms(self):
+        assert normalize_token("STRASSE") == "strasse"
+        assert normalize_token("Straße") == "strasse"
+        assert normalize_token("ｆｕｌｌ") == "full"
+
+    def test_cjk_text(self):
+        tokens = TokenizedText("偏见 检测")
+        assert tokens.norms == ["偏见", "检测"]
+        assert tokens.joiners == [None, " "]
+
+    def test_joiners(self):
+        tokens = TokenizedText("inner–city, those  people don’t")
+        assert tokens.joiners == [None, "-", None, " ", " ", "'"]
+        assert tokens.phrase(0, 2) == "inner-city"
+        assert tokens.phrase(1, 3) is None
+        assert tokens.phrase(4, 6) == "don't"
+
+    def test_fold(self):
+        assert fold("co­op ‘quoted’ −") == "coop 'quoted' -"
+
+    def test_normalize_text(self):
+        nfd = unicodedata.normalize("NFD", "  café \n\t au  lait ")
+        assert normalize_text(nfd) == "café au lait"
+
+
+class TestSharedCache:
+    """Stages of one request share a single tokenization"""
+
+    def test_same_object_for_repeated_text(self):
+        text = "A text tokenized by several stages."
+        assert tokenize(text) is tokenize(text)
+
+    def test_long_texts_are_not_memoized(self, monkeypatch):
+        from app import config
+
+        monkeypatch.setattr(config, "TOKENIZE_CACHE_MAX_CHARS", 10)
+        text = "A text longer than ten characters."
+        assert tokenize(text) is not tokenize(text)
+
+    def test_ids_are_cached_per_vocabulary(self, compiled):
+        tokens = TokenizedText("The female nurse left")
+        ids = tokens.ids(compiled.vocabulary)
+        assert tokens.ids(compiled.vocabulary) is ids
+        assert ids[0] == -1 and ids[1] >= 0 and ids[2] >= 0
+        assert tokens.ids({"left": 0}) == [-1, -1, -1, 0]
+
+
+class TestLexiconMatching:
+    """Unicode-aware matching in the compiled lexicon"""
+
+    def test_terms_are_normalized(self):
+        assert normalize_term("Inner–City") == "inner-city"
+        assert normalize_term("Those   People") == "those people"
+        assert normalize_term("Straße") == "strasse"
+
+    def test_decomposed_and_composed_text_match(self, compiled):
+        for form in ("NFC", "NFD"):
+            text = unicodedata.normalize(form, "The CAFÉ OWNER smiled.")
+            assert _matched(compiled, text) == [(text[4:-8], "café owner")]
+
+    def test_typographic_hyphens_and_apostrophes(self, compiled):
+        text = "An inner‑city kid who ain’t from here."
+        assert _matched(compiled, text) == [
+            ("inner‑city", "inner-city"),
+            ("ain’t from here", "ain't from here")
+        ]
+
+    def test_casefolded_match(self, compiled):
+        assert _matched(compiled, "STRASSE") == [("STRASSE", "strasse")]
+
+    def test_punctuation_breaks_phrases(self, compiled):
+        assert _matched(compiled, "Those, people") == []
+
+
+class TestStagesAgree:
+    """Text statistics, cleaning and lexicon matching use the same tokens"""
+
+    def test_tokenize_text_matches_lexicon_tokens(self, compiled):
+        text = unicodedata.normalize("NFD", "Ok BOOMER, the café owner is here")
+        words = tokenize_text(text)
+        assert words == ["ok", "boomer", "the", "café", "owner", "is", "here"]
+        for _, start, end, term_id in compiled.find_token_matches(text):
+            assert TokenizedText(compiled.term(term_id)).norms[0] in words
+
+    def test_tokenize_text_returns_a_copy(self):
+        text = "Words shared by every stage"
+        tokenize_text(text).append("extra")
+        assert tokenize(text).norms == ["words", "shared", "by", "every", "stage"]
+
+    def test_clean_text_folds_typography(self):
+        assert clean_text("It’s  a well‐known   fact ★") == "It's a well-known fact"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,123 @@
+"""
+Tests for the positional index and proximity rules
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.compiled_lexicon import CompiledLexicon
+from app.utils.proximity import PositionalIndex, ProximityRule, default_rules, find_patterns, pairs_within
+
+
+LEXICON = {
+    "gender": {
+        "male_terms": ["he", "man", "men"],
+        "female_terms": ["she", "woman", "women"],
+        "occupations": ["nurse", "engineer"],
+        "negative_traits": ["emotional", "weak"]
+    },
+    "race": {
+        "terms": ["asian", "black"],
+        "racial_activities": {"asian": ["math"], "black": ["basketball"]}
+    }
+}
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    """Compile the test lexicon"""
+    return CompiledLexicon.build(LEXICON)
+
+
+def _naive_pairs(left, right, window, ordered=False):
+    return [
+        (a, b) for a in left for b in right
+        if (b[1], b[2]) != (a[1], a[2])
+        and (a[0] <= b[0] if ordered else a[0] - window <= b[0]) and b[0] <= a[0] + window
+    ]
+
+
+class TestPositionalIndex:
+    """Tests for building the index"""
+
+    def test_positions_by_group(self, lexicon):
+        """Test that hits are filed by group in token order"""
+        index = PositionalIndex.build("She said the man was weak and emotional.", lexicon)
+        assert [hit[0] for hit in index.positions("gender.female_terms")] == [0]
+        assert [hit[0] for hit in index.positions("gender.male_terms")] == [3]
+        assert [hit[0] for hit in index.positions("gender.negative_traits")] == [5, 7]
+
+    def test_nested_group_prefix(self, lexicon):
+        """Test that a group prefix covers its nested groups"""
+        index = PositionalIndex.build("Math and basketball.", lexicon)
+        assert len(index.positions("race.racial_activities")) == 2
+        assert len(index.positions("race.racial_activities.asian")) == 1
+
+    def test_term_selector(self, lexicon):
+        """Test selecting a single term"""
+        index = PositionalIndex.build("Black and Asian students", lexicon)
+        hits = index.positions("term:asian")
+        assert len(hits) == 1
+        assert hits[0][1:3] == (10, 15)
+        assert index.positions("term:unknown") == []
+
+    def test_category_counts(self, lexicon):
+        """Test hit counts per category"""
+        index = PositionalIndex.build("She is an Asian engineer.", lexicon)
+        assert index.categories() == {"gender": 2, "race": 1}
+
+
+class TestPairsWithin:
+    """Tests for the sorted merge"""
+
+    def test_matches_nested_scan(self):
+        """Test that the merge finds the same pairs as comparing every pair"""
+        left = [(p, p * 10, p * 10 + 3, 0) for p in (0, 4, 5, 20, 31)]
+        right = [(p, p * 10, p * 10 + 3, 1) for p in (1, 2, 9, 22, 23, 40)]
+        for window in (0, 1, 3, 10):
+            for ordered in (False, True):
+                assert pairs_within(left, right, window, ordered) == _naive_pairs(left, right, window, ordered)
+
+    def test_same_span_is_not_a_pair(self):
+        """Test that a hit is never paired with itself"""
+        hits = [(0, 0, 3, 0)]
+        assert pairs_within(hits, hits, 5) == []
+
+
+class TestProximityRules:
+    """Tests for rule evaluation"""
+
+    def test_window(self, lexicon):
+        """Test that pairs outside the window do not match"""
+        rule = ProximityRule("trait", "gender", ["gender.female_terms"], ["gender.negative_traits"], window=2)
+        near = PositionalIndex.build("Women are emotional.", lexicon)
+        far = PositionalIndex.build("Women said the weather was cold and emotional.", lexicon)
+        assert len(rule.evaluate(near)) == 1
+        assert rule.evaluate(far) == []
+
+    def test_default_rules(self, lexicon):
+        """Test that default rules cover gender and racial activity patterns"""
+        rules = default_rules(lexicon)
+        names = {rule.name for rule in rules}
+        assert {"gender_trait", "gender_occupation", "race_activity_asian", "race_activity_black"} <= names
+
+    def test_find_patterns(self, lexicon):
+        """Test pattern output"""
+        text = "Asian students love math. The woman is a nurse."
+        patterns = find_patterns(text, default_rules(lexicon), PositionalIndex.build(text, lexicon))
+        assert [p["rule"] for p in patterns] == ["race_activity_asian", "gender_occupation"]
+        assert patterns[0]["terms"] == ["Asian", "math"]
+        assert text[patterns[1]["start"]:patterns[1]["end"]] == "woman is a nurse"
+
+    def test_racial_activity_requires_matching_group(self, lexicon):
+        """Test that activities only pair with the group they are associated with"""
+        text = "Black students love math."
+        patterns = find_patterns(text, default_rules(lexicon), PositionalIndex.build(text, lexicon))
+        assert patterns == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,74 @@
+"""
+Tests for background component loading and readiness tracking
+"""
+import pytest
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.readiness import DISABLED, Readiness
+
+
+class TestReadiness:
+    """Tests for the Readiness tracker"""
+
+    def test_not_ready_until_loaded(self):
+        """Test that registered components start pending"""
+        readiness = Readiness()
+        readiness.register("lexicon", lambda: None)
+        assert not readiness.is_ready()
+        assert readiness.status()["lexicon"]["state"] == "pending"
+
+    def test_ready_after_load(self):
+        """Test that loaded and disabled components count as ready"""
+        readiness = Readiness()
+        readiness.register("lexicon", lambda: None)
+        readiness.register("model", lambda: DISABLED)
+        readiness.load()
+        assert readiness.is_ready()
+        status = readiness.status()
+        assert status["lexicon"]["state"] == "ready"
+        assert status["model"]["state"] == "disabled"
+        assert "load_ms" in status["lexicon"]
+
+    def test_failure_keeps_unready(self):
+        """Test that a failed component is reported with its error"""
+        def fail():
+            raise RuntimeError("weights not found")
+
+        readiness = Readiness()
+        readiness.register("lexicon", lambda: None)
+        readiness.register("model", fail)
+        readiness.load()
+        assert not readiness.is_ready()
+        assert readiness.status()["model"] == {"state": "failed", "error": "weights not found"}
+
+    def test_background_loading(self):
+        """Test that start() returns before a slow component finishes"""
+        release = threading.Event()
+        readiness = Readiness()
+        readiness.register("lexicon", lambda: None)
+        readiness.register("model", lambda: release.wait(5) and None)
+        readiness.start()
+        assert not readiness.wait(timeout=0.2)
+        assert readiness.state("lexicon") == "ready"
+        assert readiness.state("model") == "loading"
+        release.set()
+        assert readiness.wait(timeout=5)
+
+    def test_partial_load_is_not_repeated(self):
+        """Test that components loaded before forking are skipped later"""
+        calls = []
+        readiness = Readiness()
+        readiness.register("lexicon", lambda: calls.append("lexicon"))
+        readiness.register("model", lambda: calls.append("model"))
+        readiness.load(["lexicon"])
+        readiness.load()
+        assert calls == ["lexicon", "model"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
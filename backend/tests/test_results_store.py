@@ -0,0 +1,104 @@
+"""
+Tests for the persistent results store
+"""
+import pytest
+import sys
+import os
+import sqlite3
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.metrics import aggregate_scores, calculate_category_distribution
+from app.utils.results_store import ResultsStore
+
+
+DETECTIONS = [
+    {"has_bias": True, "bias_categories": ["gender"], "bias_scores": {"gender": 0.6},
+     "severity": "severe", "overall_score": 0.6},
+    {"has_bias": True, "bias_categories": ["race", "age"], "bias_scores": {"race": 0.4, "age": 0.2},
+     "severity": "moderate", "overall_score": 0.3},
+    {"has_bias": False, "bias_categories": [], "bias_scores": {},
+     "severity": "none", "overall_score": 0.0},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a results store backed by a temporary database"""
+    store = ResultsStore(str(tmp_path / "results.db"), batch_size=2, flush_interval=0.05)
+    yield store
+    store.close()
+
+
+class TestResultsStore:
+    """Tests for recording and aggregating detections"""
+
+    def test_aggregates_match_metrics(self, store):
+        """Test that indexed aggregates match the in-memory helpers"""
+        for i, detection in enumerate(DETECTIONS):
+            assert store.record(f"text {i}", detection, lexicon_version="v1", source="detect")
+        store.flush()
+
+        assert store.count() == 3
+        assert store.category_distribution() == calculate_category_distribution(DETECTIONS)
+        assert store.aggregate_scores() == aggregate_scores([d["bias_scores"] for d in DETECTIONS])
+        assert store.severity_distribution() == {"severe": 1, "moderate": 1, "none": 1}
+
+    def test_time_range_and_category_filter(self, store):
+        """Test time-range and category filtered queries"""
+        store.record("first", DETECTIONS[0])
+        store.flush()
+        midpoint = time.time()
+        store.record("second", DETECTIONS[1])
+        store.flush()
+
+        assert store.count(start=midpoint) == 1
+        assert store.count(end=midpoint) == 1
+        assert store.category_distribution(start=midpoint) == {"race": 1, "age": 1}
+        assert store.category_distribution(categories=["gender"]) == {"gender": 1}
+
+    def test_close_flushes_pending_writes(self, tmp_path):
+        """Test that closing the store persists queued records"""
+        path = str(tmp_path / "results.db")
+        store = ResultsStore(path, batch_size=100, flush_interval=5)
+        store.record("pending", DETECTIONS[0])
+        store.close()
+
+        assert ResultsStore(path).count() == 1
+
+    def test_full_queue_drops_records(self, tmp_path):
+        """Test that recording never blocks when the queue is full"""
+        store = ResultsStore(str(tmp_path / "results.db"), max_pending=1, flush_interval=5)
+        store._ensure_writer()
+        accepted = [store.record(f"text {i}", DETECTIONS[0]) for i in range(50)]
+        store.close()
+
+        assert not all(accepted)
+        assert store.dropped == accepted.count(False)
+
+    def test_failed_batch_keeps_writer_running(self, store, monkeypatch):
+        """Test that a failed write is counted and later batches are still written"""
+        write_batch = store._write_batch
+        calls = []
+
+        def fail_once(conn, batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("disk I/O error")
+            write_batch(conn, batch)
+
+        monkeypatch.setattr(store, "_write_batch", fail_once)
+        store.record("lost", DETECTIONS[0])
+        store.flush()
+        store.record("kept", DETECTIONS[1])
+        store.flush()
+
+        assert store.failed == 1
+        assert store.count() == 1
+        assert store.summary()["failed_writes"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+"""
+Tests for sampling-based corpus statistics
+"""
+import pytest
+import sys
+import os
+import random
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.metrics import calculate_proportion_confidence_interval
+from app.utils.sampling import ProportionEstimator, Reservoir, sample_corpus
+
+
+class KeywordDetector:
+    """Flags 'gender' for texts containing 'nurse'; counts calls"""
+
+    bias_lexicons = {"gender": {}, "age": {}}
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect_lexicon_bias(self, text):
+        self.calls += 1
+        biased = "nurse" in text
+        return {
+            "has_bias": biased,
+            "bias_categories": ["gender"] if biased else [],
+            "bias_scores": {"gender": 0.5} if biased else {},
+            "severity": "moderate" if biased else "none",
+            "overall_score": 0.5 if biased else 0.0
+        }
+
+
+def _corpus(n, rate, seed=12345, stratum=None):
+    rng = random.Random(seed)
+    return [(f"text {i} nurse" if rng.random() < rate else f"text {i}", stratum) for i in range(n)]
+
+
+class TestProportionInterval:
+    """Tests for the Wilson interval"""
+
+    def test_known_values(self):
+        """Test against a textbook Wilson interval (p=0.5, n=100)"""
+        assert calculate_proportion_confidence_interval(0.5, 100) == pytest.approx((0.4038, 0.5962), abs=1e-4)
+
+    def test_zero_proportion_has_width(self):
+        """Test that no observed successes still gives an upper bound above 0"""
+        lower, upper = calculate_proportion_confidence_interval(0.0, 50)
+        assert lower == 0.0
+        assert 0 < upper < 0.1
+
+    def test_no_samples(self):
+        """Test that an empty sample says nothing"""
+        assert calculate_proportion_confidence_interval(0.0, 0) == (0, 1)
+
+
+class TestReservoir:
+    """Tests for the bounded uniform sample"""
+
+    def test_bounded_and_reproducible(self):
+        """Test that at most k items are kept and the seed fixes the sample"""
+        samples = []
+        for _ in range(2):
+            reservoir = Reservoir(10, random.Random(3))
+            for i in range(1000):
+                reservoir.add(i)
+            samples.append(reservoir.items())
+        assert len(samples[0]) == 10
+        assert samples[0] == samples[1]
+        assert reservoir.seen == 1000
+
+    def test_uniform(self):
+        """Test that every item is about equally likely to be kept"""
+        counts = [0] * 20
+        rng = random.Random(0)
+        for _ in range(2000):
+            reservoir = Reservoir(5, rng)
+            for i in range(20):
+                reservoir.add(i)
+            for item in reservoir.items():
+                counts[item] += 1
+        # Expected 500 each
+        assert min(counts) > 420 and max(counts) < 580
+
+
+class TestSampleCorpus:
+    """Tests for sequential sampling until the requested precision"""
+
+    def test_estimate_within_interval(self):
+        """Test that the estimated rate is close to the true rate"""
+        detector = KeywordDetector()
+        report = sample_corpus(_corpus(50000, 0.2), detector, precision=0.02, seed=1)
+        assert report["precision_reached"]
+        assert report["population"] == 50000
+        gender = report["bias_rates"]["gender"]
+        assert gender["lower"] <= 0.2 <= gender["upper"]
+        assert gender["half_width"] <= 0.02
+        # Only the sample was scored
+        assert detector.calls == report["sampled"] < 5000
+
+    def test_tighter_precision_samples_more(self):
+        """Test that sampling continues until the precision is reached"""
+        loose = sample_corpus(_corpus(20000, 0.3), KeywordDetector(), precision=0.05)
+        tight = sample_corpus(_corpus(20000, 0.3), KeywordDetector(), precision=0.015)
+        assert loose["sampled"] < tight["sampled"]
+        assert tight["max_half_width"] <= 0.015
+
+    def test_census_is_exact(self):
+        """Test that a corpus smaller than the reservoir is scored completely and exactly"""
+        corpus = _corpus(300, 0.1)
+        truth = sum("nurse" in text for text, _ in corpus) / 300
+        report = sample_corpus(corpus, KeywordDetector(), precision=0.0001)
+        assert report["sampled"] == 300
+        assert report["has_bias"]["estimate"] == pytest.approx(truth, abs=1e-4)
+        assert report["has_bias"]["half_width"] == 0
+
+    def test_stratified_weights_by_population(self):
+        """Test that strata are weighted by size, not by sample count"""
+        corpus = _corpus(9000, 0.0, stratum="web") + _corpus(1000, 1.0, stratum="news")
+        report = sample_corpus(corpus, KeywordDetector(), precision=0.02)
+        assert report["strata"]["web"]["population"] == 9000
+        assert report["has_bias"]["estimate"] == pytest.approx(0.1, abs=1e-3)
+        assert report["severity_distribution"]["moderate"]["estimate"] == pytest.approx(0.1, abs=1e-3)
+
+    def test_estimator_finite_population_correction(self):
+        """Test that a fully sampled stratum adds no variance"""
+        estimator = ProportionEstimator({"a": 2})
+        estimator.update("a", ["x"])
+        estimator.update("a", [])
+        assert estimator.estimate("x")["half_width"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
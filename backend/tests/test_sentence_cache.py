@@ -0,0 +1,128 @@
+"""
+Tests for the per-sentence model output cache
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.model_runner import ModelRunner
+from app.utils.sentence_cache import SentenceCache, normalize_sentence
+
+
+class FakePipeline:
+    """Stands in for a transformers pipeline; 'biased' sentences score high"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, batch_size=8, top_k=None):
+        self.calls.append(list(texts))
+        outputs = []
+        for text in texts:
+            biased = 0.9 if "biased" in text else 0.1
+            outputs.append([{"label": "BIASED", "score": biased}, {"label": "NEUTRAL", "score": 1 - biased}])
+        return outputs
+
+
+def _runner():
+    runner = ModelRunner("fake-model")
+    runner.pipeline = FakePipeline()
+    return runner
+
+
+class TestSentenceCache:
+    """Tests for cache keys and bounds"""
+
+    def test_normalization_folds_whitespace_and_compatibility_forms(self):
+        """Test that spacing and NFKC variants share a key, case does not"""
+        assert normalize_sentence("  Hello \n  world ") == "Hello world"
+        assert normalize_sentence("ﬁne") == "fine"
+        cache = SentenceCache()
+        assert cache.key("v1", "Hello  world") == cache.key("v1", "Hello world")
+        assert cache.key("v1", "Hello world") != cache.key("v1", "hello world")
+
+    def test_model_version_is_part_of_key(self):
+        """Test that outputs are not shared across model versions"""
+        cache = SentenceCache()
+        cache.put("v1", "A sentence.", {"BIASED": 0.2})
+        assert cache.get("v1", "A sentence.") == {"BIASED": 0.2}
+        assert cache.get("v2", "A sentence.") is None
+
+    def test_key_ignores_lexicon_engine_version(self, monkeypatch):
+        """Test that a lexicon engine bump keeps cached model outputs"""
+        from app.utils import detection_cache
+
+        cache = SentenceCache()
+        key = cache.key("v1", "A sentence.")
+        monkeypatch.setattr(detection_cache, "ENGINE_VERSION", detection_cache.ENGINE_VERSION + 1)
+        assert cache.key("v1", "A sentence.") == key
+        assert "v1" in key
+
+    def test_bounded_with_eviction(self):
+        """Test that the least recently used sentence is evicted"""
+        cache = SentenceCache(max_entries=2)
+        cache.put("v1", "one", {"A": 1.0})
+        cache.put("v1", "two", {"A": 1.0})
+        cache.get("v1", "one")
+        cache.put("v1", "three", {"A": 1.0})
+        assert len(cache) == 2
+        assert cache.get("v1", "two") is None
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["hits"] == 1
+
+
+class TestPredictDocuments:
+    """Tests for sentence-level inference with the cache"""
+
+    def test_only_uncached_sentences_go_to_inference(self):
+        """Test that a repeated sentence is served from the cache"""
+        runner, cache = _runner(), SentenceCache()
+        first = runner.predict_documents(["This is biased. This is fine."], cache=cache)[0]
+        assert first["sentences"] == 2
+        assert first["cached_sentences"] == 0
+
+        second = runner.predict_documents(["This is fine. Something new."], cache=cache)[0]
+        assert len(runner.pipeline.calls[-1]) == 1
+        assert runner.pipeline.calls[-1][0].startswith("Something new")
+        assert second["cached_sentences"] == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_sentences_are_deduplicated_within_a_batch(self):
+        """Test that a sentence shared by several documents is inferred once"""
+        runner = _runner()
+        runner.predict_documents(["Same here. One.", "Same here. Two."], cache=SentenceCache())
+        assert len(runner.pipeline.calls) == 1
+        assert [s.rstrip(".") for s in runner.pipeline.calls[0]] == ["Same here", "One", "Two"]
+
+    def test_document_score_is_length_weighted(self):
+        """Test that the document distribution weights sentences by length"""
+        runner = _runner()
+        text = "So biased. This sentence is considerably longer and neutral."
+        result = runner.predict_documents([text])[0]
+        short, long = runner.pipeline.calls[0]
+        expected = (len(short) * 0.1 + len(long) * 0.9) / (len(short) + len(long))
+        assert result["label"] == "NEUTRAL"
+        assert result["score"] == pytest.approx(expected, abs=1e-4)
+
+    def test_cached_result_matches_uncached(self):
+        """Test that assembling from the cache gives the same prediction"""
+        runner, cache = _runner(), SentenceCache()
+        text = "A biased remark. A neutral one."
+        uncached = runner.predict_documents([text], cache=cache)[0]
+        cached = runner.predict_documents([text], cache=cache)[0]
+        assert cached["cached_sentences"] == 2
+        assert (cached["label"], cached["score"]) == (uncached["label"], uncached["score"])
+        assert len(runner.pipeline.calls) == 1
+
+    def test_version_includes_revision_and_max_length(self):
+        """Test that the model version changes with the weights revision"""
+        runner = _runner()
+        assert runner.version == "fake-model@local:512"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
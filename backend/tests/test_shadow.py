@@ -0,0 +1,181 @@
+"""
+Tests for shadow-mode engine comparison
+"""
+import pytest
+import sys
+import os
+import json
+import random
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.lexicon import hash_text
+from app.utils.shadow import ShadowRunner, _admission_busy, filter_categories
+
+
+def _result(categories, severity):
+    return {
+        "has_bias": bool(categories),
+        "bias_categories": list(categories),
+        "bias_scores": {c: 0.5 for c in categories},
+        "severity": severity,
+        "overall_score": 0.5 if categories else 0.0
+    }
+
+
+def primary(text):
+    return _result(["gender"] if "nurse" in text else [], "moderate" if "nurse" in text else "none")
+
+
+def candidate(text):
+    # Also flags age, so texts mentioning 'old' disagree
+    categories = (["gender"] if "nurse" in text else []) + (["age"] if "old" in text else [])
+    return _result(categories, "moderate" if categories else "none")
+
+
+def _runner(**kwargs):
+    kwargs.setdefault("sample_rate", 1.0)
+    return ShadowRunner("test", candidate, rng=random.Random(0), **kwargs)
+
+
+class TestShadowRunner:
+    """Tests for sampling, comparison and load shedding"""
+
+    def test_agreement_and_disagreement_log(self, tmp_path):
+        """Test that disagreements are counted and logged as JSON lines"""
+        log = tmp_path / "shadow.jsonl"
+        runner = _runner(log_path=str(log))
+        for text in ["The nurse helped.", "The weather is nice.", "An old man."]:
+            assert runner.maybe_submit(text, None, primary(text), served_ms=2.0)
+        runner.wait()
+
+        stats = runner.stats()
+        assert stats["completed"] == 3
+        assert stats["category_agreement"] == pytest.approx(2 / 3, abs=1e-4)
+        assert stats["latency_ms"]["candidate"]["count"] == 3
+        assert stats["latency_ms"]["primary"]["mean"] == 2.0
+        records = [json.loads(line) for line in log.read_text().splitlines()]
+        assert len(records) == 1
+        assert records[0]["candidate"]["bias_categories"] == ["age"]
+        assert records[0]["text_hash"] == hash_text("An old man.")
+        assert "text" not in records[0]
+        runner.shutdown()
+
+    def test_primary_is_not_recomputed(self):
+        """Test that the served result is compared and untimed requests add no primary latency"""
+        runner = _runner()
+        runner.maybe_submit("The nurse helped.", None, _result([], "none"))
+        runner.wait()
+        stats = runner.stats()
+        assert stats["category_agreement"] == 0.0
+        assert stats["latency_ms"]["primary"]["count"] == 0
+        runner.shutdown()
+
+    def test_logged_text_is_opt_in_and_truncated(self, tmp_path):
+        """Test that the text is only logged when enabled, and then truncated"""
+        log = tmp_path / "shadow.jsonl"
+        runner = _runner(log_path=str(log), log_text_chars=6)
+        runner.maybe_submit("An old man.", None, primary("An old man."))
+        runner.wait()
+        assert json.loads(log.read_text())["text"] == "An old"
+        runner.shutdown()
+
+    def test_log_rotation(self, tmp_path):
+        """Test that a full log file is moved aside instead of growing"""
+        log = tmp_path / "shadow.jsonl"
+        runner = _runner(log_path=str(log), log_max_bytes=1)
+        for _ in range(3):
+            runner.maybe_submit("An old man.", None, primary("An old man."))
+            runner.wait()
+        assert len(log.read_text().splitlines()) == 1
+        assert len((tmp_path / "shadow.jsonl.1").read_text().splitlines()) == 1
+        runner.shutdown()
+
+    def test_requested_categories_are_applied_to_candidate(self):
+        """Test that the candidate is compared only on the requested categories"""
+        runner = _runner()
+        text = "An old nurse."
+        served = filter_categories(primary(text), ["gender"])
+        runner.maybe_submit(text, ["gender"], served)
+        runner.wait()
+        assert runner.stats()["category_agreement"] == 1.0
+        runner.shutdown()
+
+    def test_sample_rate(self):
+        """Test that roughly sample_rate of requests are shadowed"""
+        runner = _runner(sample_rate=0.1, max_pending=10000)
+        submitted = sum(runner.maybe_submit("text", None, primary("text")) for _ in range(2000))
+        runner.wait()
+        assert 140 < submitted < 260
+        runner.shutdown()
+
+    def test_dropped_under_load(self):
+        """Test that nothing is submitted while the system reports load"""
+        runner = _runner(under_load=lambda: True)
+        assert not runner.maybe_submit("text", None, primary("text"))
+        assert runner.stats()["dropped_load"] == 1
+        runner.shutdown()
+
+    def test_busy_when_admission_slots_are_full(self, monkeypatch):
+        """Test that shadow work is shed once every admission slot is taken by other requests"""
+        from app.utils.admission import admission_controller, admission_slot
+
+        monkeypatch.setattr(admission_controller, "in_flight", admission_controller.max_concurrency - 1)
+        assert not _admission_busy()
+        monkeypatch.setattr(admission_controller, "in_flight", admission_controller.max_concurrency)
+        assert _admission_busy()
+
+        # The calling request's own slot does not count
+        token = admission_slot.set(True)
+        try:
+            assert not _admission_busy()
+            monkeypatch.setattr(admission_controller, "max_concurrency", 1)
+            monkeypatch.setattr(admission_controller, "in_flight", 1)
+            assert not _admission_busy()
+        finally:
+            admission_slot.reset(token)
+
+    def test_baseline_replaces_served_result(self):
+        """Test that a baseline engine is compared and timed instead of the served result"""
+        runner = ShadowRunner("test", candidate, baseline=candidate, sample_rate=1.0)
+        runner.maybe_submit("An old nurse.", None, _result([], "none"))
+        runner.wait()
+        stats = runner.stats()
+        assert stats["baseline"] == "sparse"
+        assert stats["category_agreement"] == 1.0
+        assert stats["latency_ms"]["primary"]["count"] == 1
+        runner.shutdown()
+
+    def test_bounded_queue(self):
+        """Test that work beyond max_pending is dropped, not queued"""
+        release = threading.Event()
+
+        def slow(text):
+            release.wait(5)
+            return primary(text)
+
+        runner = ShadowRunner("slow", slow, sample_rate=1.0, max_pending=2)
+        results = [runner.maybe_submit("text", None, primary("text")) for _ in range(5)]
+        assert results == [True, True, False, False, False]
+        assert runner.stats()["dropped_full"] == 3
+        release.set()
+        runner.wait()
+        assert runner.stats()["pending"] == 0
+        runner.shutdown()
+
+    def test_candidate_errors_are_contained(self):
+        """Test that a failing candidate is counted and does not raise"""
+        def broken(text):
+            raise RuntimeError("boom")
+
+        runner = ShadowRunner("broken", broken, sample_rate=1.0)
+        assert runner.maybe_submit("text", None, primary("text"))
+        runner.wait()
+        assert runner.stats()["errors"] == 1
+        runner.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,187 @@
+"""
+Tests for per-tenant custom lexicons
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.batch_scoring import BatchScorer
+from app.utils.compiled_lexicon import CompiledLexicon
+from app.utils.lexicon import compute_lexicon_version
+from app.utils.tenant_lexicons import (
+    LexiconValidationError, TenantLexiconRegistry, TenantLexiconStore, TenantScoringUnavailable, build_lexicon
+)
+
+
+BASE = {
+    "gender": {"male_terms": ["he", "man"], "female_terms": ["she", "woman"], "occupations": ["nurse"]},
+    "race": {"coded_language": ["they", "them", "thug"], "racial_activities": {"asian": ["math"]}},
+}
+
+
+def _calibrated(group_weights=None, thresholds=None):
+    """Reference scorer of the base lexicon marked as calibrated"""
+    return BatchScorer(CompiledLexicon.build(BASE), group_weights, calibration={"texts": 0}, thresholds=thresholds)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Create a registry backed by a temporary database"""
+    store = TenantLexiconStore(str(tmp_path / "lexicons.db"))
+    return TenantLexiconRegistry(store, BASE, _calibrated(), capacity=2, refresh_seconds=60)
+
+
+class TestBuildLexicon:
+    """Tests for applying definitions to the base lexicon"""
+
+    def test_add_and_remove(self):
+        """Test that terms are added and removed without touching the base"""
+        lexicons = build_lexicon({
+            "add": {"gender": {"occupations": ["midwife", "Nurse"]}, "race": {"racial_activities": {"latino": ["salsa"]}}},
+            "remove": {"race": {"coded_language": ["they", "them"]}}
+        }, BASE)
+        assert lexicons["gender"]["occupations"] == ["nurse", "midwife"]
+        assert lexicons["race"]["coded_language"] == ["thug"]
+        assert lexicons["race"]["racial_activities"]["latino"] == ["salsa"]
+        assert BASE["race"]["coded_language"] == ["they", "them", "thug"]
+
+    def test_without_default(self):
+        """Test that a lexicon can start from the base structure without its terms"""
+        lexicons = build_lexicon({"extends_default": False, "add": {"gender": {"male_terms": ["sir"]}}}, BASE)
+        assert lexicons["gender"] == {"male_terms": ["sir"], "female_terms": [], "occupations": []}
+        assert lexicons["race"]["racial_activities"] == {"asian": []}
+
+    @pytest.mark.parametrize("definition", [
+        {"add": {"weather": {"terms": ["rain"]}}},
+        {"add": {"gender": {"occupations": [""]}}},
+        {"add": {"gender": {"bad group": ["x"]}}},
+        {"remove": {"gender": {"missing": ["x"]}}},
+        {"remove": {"gender": {"occupations": ["pilot"]}}},
+        {"extends_default": False},
+    ])
+    def test_invalid_definitions(self, definition):
+        """Test that malformed definitions are rejected"""
+        with pytest.raises(LexiconValidationError):
+            build_lexicon(definition, BASE)
+
+    def test_max_terms(self):
+        """Test that oversized lexicons are rejected"""
+        with pytest.raises(LexiconValidationError):
+            build_lexicon({}, BASE, max_terms=3)
+
+
+class TestRegistry:
+    """Tests for registration and the LRU of compiled lexicons"""
+
+    def test_register_and_get(self, registry):
+        """Test that a registered lexicon is compiled with its own detector"""
+        lexicon = registry.register("acme", {"remove": {"race": {"coded_language": ["they"]}}})
+        assert registry.get("acme") is lexicon
+        assert lexicon.detector.bias_lexicons["race"]["coded_language"] == ["them", "thug"]
+        assert lexicon.compiled.lookup("they") < 0
+        assert lexicon.compiled.lookup("thug") >= 0
+        assert registry.usage("acme")["requests"] == 1
+
+    def test_invalid_id(self, registry):
+        """Test that IDs are restricted to a safe character set"""
+        with pytest.raises(LexiconValidationError):
+            registry.register("../etc", {})
+
+    def test_unknown_lexicon(self, registry):
+        """Test that unregistered IDs return None"""
+        assert registry.get("missing") is None
+
+    def test_lru_eviction_and_recompile(self, registry):
+        """Test that the least recently used lexicon is evicted and compiled again on demand"""
+        for lexicon_id in ("a", "b", "c"):
+            registry.register(lexicon_id, {"add": {"gender": {"occupations": [lexicon_id + "x"]}}})
+        stats = registry.stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+
+        lexicon = registry.get("a")
+        assert lexicon.compiled.lookup("ax") >= 0
+        assert registry.stats()["misses"] == 1
+
+    def test_update_from_another_worker(self, tmp_path):
+        """Test that a changed definition is picked up after the refresh interval"""
+        path = str(tmp_path / "lexicons.db")
+        worker = TenantLexiconRegistry(TenantLexiconStore(path), BASE, refresh_seconds=0)
+        other = TenantLexiconRegistry(TenantLexiconStore(path), BASE, refresh_seconds=0)
+        first = worker.register("acme", {})
+        other.register("acme", {"remove": {"gender": {"occupations": ["nurse"]}}})
+        updated = worker.get("acme")
+        assert updated.version != first.version
+        assert updated.compiled.lookup("nurse") < 0
+
+    def test_delete(self, registry):
+        """Test that deleted lexicons are no longer served"""
+        registry.register("acme", {})
+        assert registry.delete("acme")
+        assert registry.get("acme") is None
+        assert not registry.delete("acme")
+        assert registry.usage("acme") is None
+
+    def test_usage_is_bounded(self, tmp_path):
+        """Test that usage counters are only kept for the most recently used lexicons"""
+        store = TenantLexiconStore(str(tmp_path / "lexicons.db"))
+        registry = TenantLexiconRegistry(store, BASE, usage_capacity=2)
+        for lexicon_id in ("a", "b", "c"):
+            registry.register(lexicon_id, {})
+        assert registry.usage("a") is None
+        assert registry.usage("c")["compiles"] == 1
+
+
+class TestTenantDetector:
+    """Tests for scoring through the tenant's compiled lexicon"""
+
+    def test_scores_tenant_terms(self, registry):
+        """Test that added terms are detected and removed terms are not"""
+        detector = registry.register("acme", {
+            "add": {"gender": {"occupations": ["midwife"]}},
+            "remove": {"race": {"coded_language": ["they", "them"]}}
+        }).detector
+        assert detector.detect_lexicon_bias("The midwife arrived.")["bias_categories"] == ["gender"]
+        assert detector.detect_lexicon_bias("They told them.")["has_bias"] is False
+        assert detector.detect_lexicon_bias("A thug.")["bias_categories"] == ["race"]
+        assert detector.bias_lexicons["gender"]["occupations"] == ["nurse", "midwife"]
+
+    def test_reuses_calibrated_weights(self, tmp_path):
+        """Test that a calibrated reference scorer's weights and thresholds carry over by name"""
+        reference = _calibrated({"gender.occupations": 0.2}, {"gender": 0.3})
+        store = TenantLexiconStore(str(tmp_path / "lexicons.db"))
+        registry = TenantLexiconRegistry(store, BASE, reference)
+        detector = registry.register("acme", {"add": {"gender": {"occupations": ["midwife"]}}}).detector
+        result = detector.detect_lexicon_bias("The midwife arrived.")
+        assert result["bias_scores"] == {"gender": 0.2}
+        assert result["has_bias"] is False
+        assert detector.detect_lexicon_bias("The midwife and the nurse.")["bias_categories"] == ["gender"]
+
+    def test_uncalibrated_weights_are_not_served(self, tmp_path):
+        """Test that tenants are not scored with uncalibrated weights"""
+        reference = BatchScorer(CompiledLexicon.build(BASE), {"gender.occupations": 0.2})
+        store = TenantLexiconStore(str(tmp_path / "lexicons.db"))
+        detector = TenantLexiconRegistry(store, BASE, reference).register("acme", {}).detector
+        assert not detector.calibrated
+        with pytest.raises(TenantScoringUnavailable):
+            detector.detect_lexicon_bias("The nurse.")
+
+    def test_version_covers_id_and_weights(self, tmp_path):
+        """Test that results are versioned by lexicon ID and weights, not only by content"""
+        store = TenantLexiconStore(str(tmp_path / "lexicons.db"))
+        registry = TenantLexiconRegistry(store, BASE, _calibrated())
+        acme = registry.register("acme", {})
+        other = registry.register("other", {})
+        assert acme.definition_version == other.definition_version == compute_lexicon_version(BASE)
+        assert acme.version != other.version
+        assert acme.version != compute_lexicon_version(BASE)
+
+        recalibrated = TenantLexiconRegistry(store, BASE, _calibrated({"gender.occupations": 0.2}))
+        assert recalibrated.get("acme").version != acme.version
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,62 @@
+"""
+Tests for request stage timing and profiling helpers
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.timing import current_timer, end_request, instrumented, stage, start_request
+
+
+class TestRequestTimer:
+    """Tests for stage recording"""
+
+    def test_stage_outside_request_is_noop(self):
+        """Test that stages outside a request do nothing"""
+        assert current_timer() is None
+        with stage("detection"):
+            pass
+
+    def test_stages_accumulate(self):
+        """Test that repeated stages add up and appear in the header"""
+        timer, token = start_request()
+        try:
+            with stage("highlighting"):
+                pass
+            with stage("highlighting"):
+                pass
+            timer.stages["highlighting"] = 1.5
+            header = timer.header()
+        finally:
+            end_request(token)
+        assert header.startswith("highlighting;dur=1.500, total;dur=")
+        assert current_timer() is None
+
+    def test_instrumented_handler(self):
+        """Test that handlers record validation and profile on request"""
+        @instrumented
+        def handler(x):
+            return sum(range(x))
+
+        timer, token = start_request(profile=True)
+        try:
+            assert handler(100) == 4950
+        finally:
+            end_request(token)
+        assert "validation" in timer.stages
+        assert any("handler" in row["function"] for row in timer.profile_stats)
+
+    def test_instrumented_without_request(self):
+        """Test that handlers run normally outside a request"""
+        @instrumented
+        def handler():
+            return "ok"
+
+        assert handler() == "ok"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
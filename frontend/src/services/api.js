@@ -34,17 +34,42 @@ api.interceptors.response.use(
   }
 );
 
+// Detection results by request, revalidated with If-None-Match so repeated
+// submissions of the same text are answered with a bodiless 304
+const MAX_CACHED_RESULTS = 50;
+const resultCache = new Map();
+
+const postWithETag = async (url, body) => {
+  const key = `${url} ${JSON.stringify(body)}`;
+  const cached = resultCache.get(key);
+  const response = await api.post(url, body, {
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  const etag = response.headers.etag;
+  resultCache.delete(key);
+  if (etag) {
+    resultCache.set(key, { etag, data: response.data });
+    if (resultCache.size > MAX_CACHED_RESULTS) {
+      resultCache.delete(resultCache.keys().next().value);
+    }
+  }
+  return response.data;
+};
+
 export const biasDetectionAPI = {
   /**
    * Detect bias in text
    */
   detectBias: async (text, categories = null) => {
     try {
-      const response = await api.post('/api/v1/detect', {
+      return await postWithETag('/api/v1/detect', {
         text,
         categories,
       });
-      return response.data;
     } catch (error) {
       throw error.response?.data || error;
     }
@@ -55,10 +80,39 @@ export const biasDetectionAPI = {
    */
   analyzeText: async (text, modelName = null) => {
     try {
-      const response = await api.post('/api/v1/analyze', {
+      return await postWithETag('/api/v1/analyze', {
         text,
         model_name: modelName,
       });
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
+  /**
+   * Submit a batch of texts for background analysis
+   */
+  submitJob: async (texts, categories = null, includeHighlights = true) => {
+    try {
+      const response = await api.post('/api/v1/jobs', {
+        texts,
+        categories,
+        include_highlights: includeHighlights,
+      });
+      return response.data;
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
+  /**
+   * Get job progress and a page of results
+   */
+  getJob: async (jobId, offset = 0, limit = 100) => {
+    try {
+      const response = await api.get(`/api/v1/jobs/${jobId}`, {
+        params: { offset, limit },
+      });
       return response.data;
     } catch (error) {
       throw error.response?.data || error;